@@ -0,0 +1,82 @@
+"""
+Analytics benchmark
+Times the first full load of CharacterAnalytics, an incremental refresh after
+a few saves, and the dashboard queries, against a naive per-sheet Python loop
+over get_all().
+
+Usage:
+    python -m benchmarks.analytics --characters 20000 --saves 10
+"""
+import argparse
+import random
+import shutil
+import tempfile
+import time
+
+from repository import Character, CharacterRepository
+from repository.analytics import CharacterAnalytics
+from repository.character_model import DISCOVERY_KEYS, HIDDEN_PATH_KEYS
+
+
+def make_character(rng: random.Random, index: int) -> Character:
+    return Character.empty().replace(
+        hero_name=f"Hero {index}",
+        paths=rng.getrandbits(len(HIDDEN_PATH_KEYS)) & rng.getrandbits(len(HIDDEN_PATH_KEYS)),
+        discoveries=rng.getrandbits(len(DISCOVERY_KEYS)),
+    )
+
+
+def naive_tile_completion(repo: CharacterRepository) -> dict:
+    """What a dashboard would do without the analytics module"""
+    found, total = {}, {}
+    for character in repo.get_all().values():
+        for location, sides in character.get('hidden_paths', {}).items():
+            for value in sides.values():
+                total[location] = total.get(location, 0) + 1
+                found[location] = found.get(location, 0) + bool(value)
+    return {location: found[location] / total[location] for location in total}
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark incremental character analytics")
+    parser.add_argument("--characters", type=int, default=20000)
+    parser.add_argument("--saves", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    temp_dir = tempfile.mkdtemp(prefix="analytics_bench_")
+    try:
+        repo = CharacterRepository(storage_path=temp_dir, history=False, progress=False)
+        repo.save_many((f"Hero_{i}", make_character(rng, i)) for i in range(args.characters))
+
+        naive, _ = timed(lambda: naive_tile_completion(repo))
+        analytics = CharacterAnalytics(repo)
+        first, _ = timed(analytics.refresh)
+        queries, _ = timed(lambda: (analytics.tile_completion(), analytics.land_pack_completion(),
+                                    analytics.discovery_rates(), analytics.most_missed_paths()))
+        cached, _ = timed(lambda: (analytics.tile_completion(), analytics.land_pack_completion(),
+                                   analytics.discovery_rates(), analytics.most_missed_paths()))
+
+        for i in rng.sample(range(args.characters), args.saves):
+            repo.patch(f"Hero_{i}", {('discoveries', 'shrine'): True})
+        incremental, _ = timed(lambda: (analytics.refresh(), analytics.tile_completion(),
+                                        analytics.discovery_rates(), analytics.most_missed_paths()))
+
+        print(f"{args.characters} characters")
+        print(f"naive scan per page load       {naive * 1000:10.1f} ms")
+        print(f"first load (once per process)  {first * 1000:10.1f} ms")
+        print(f"all dashboard queries          {queries * 1000:10.1f} ms")
+        print(f"dashboard, nothing changed     {cached * 1000:10.1f} ms")
+        print(f"dashboard after {args.saves:>3} saves     {incremental * 1000:10.1f} ms")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
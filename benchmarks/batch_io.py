@@ -0,0 +1,96 @@
+"""
+Batch I/O benchmark
+Reads a store of character sheets one file at a time and with get_many() at
+several pool sizes, after evicting the files from the page cache, to show how
+much parallel reads hide storage latency.
+
+Page cache eviction uses posix_fadvise(DONTNEED), which only drops clean pages
+and does nothing on tmpfs; point --storage at a real disk (ideally network
+storage) for meaningful cold numbers.
+
+Usage:
+    python -m benchmarks.batch_io --characters 2000 --workers 4 16 32
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from repository import CharacterRepository
+
+
+def make_character(index: int) -> dict:
+    return {
+        'hero_name': f"Hero {index}",
+        'journal_entries': [f"Line {i} of an adventure" for i in range(30)],
+        'hidden_paths': {f"Tile {t}": {'1-6_s1': bool(t % 2)} for t in range(25)},
+        'discoveries': {f"discovery_{d}": False for d in range(15)},
+    }
+
+
+def drop_page_cache(storage_path: Path) -> bool:
+    """Ask the kernel to forget the cached pages of every sheet"""
+    if not hasattr(os, 'posix_fadvise'):
+        return False
+    os.sync()
+    for filepath in storage_path.glob("*.json"):
+        fd = os.open(filepath, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    return True
+
+
+def time_reads(repo: CharacterRepository, ids, workers, cold: bool) -> float:
+    if cold:
+        drop_page_cache(repo.get_storage_path())
+    start = time.perf_counter()
+    if workers is None:
+        loaded = [repo.get(character_id) for character_id in ids]
+    else:
+        loaded = [result.value for result in repo.get_many(ids)]
+    elapsed = time.perf_counter() - start
+    assert all(character is not None for character in loaded)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare serial get() with get_many()")
+    parser.add_argument("--characters", type=int, default=2000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[4, 16, 32])
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per mode (best is reported)")
+    parser.add_argument("--storage", help="Directory to create the test store in (default: a temp dir)")
+    args = parser.parse_args()
+
+    temp_dir = Path(tempfile.mkdtemp(prefix="batch_bench_", dir=args.storage))
+    try:
+        storage_path = temp_dir / "sheets"
+        writer = CharacterRepository(storage_path=str(storage_path), process_locks=False)
+        writer.save_many({f"Bench_{i:05d}": make_character(i) for i in range(args.characters)})
+        writer.close()
+        ids = sorted(path.stem for path in storage_path.glob("*.json"))
+
+        if not drop_page_cache(storage_path):
+            print("posix_fadvise is unavailable, cold numbers include cached reads")
+        print(f"{args.characters} characters in {storage_path}")
+        print(f"{'mode':<20}{'cold ms':>10}{'cold x':>8}{'warm ms':>10}{'warm x':>8}")
+        baseline = None
+        for workers in [None] + args.workers:
+            repo = CharacterRepository(storage_path=str(storage_path), io_workers=workers)
+            cold = min(time_reads(repo, ids, workers, cold=True) for _ in range(args.repeat))
+            warm = min(time_reads(repo, ids, workers, cold=False) for _ in range(args.repeat))
+            repo.close()
+            if baseline is None:
+                baseline = (cold, warm)
+            name = "get() loop" if workers is None else f"get_many x{workers}"
+            print(f"{name:<20}{cold * 1000:>10.1f}{baseline[0] / cold:>8.2f}"
+                  f"{warm * 1000:>10.1f}{baseline[1] / warm:>8.2f}")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Character model benchmark
+Memory per cached sheet and per-rerun change-detection cost for the slotted
+Character model against the nested dicts the form used before.
+
+Usage:
+    python -m benchmarks.character_model --characters 1000
+"""
+import argparse
+import copy
+import time
+import tracemalloc
+
+from repository import Character
+from repository.character_model import DISCOVERY_KEYS, HIDDEN_PATH_KEYS
+
+
+def make_document(index: int) -> dict:
+    document = Character.empty().to_dict()
+    document['hero_name'] = f"Hero {index}"
+    document['journal_entries'] = [f"Day {line}: hero {index} explored" for line in range(30)]
+    for bit, (location, key) in enumerate(HIDDEN_PATH_KEYS):
+        document['hidden_paths'][location][key] = (bit + index) % 3 == 0
+    for bit, name in enumerate(DISCOVERY_KEYS):
+        document['discoveries'][name] = (bit + index) % 2 == 0
+    document['version'] = 1
+    return document
+
+
+def measure_memory(build, count: int) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [build(i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert len(kept) == count
+    return (after - before) / count
+
+
+def measure(func, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare dict sheets with the Character model")
+    parser.add_argument("--characters", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    documents = [make_document(i) for i in range(args.characters)]
+    dict_bytes = measure_memory(lambda i: copy.deepcopy(documents[i]), args.characters)
+    model_bytes = measure_memory(lambda i: Character.from_dict(documents[i]), args.characters)
+
+    # A rerun compares the sheet rebuilt from widgets with the loaded one
+    loaded_dict, rebuilt_dict = documents[0], copy.deepcopy(documents[0])
+    loaded, rebuilt = Character.from_dict(documents[0]), Character.from_dict(documents[0])
+    dict_diff = measure(lambda: loaded_dict != rebuilt_dict, args.iterations)
+    model_diff = measure(lambda: loaded.same_content(rebuilt), args.iterations)
+    dict_copy = measure(lambda: copy.deepcopy(loaded_dict), args.iterations // 10)
+    model_copy = measure(loaded.copy, args.iterations)
+
+    print(f"{'':<24}{'dict':>12}{'Character':>12}")
+    print(f"{'bytes per sheet':<24}{dict_bytes:>12.0f}{model_bytes:>12.0f}")
+    print(f"{'diff per rerun (us)':<24}{dict_diff * 1e6:>12.2f}{model_diff * 1e6:>12.2f}")
+    print(f"{'copy per checkout (us)':<24}{dict_copy * 1e6:>12.2f}{model_copy * 1e6:>12.2f}")
+    print(f"Conversion: to_dict {measure(loaded.to_dict, 2000) * 1e6:.1f} us, "
+          f"from_dict {measure(lambda: Character.from_dict(loaded_dict), 2000) * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
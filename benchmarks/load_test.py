@@ -0,0 +1,227 @@
+"""
+Multi-session load generator
+Simulates concurrent players, each editing their own character through the
+real Streamlit script (AppTest). Sessions are spread over --processes worker
+processes that share one character store, in replica mode, the way several
+Streamlit server processes would. With the default of one process per
+session, every session's repository I/O overlaps with every other's.
+
+AppTest installs a process-global runtime for the duration of each run, so
+sessions that share a process take turns through RUN_LOCK. The time spent
+waiting for it is reported separately from the rerun latency.
+
+Usage:
+    python -m benchmarks.load_test --sessions 8 --edits 20 --cadence 0.2
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from streamlit.testing.v1 import AppTest
+
+from repository.serialization import decode_document
+
+
+APP_PATH = str(Path(__file__).resolve().parent.parent / "main.py")
+
+WORDS = [
+    "crossed", "the", "bog", "found", "a", "shrine", "fought", "goblins",
+    "near", "high", "pass", "rested", "at", "oakwood", "lost", "battalion",
+]
+
+RUN_LOCK = threading.Lock()
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+class SimulatedSession:
+    """One player: creates a hero, then types journal lines word by word"""
+
+    def __init__(self, index: int, edits: int, cadence: float, seed: int):
+        self.index = index
+        self.edits = edits
+        self.cadence = cadence
+        self.random = random.Random(seed + index)
+        self.hero_name = f"S{index:03d} Hero"
+        self.char_id = None
+        self.expected_journal: Dict[int, str] = {}
+        self.latencies: List[float] = []
+        self.lock_waits: List[float] = []
+        self.saves = 0
+        self.errors: List[str] = []
+
+    def _run(self, at: AppTest):
+        start = time.perf_counter()
+        with RUN_LOCK:
+            started = time.perf_counter()
+            at.run()
+            finished = time.perf_counter()
+        self.lock_waits.append(started - start)
+        self.latencies.append(finished - started)
+        if at.exception:
+            self.errors.append(str(at.exception[0].message))
+        if any("Auto-saved" in c.value for c in at.caption):
+            self.saves += 1
+
+    def _pause(self):
+        if self.cadence > 0:
+            time.sleep(self.random.expovariate(1 / self.cadence))
+
+    def run(self):
+        try:
+            at = AppTest.from_file(APP_PATH, default_timeout=60)
+            self._run(at)
+            next(b for b in at.sidebar.button if b.label == "➕ Create New Character").click()
+            self._run(at)
+            at.text_input(key="hero_name_new_character").input(self.hero_name)
+            self._run(at)
+            self.char_id = at.session_state.current_character
+
+            line, text = 0, ""
+            for _ in range(self.edits):
+                self._pause()
+                # Start a new journal line every few words
+                if text and self.random.random() < 0.25:
+                    line, text = (line + 1) % 30, ""
+                text = f"{text} {self.random.choice(WORDS)}".strip()
+                at.text_input(key=f"journal_{line}_{self.char_id}").input(text)
+                self._run(at)
+                self.expected_journal[line] = text
+        except Exception as e:
+            self.errors.append(f"{type(e).__name__}: {e}")
+
+
+def check_store(storage_path: Path, sessions: List[SimulatedSession]) -> Dict[str, int]:
+    """Verify every sheet decodes, in whichever codec wrote it, and holds the last text each session typed"""
+    corrupt, lost = 0, 0
+    for filepath in storage_path.glob("*.json"):
+        try:
+            decode_document(filepath.read_bytes())
+        except Exception:
+            corrupt += 1
+
+    for session in sessions:
+        if session.char_id is None:
+            lost += 1
+            continue
+        filepath = storage_path / f"{session.char_id}.json"
+        try:
+            data = decode_document(filepath.read_bytes())
+        except Exception:
+            lost += 1
+            continue
+        journal = data.get('journal_entries', [])
+        stale = [line for line, text in session.expected_journal.items() if journal[line] != text]
+        if data.get('hero_name') != session.hero_name or stale:
+            print(f"session {session.index}: {session.char_id} lost journal lines {stale}", file=sys.stderr)
+            lost += 1
+
+    return {'corrupt_files': corrupt, 'sessions_with_data_loss': lost}
+
+
+def run_sessions(indices: List[int], edits: int, cadence: float, seed: int, start, results) -> None:
+    """Worker process: run some sessions in threads once start is set, then report them"""
+    players = [SimulatedSession(i, edits, cadence, seed) for i in indices]
+    threads = [threading.Thread(target=p.run, name=f"session-{p.index}") for p in players]
+    start.wait()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put(players)
+
+
+def run_load_test(sessions: int, edits: int, cadence: float, storage_path: Path, seed: int = 0,
+                  processes: int = 0) -> Dict:
+    """Run the simulation and return a summary report"""
+    processes = min(processes or sessions, sessions)
+    # Spawned workers inherit the environment; several processes share the store as replicas
+    os.environ["DRAGONSDOWN_STORAGE_PATH"] = str(storage_path)
+    if processes > 1:
+        os.environ["DRAGONSDOWN_REPLICA_MODE"] = "1"
+
+    context = multiprocessing.get_context("spawn")
+    start, results = context.Event(), context.Queue()
+    workers = [context.Process(target=run_sessions, name=f"sessions-{w}",
+                               args=(list(range(w, sessions, processes)), edits, cadence, seed, start, results))
+               for w in range(processes)]
+    for worker in workers:
+        worker.start()
+    began = time.perf_counter()
+    start.set()
+    players = []
+    for _ in workers:
+        players.extend(results.get())
+    elapsed = time.perf_counter() - began
+    for worker in workers:
+        worker.join()
+    players.sort(key=lambda p: p.index)
+
+    latencies = [latency for p in players for latency in p.latencies]
+    lock_waits = [wait for p in players for wait in p.lock_waits]
+    saves = sum(p.saves for p in players)
+    report = {
+        'sessions': sessions,
+        'processes': processes,
+        'reruns': len(latencies),
+        'elapsed_s': round(elapsed, 3),
+        'throughput_reruns_per_s': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+        'run_lock_wait_p50_ms': round(percentile(lock_waits, 50) * 1000, 1),
+        'run_lock_wait_p99_ms': round(percentile(lock_waits, 99) * 1000, 1),
+        'saves': saves,
+        'saves_per_s': round(saves / elapsed, 2) if elapsed else 0.0,
+        'session_errors': sum(len(p.errors) for p in players),
+    }
+    report.update(check_store(storage_path, players))
+    for p in players:
+        for error in p.errors[:3]:
+            print(f"session {p.index}: {error}", file=sys.stderr)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent players against main.py")
+    parser.add_argument("--sessions", type=int, default=8, help="Number of concurrent sessions")
+    parser.add_argument("--edits", type=int, default=20, help="Journal edits per session")
+    parser.add_argument("--cadence", type=float, default=0.2,
+                        help="Mean seconds between edits (exponentially distributed)")
+    parser.add_argument("--processes", type=int, default=0,
+                        help="Worker processes sharing the store (default: one per session)")
+    parser.add_argument("--storage", default=None,
+                        help="Character store to use (defaults to a temporary directory)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    storage_path = Path(args.storage) if args.storage else Path(tempfile.mkdtemp(prefix="load_test_"))
+    try:
+        report = run_load_test(args.sessions, args.edits, args.cadence, storage_path, args.seed,
+                               args.processes)
+    finally:
+        if not args.storage:
+            shutil.rmtree(storage_path, ignore_errors=True)
+
+    for key, value in report.items():
+        print(f"{key:<26} {value}")
+    if report['corrupt_files'] or report['sessions_with_data_loss']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Serialization benchmark
+Encode/decode time and bytes per sheet for every codec available here, on a
+played-through character (filled journal, half the hidden paths found).
+
+Usage:
+    python -m benchmarks.serialization --iterations 2000
+"""
+import argparse
+import time
+
+from repository.serialization import CODECS, decode_document
+
+REGIONS = ["Caves", "Mountains", "Woods", "Plains", "Swamps"]
+
+
+def make_character() -> dict:
+    hidden_paths = {}
+    for region in REGIONS:
+        for tile in range(5):
+            paths = [f"{side}-{side + tile % 3 + 1}_s{1 + side % 2}" for side in range(1, 5)]
+            hidden_paths[f"{region} tile {tile}"] = {path: bool((tile + i) % 2) for i, path in enumerate(paths)}
+    return {
+        'hero_name': "Aria Stormborn",
+        'lineage_and_class': "Elf Ranger",
+        'advantages': "Keen senses, Pathfinder, Forest friend",
+        'scenario': "The Sunken Crown",
+        'hero_story': "Raised on the edge of the Elder Woods, Aria left home to find the lost battalion. " * 3,
+        'date': "2024-01-01 12:00:00",
+        'hidden_paths': hidden_paths,
+        'discoveries': {f"discovery_{d}": d % 3 == 0 for d in range(15)},
+        'journal_entries': [f"Day {i}: crossed the pass, fought two wolves, found a shrine — {'é' * 3}"
+                            for i in range(30)],
+        'version': 42,
+    }
+
+
+def measure(func, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare character sheet codecs")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    character = make_character()
+    print(f"{'codec':<14}{'bytes':>8}{'encode us':>12}{'decode us':>12}")
+    for name, codec in CODECS.items():
+        data = codec.encode(character)
+        assert decode_document(data) == character
+        encode = measure(lambda: codec.encode(character), args.iterations)
+        decode = measure(lambda: decode_document(data), args.iterations)
+        print(f"{name:<14}{len(data):>8}{encode * 1e6:>12.1f}{decode * 1e6:>12.1f}")
+    missing = sorted({"orjson", "msgpack"} - set(CODECS))
+    if missing:
+        print(f"Not installed: {', '.join(missing)} (pip install {' '.join(missing)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,18 @@
 import streamlit as st
+import os
 import random
+import tempfile
+import time
 from datetime import datetime
-from repository import CharacterRepository
-from reference_tabs import render_game_reference
-from game_reference_repository import GameReferenceRepository
+from pathlib import Path
+from repository import Character, CharacterRepository, CharacterCache, VersionConflictError, instrument, metrics_from_env
+from repository.analytics import CharacterAnalytics
+from repository.bulk import export_characters, import_characters
+from repository.character_model import DISCOVERY_KEYS, HIDDEN_PATH_REGIONS
+from repository.ids import id_datetime, new_character_id, sort_key
+from repository.instrumentation import METRICS_PATH_ENV
+from reference_tabs import render_game_reference, get_repository as get_reference_repository
+from profiling import profiling_enabled, run_profiled
 
 # Set page configuration
 st.set_page_config(
@@ -285,12 +294,43 @@ st.markdown("""
 @st.cache_resource
 def get_repository():
     """Get or create the character repository instance"""
-    return CharacterRepository(storage_path="character_sheets")
+    storage_path = os.environ.get("DRAGONSDOWN_STORAGE_PATH", "character_sheets")
+    replica_mode = os.environ.get("DRAGONSDOWN_REPLICA_MODE", "") not in ("", "0")
+    codec = os.environ.get("DRAGONSDOWN_CODEC", "json")
+    repo = CharacterRepository(storage_path=storage_path, shared_manifest=replica_mode, codec=codec)
+    metrics = metrics_from_env()
+    if metrics:
+        instrument(repo, metrics)
+    return repo
+
+
+@st.cache_resource
+def get_character_cache():
+    """Get the process-wide character cache shared by all sessions"""
+    return CharacterCache(get_repository())
+
+@st.cache_resource
+def get_character_analytics():
+    """Get the process-wide analytics, kept current from the repository's change feed"""
+    return CharacterAnalytics(get_repository())
 
 # Initialize session state
-if 'characters' not in st.session_state:
-    repo = get_repository()
-    st.session_state.characters = repo.get_all()
+# Sessions hold only character ids; documents live in the shared cache
+if 'character_ids' not in st.session_state:
+    # Read the version first so changes made while listing are applied on the next sync
+    st.session_state.known_version = get_repository().get_version()
+    # Oldest first; new characters are appended, which keeps the order
+    st.session_state.character_ids = sorted(get_character_cache().list_ids(), key=sort_key)
+
+if 'editing_character_id' not in st.session_state:
+    st.session_state.editing_character_id = None
+    st.session_state.editing_character = None
+
+if 'dirty_fields' not in st.session_state:
+    st.session_state.dirty_fields = {}  # char_id -> set of document paths edited since the last save
+
+if 'save_conflicts' not in st.session_state:
+    st.session_state.save_conflicts = {}  # char_id -> version stored by someone else
 
 if 'current_character' not in st.session_state:
     st.session_state.current_character = None
@@ -327,42 +367,126 @@ if 'combat_tracker' not in st.session_state:
     }
 
 
-def save_character(char_id, char_data):
-    """Save character data using repository"""
-    repo = get_repository()
-    if repo.save(char_id, char_data):
-        st.session_state.characters[char_id] = char_data
+def sync_character_ids():
+    """Apply characters added or removed by other sessions since the last rerun"""
+    changes = get_repository().changes_since(st.session_state.known_version)
+    if changes is None:
+        # Too far behind the change log, reload the id list from the shared cache
+        st.session_state.known_version = get_repository().get_version()
+        st.session_state.character_ids = sorted(get_character_cache().list_ids(), key=sort_key)
+        return
+    
+    character_ids = st.session_state.character_ids
+    for char_id in changes['added']:
+        if char_id not in character_ids:
+            character_ids.append(char_id)
+    for char_id in changes['removed']:
+        if char_id in character_ids:
+            character_ids.remove(char_id)
+        if st.session_state.current_character == char_id:
+            st.session_state.current_character = None
+        if st.session_state.editing_character_id == char_id:
+            st.session_state.editing_character_id = None
+            st.session_state.editing_character = None
+    st.session_state.known_version = changes['version']
+
+
+def get_editing_character(char_id):
+    """Get this session's private copy of the character being edited"""
+    if st.session_state.editing_character_id != char_id:
+        character = get_character_cache().get_character(char_id)
+        st.session_state.editing_character_id = char_id
+        st.session_state.editing_character = character if character is not None else Character.empty()
+    return st.session_state.editing_character
+
+
+def reload_character(char_id):
+    """Discard this session's edits and widget state so the stored sheet is shown"""
+    suffix = f"_{char_id}"
+    for key in list(st.session_state.keys()):
+        if isinstance(key, str) and key.endswith(suffix) and not key.startswith("autosave_"):
+            del st.session_state[key]
+    st.session_state.editing_character_id = None
+    st.session_state.editing_character = None
+    st.session_state.save_conflicts.pop(char_id, None)
+    st.session_state.dirty_fields.pop(char_id, None)
+
+
+def mark_dirty(char_id, *path):
+    """Widget on_change callback: remember which field of the sheet was edited"""
+    st.session_state.dirty_fields.setdefault(char_id, set()).add(path)
+
+
+def save_dirty_fields(char_id, char_data, expected_version=None):
+    """Persist only the fields edited since the last save; nothing is written if none were"""
+    dirty = st.session_state.dirty_fields.get(char_id)
+    if not dirty:
+        return True
+    changes = {path: char_data.value_at(path) for path in dirty}
+    changes[('last_modified',)] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    try:
+        saved = get_character_cache().patch(char_id, changes, expected_version=expected_version)
+    except VersionConflictError as e:
+        st.session_state.save_conflicts[char_id] = e.actual_version
+        return False
+    if saved is None:
+        return False
+    st.session_state.save_conflicts.pop(char_id, None)
+    st.session_state.dirty_fields.pop(char_id, None)
+    if st.session_state.editing_character_id == char_id:
+        st.session_state.editing_character = saved
+    return True
+
+
+def save_character(char_id, char_data, expected_version=None):
+    """Save character data using repository, recording a conflict if the stored version moved on"""
+    char_data.last_modified = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    try:
+        saved = get_character_cache().save(char_id, char_data, expected_version=expected_version)
+    except VersionConflictError as e:
+        st.session_state.save_conflicts[char_id] = e.actual_version
+        return False
+    if saved:
+        st.session_state.save_conflicts.pop(char_id, None)
+        st.session_state.dirty_fields.pop(char_id, None)
+        if char_id not in st.session_state.character_ids:
+            st.session_state.character_ids.append(char_id)
+        if st.session_state.editing_character_id == char_id:
+            st.session_state.editing_character = char_data
         return True
     return False
 
 
 def delete_character(char_id):
     """Delete character using repository"""
-    repo = get_repository()
-    if repo.delete(char_id):
-        if char_id in st.session_state.characters:
-            del st.session_state.characters[char_id]
+    if get_character_cache().delete(char_id):
+        st.session_state.dirty_fields.pop(char_id, None)
+        if char_id in st.session_state.character_ids:
+            st.session_state.character_ids.remove(char_id)
+        if st.session_state.editing_character_id == char_id:
+            st.session_state.editing_character_id = None
+            st.session_state.editing_character = None
         return True
     return False
 
 
 def rename_character(old_char_id, new_char_id, char_data):
     """Rename character using repository"""
-    repo = get_repository()
-    if repo.rename(old_char_id, new_char_id):
+    if get_character_cache().rename(old_char_id, new_char_id):
         # Update session state
-        if old_char_id in st.session_state.characters:
-            del st.session_state.characters[old_char_id]
-        st.session_state.characters[new_char_id] = char_data
+        if old_char_id in st.session_state.character_ids:
+            st.session_state.character_ids.remove(old_char_id)
+        st.session_state.character_ids.append(new_char_id)
+        if st.session_state.editing_character_id == old_char_id:
+            st.session_state.editing_character_id = new_char_id
+            st.session_state.editing_character = char_data
         return True
     return False
 
 
-def create_character_id(hero_name):
-    """Create character ID from hero name and date"""
-    name_prefix = hero_name[:4] if hero_name else "CHAR"
-    date_str = datetime.now().strftime("%Y%m%d_%H%M%S")
-    return f"{name_prefix}_{date_str}"
+def create_character_id():
+    """Create a sortable, collision-free character ID (see repository/ids.py)"""
+    return new_character_id()
 
 
 def get_all_tiles_by_land_pack():
@@ -996,51 +1120,6 @@ def render_combat_tracker():
         st.info("No combat events logged yet")
 
 
-def get_empty_character():
-    """Return empty character template"""
-    return {
-        'hero_name': '',
-        'lineage_and_class': '',
-        'advantages': '',
-        'scenario': '',
-        'hero_story': '',
-        'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        'hidden_paths': {
-            'Ancient Hole': {'1-6_s1': False, '1-6_s2': False, '3-4_s2': False, '5-6_s2': False},
-            'Black Caves': {'3-4_s1': False, '1-6_s2': False, '3-4_s2': False, '5-6_s2': False},
-            'Dark Passes': {'1-4_s1': False, '3-6_s1': False, '1-4_s2': False, '2-3_s2': False, '3-6_s2': False},
-            'Forlorn Tunnel': {'1-5_s1': False, '2-3_s1': False, '1-5_s2': False, '2-3_s2': False, '2-6_s2': False, '4-5_s2': False},
-            'Secret Dens': {'5-6_s1': False, '2-3_s2': False},
-            'Barriers': {'1-3_s1': False, '1-3_s2': False, '1-6_s2': False},
-            'High Pass': {'1-5_s1': False, '1-5_s2': False, '3-4_s2': False},
-            'Lonely Mountains': {'2-5_s1': False, '2-5_s2': False, '3-4_s2': False},
-            'Narrow Ridges': {'5-6_s1': False, '3-4_s2': False, '5-6_s2': False},
-            'Tri-Peaks': {'1-5_s1': False, '4-5_s1': False, '2-6_s2': False, '4-5_s2': False},
-            'Deep Woods': {'1-3_s1': False, '1-6_s2': False},
-            'Elder Woods': {'4-6_s1': False, '3-4_s2': False},
-            'Mirky Woods': {'2-6_s1': False, '1-6_s2': False},
-            'Oakwood': {'1-6_s1': False, '1-3_s2': False},
-            'Timberlands': {'3-6_s1': False, '1-4_s2': False},
-            'Flatlands': {'1-2_s1': False, '5-6_s2': False},
-            'Grassy Plains': {'4-5_s1': False, '3-4_s2': False},
-            'The Meadows': {'1-5_s1': False, '2-3_s2': False},
-            'Twisted Steppe': {'1-6_s1': False, '4-6_s2': False},
-            'Unbroken Lands': {'1-3_s1': False, '2-4_s2': False},
-            'Decayed Swamp': {'5-6_s1': False, '4-5_s2': False},
-            'Foul Swamp': {'5-6_s1': False, '1-3_s2': False},
-            'Moorland': {'2-4_s1': False, '4-6_s2': False},
-            'Putrid Waters': {'2-5_s1': False, '4-6_s2': False},
-            'Quiet Bog': {'2-3_s1': False, '5-6_s2': False},
-        },
-        'discoveries': {
-            'altar': False, 'crypt': False, 'hoard': False, 'secret_cache': False, 'wrecked_wagons': False,
-            'catacombs': False, 'grotto': False, 'lost_battalion': False, 'shrine': False, 'deserted_ruins': False,
-            'chamber': False, 'hideout': False, 'monolith': False, 'trove': False, 'forgotten_city': False,
-        },
-        'journal_entries': [''] * 30
-    }
-
-
 def render_character_form(char_data, char_id=None):
     """Render the character sheet form"""
     
@@ -1070,15 +1149,17 @@ def render_character_form(char_data, char_id=None):
     
     # Character Info Section
     with st.expander("📋 Character Information", expanded=st.session_state.sections_expanded):
-        hero_name = st.text_input("Hero Name", value=char_data.get('hero_name', ''), key=f"hero_name_{char_id}")
+        hero_name = st.text_input("Hero Name", value=char_data.hero_name, key=f"hero_name_{char_id}",
+                                  on_change=mark_dirty, args=(char_id, 'hero_name'))
         
         # Lineage and Class with Random Generator
         col_lc1, col_lc2 = st.columns([3, 1])
         with col_lc1:
-            lineage_class = st.text_input("Lineage and Class", value=char_data.get('lineage_and_class', ''), key=f"lineage_{char_id}")
+            lineage_class = st.text_input("Lineage and Class", value=char_data.lineage_and_class, key=f"lineage_{char_id}",
+                                          on_change=mark_dirty, args=(char_id, 'lineage_and_class'))
         with col_lc2:
             if st.button("🎲 Random", key=f"random_lc_{char_id}", use_container_width=True, help="Generate random race and class"):
-                repo = GameReferenceRepository()
+                repo = get_reference_repository()
                 lineages = repo.get_all_lineages()
                 classes = repo.get_all_classes()
                 
@@ -1093,19 +1174,25 @@ def render_character_form(char_data, char_id=None):
                         st.session_state[f"lineage_{char_id}"] = random_text
                     if f"advantages_{char_id}" in st.session_state:
                         st.session_state[f"advantages_{char_id}"] = random_advantages
+                    # Programmatic changes do not fire on_change
+                    mark_dirty(char_id, 'lineage_and_class')
+                    mark_dirty(char_id, 'advantages')
                     st.rerun()
         
-        advantages = st.text_area("Advantages", value=char_data.get('advantages', ''), height=100, key=f"advantages_{char_id}")
+        advantages = st.text_area("Advantages", value=char_data.advantages, height=100, key=f"advantages_{char_id}",
+                                  on_change=mark_dirty, args=(char_id, 'advantages'))
     
     
     # Adventure Details Section
     with st.expander("📖 Adventure Details", expanded=st.session_state.sections_expanded):
-        scenario = st.text_area("Scenario", value=char_data.get('scenario', ''), height=100, key=f"scenario_{char_id}")
-        hero_story = st.text_area("Hero Story", value=char_data.get('hero_story', ''), height=150, key=f"story_{char_id}")
+        scenario = st.text_area("Scenario", value=char_data.scenario, height=100, key=f"scenario_{char_id}",
+                                on_change=mark_dirty, args=(char_id, 'scenario'))
+        hero_story = st.text_area("Hero Story", value=char_data.hero_story, height=150, key=f"story_{char_id}",
+                                  on_change=mark_dirty, args=(char_id, 'hero_story'))
     
     # Journal Entries Section
     with st.expander("📝 Adventure Journal (Lines 1-30)", expanded=st.session_state.sections_expanded):
-        journal_entries = char_data.get('journal_entries', [''] * 30)
+        journal_entries = list(char_data.journal)
         
         # Display journal in two columns
         col1, col2 = st.columns(2)
@@ -1117,7 +1204,9 @@ def render_character_form(char_data, char_id=None):
                     f"Line {i+1}", 
                     value=journal_entries[i], 
                     key=f"journal_{i}_{char_id}",
-                    label_visibility="collapsed"
+                    label_visibility="collapsed",
+                    on_change=mark_dirty,
+                    args=(char_id, 'journal_entries', i)
                 )
         
         with col2:
@@ -1127,53 +1216,18 @@ def render_character_form(char_data, char_id=None):
                     f"Line {i+1}", 
                     value=journal_entries[i], 
                     key=f"journal_{i}_{char_id}",
-                    label_visibility="collapsed"
+                    label_visibility="collapsed",
+                    on_change=mark_dirty,
+                    args=(char_id, 'journal_entries', i)
                 )
     
     # Hidden Paths Section
     with st.expander("🗺️ Hidden Paths Found", expanded=st.session_state.sections_expanded):
         st.caption("Check the boxes for the tile connections you've discovered")
         
-        hidden_paths = char_data.get('hidden_paths', get_empty_character()['hidden_paths'])
-        
-        # Define the hidden path configurations based on the image
-        hidden_path_config = {
-            'Caves': {
-                'Ancient Hole': {'Tile Side 1': ['1-6'], 'Tile Side 2': ['1-6', '3-4', '5-6']},
-                'Black Caves': {'Tile Side 1': ['3-4'], 'Tile Side 2': ['1-6', '3-4', '5-6']},
-                'Dark Passes': {'Tile Side 1': ['1-4', '3-6'], 'Tile Side 2': ['1-4', '2-3', '3-6']},
-                'Forlorn Tunnel': {'Tile Side 1': ['1-5', '2-3'], 'Tile Side 2': ['1-5', '2-3', '2-6', '4-5']},
-                'Secret Dens': {'Tile Side 1': ['5-6'], 'Tile Side 2': ['2-3']},
-            },
-            'Mountains': {
-                'Barriers': {'Tile Side 1': ['1-3'], 'Tile Side 2': ['1-3', '1-6']},
-                'High Pass': {'Tile Side 1': ['1-5'], 'Tile Side 2': ['1-5', '3-4']},
-                'Lonely Mountains': {'Tile Side 1': ['2-5'], 'Tile Side 2': ['2-5', '3-4']},
-                'Narrow Ridges': {'Tile Side 1': ['5-6'], 'Tile Side 2': ['3-4', '5-6']},
-                'Tri-Peaks': {'Tile Side 1': ['1-5', '4-5'], 'Tile Side 2': ['2-6', '4-5']},
-            },
-            'Woods': {
-                'Deep Woods': {'Tile Side 1': ['1-3'], 'Tile Side 2': ['1-6']},
-                'Elder Woods': {'Tile Side 1': ['4-6'], 'Tile Side 2': ['3-4']},
-                'Mirky Woods': {'Tile Side 1': ['2-6'], 'Tile Side 2': ['1-6']},
-                'Oakwood': {'Tile Side 1': ['1-6'], 'Tile Side 2': ['1-3']},
-                'Timberlands': {'Tile Side 1': ['3-6'], 'Tile Side 2': ['1-4']},
-            },
-            'Plains': {
-                'Flatlands': {'Tile Side 1': ['1-2'], 'Tile Side 2': ['5-6']},
-                'Grassy Plains': {'Tile Side 1': ['4-5'], 'Tile Side 2': ['3-4']},
-                'The Meadows': {'Tile Side 1': ['1-5'], 'Tile Side 2': ['2-3']},
-                'Twisted Steppe': {'Tile Side 1': ['1-6'], 'Tile Side 2': ['4-6']},
-                'Unbroken Lands': {'Tile Side 1': ['1-3'], 'Tile Side 2': ['2-4']},
-            },
-            'Swamps': {
-                'Decayed Swamp': {'Tile Side 1': ['5-6'], 'Tile Side 2': ['4-5']},
-                'Foul Swamp': {'Tile Side 1': ['5-6'], 'Tile Side 2': ['1-3']},
-                'Moorland': {'Tile Side 1': ['2-4'], 'Tile Side 2': ['4-6']},
-                'Putrid Waters': {'Tile Side 1': ['2-5'], 'Tile Side 2': ['4-6']},
-                'Quiet Bog': {'Tile Side 1': ['2-3'], 'Tile Side 2': ['5-6']},
-            }
-        }
+        hidden_paths = char_data.paths
+        
+        hidden_path_config = HIDDEN_PATH_REGIONS
         
         # Render each region as a collapsible expander
         with st.expander("🏔️ Caves", expanded=st.session_state.sections_expanded):
@@ -1186,34 +1240,34 @@ def render_character_form(char_data, char_id=None):
                     st.caption("Tile Side 1")
                     for path in sides['Tile Side 1']:
                         key = f"{path}_s1"
-                        # Initialize if not exists
-                        if location not in hidden_paths:
-                            hidden_paths[location] = {}
-                        if key not in hidden_paths[location]:
-                            hidden_paths[location][key] = False
-                            
-                        hidden_paths[location][key] = st.checkbox(
+                        mask = Character.path_mask(location, key)
+                        if st.checkbox(
                             path,
-                            value=hidden_paths[location].get(key, False),
-                            key=f"hp_{location}_{key}_{char_id}"
-                        )
+                            value=bool(hidden_paths & mask),
+                            key=f"hp_{location}_{key}_{char_id}",
+                            on_change=mark_dirty,
+                            args=(char_id, 'hidden_paths', location, key)
+                        ):
+                            hidden_paths |= mask
+                        else:
+                            hidden_paths &= ~mask
                 
                 # Tile Side 2
                 with cols[1]:
                     st.caption("Tile Side 2")
                     for path in sides['Tile Side 2']:
                         key = f"{path}_s2"
-                        # Initialize if not exists
-                        if location not in hidden_paths:
-                            hidden_paths[location] = {}
-                        if key not in hidden_paths[location]:
-                            hidden_paths[location][key] = False
-                            
-                        hidden_paths[location][key] = st.checkbox(
+                        mask = Character.path_mask(location, key)
+                        if st.checkbox(
                             path,
-                            value=hidden_paths[location].get(key, False),
-                            key=f"hp_{location}_{key}_{char_id}"
-                        )
+                            value=bool(hidden_paths & mask),
+                            key=f"hp_{location}_{key}_{char_id}",
+                            on_change=mark_dirty,
+                            args=(char_id, 'hidden_paths', location, key)
+                        ):
+                            hidden_paths |= mask
+                        else:
+                            hidden_paths &= ~mask
         
         with st.expander("⛰️ Mountains", expanded=st.session_state.sections_expanded):
             for location, sides in hidden_path_config['Mountains'].items():
@@ -1225,32 +1279,34 @@ def render_character_form(char_data, char_id=None):
                     st.caption("Tile Side 1")
                     for path in sides['Tile Side 1']:
                         key = f"{path}_s1"
-                        if location not in hidden_paths:
-                            hidden_paths[location] = {}
-                        if key not in hidden_paths[location]:
-                            hidden_paths[location][key] = False
-                            
-                        hidden_paths[location][key] = st.checkbox(
+                        mask = Character.path_mask(location, key)
+                        if st.checkbox(
                             path,
-                            value=hidden_paths[location].get(key, False),
-                            key=f"hp_{location}_{key}_{char_id}"
-                        )
+                            value=bool(hidden_paths & mask),
+                            key=f"hp_{location}_{key}_{char_id}",
+                            on_change=mark_dirty,
+                            args=(char_id, 'hidden_paths', location, key)
+                        ):
+                            hidden_paths |= mask
+                        else:
+                            hidden_paths &= ~mask
                 
                 # Tile Side 2
                 with cols[1]:
                     st.caption("Tile Side 2")
                     for path in sides['Tile Side 2']:
                         key = f"{path}_s2"
-                        if location not in hidden_paths:
-                            hidden_paths[location] = {}
-                        if key not in hidden_paths[location]:
-                            hidden_paths[location][key] = False
-                            
-                        hidden_paths[location][key] = st.checkbox(
+                        mask = Character.path_mask(location, key)
+                        if st.checkbox(
                             path,
-                            value=hidden_paths[location].get(key, False),
-                            key=f"hp_{location}_{key}_{char_id}"
-                        )
+                            value=bool(hidden_paths & mask),
+                            key=f"hp_{location}_{key}_{char_id}",
+                            on_change=mark_dirty,
+                            args=(char_id, 'hidden_paths', location, key)
+                        ):
+                            hidden_paths |= mask
+                        else:
+                            hidden_paths &= ~mask
         
         with st.expander("🌲 Woods", expanded=st.session_state.sections_expanded):
             for location, sides in hidden_path_config['Woods'].items():
@@ -1262,32 +1318,34 @@ def render_character_form(char_data, char_id=None):
                     st.caption("Tile Side 1")
                     for path in sides['Tile Side 1']:
                         key = f"{path}_s1"
-                        if location not in hidden_paths:
-                            hidden_paths[location] = {}
-                        if key not in hidden_paths[location]:
-                            hidden_paths[location][key] = False
-                            
-                        hidden_paths[location][key] = st.checkbox(
+                        mask = Character.path_mask(location, key)
+                        if st.checkbox(
                             path,
-                            value=hidden_paths[location].get(key, False),
-                            key=f"hp_{location}_{key}_{char_id}"
-                        )
+                            value=bool(hidden_paths & mask),
+                            key=f"hp_{location}_{key}_{char_id}",
+                            on_change=mark_dirty,
+                            args=(char_id, 'hidden_paths', location, key)
+                        ):
+                            hidden_paths |= mask
+                        else:
+                            hidden_paths &= ~mask
                 
                 # Tile Side 2
                 with cols[1]:
                     st.caption("Tile Side 2")
                     for path in sides['Tile Side 2']:
                         key = f"{path}_s2"
-                        if location not in hidden_paths:
-                            hidden_paths[location] = {}
-                        if key not in hidden_paths[location]:
-                            hidden_paths[location][key] = False
-                            
-                        hidden_paths[location][key] = st.checkbox(
+                        mask = Character.path_mask(location, key)
+                        if st.checkbox(
                             path,
-                            value=hidden_paths[location].get(key, False),
-                            key=f"hp_{location}_{key}_{char_id}"
-                        )
+                            value=bool(hidden_paths & mask),
+                            key=f"hp_{location}_{key}_{char_id}",
+                            on_change=mark_dirty,
+                            args=(char_id, 'hidden_paths', location, key)
+                        ):
+                            hidden_paths |= mask
+                        else:
+                            hidden_paths &= ~mask
         
         with st.expander("🌾 Plains", expanded=st.session_state.sections_expanded):
             for location, sides in hidden_path_config['Plains'].items():
@@ -1299,32 +1357,34 @@ def render_character_form(char_data, char_id=None):
                     st.caption("Tile Side 1")
                     for path in sides['Tile Side 1']:
                         key = f"{path}_s1"
-                        if location not in hidden_paths:
-                            hidden_paths[location] = {}
-                        if key not in hidden_paths[location]:
-                            hidden_paths[location][key] = False
-                            
-                        hidden_paths[location][key] = st.checkbox(
+                        mask = Character.path_mask(location, key)
+                        if st.checkbox(
                             path,
-                            value=hidden_paths[location].get(key, False),
-                            key=f"hp_{location}_{key}_{char_id}"
-                        )
+                            value=bool(hidden_paths & mask),
+                            key=f"hp_{location}_{key}_{char_id}",
+                            on_change=mark_dirty,
+                            args=(char_id, 'hidden_paths', location, key)
+                        ):
+                            hidden_paths |= mask
+                        else:
+                            hidden_paths &= ~mask
                 
                 # Tile Side 2
                 with cols[1]:
                     st.caption("Tile Side 2")
                     for path in sides['Tile Side 2']:
                         key = f"{path}_s2"
-                        if location not in hidden_paths:
-                            hidden_paths[location] = {}
-                        if key not in hidden_paths[location]:
-                            hidden_paths[location][key] = False
-                            
-                        hidden_paths[location][key] = st.checkbox(
+                        mask = Character.path_mask(location, key)
+                        if st.checkbox(
                             path,
-                            value=hidden_paths[location].get(key, False),
-                            key=f"hp_{location}_{key}_{char_id}"
-                        )
+                            value=bool(hidden_paths & mask),
+                            key=f"hp_{location}_{key}_{char_id}",
+                            on_change=mark_dirty,
+                            args=(char_id, 'hidden_paths', location, key)
+                        ):
+                            hidden_paths |= mask
+                        else:
+                            hidden_paths &= ~mask
         
         with st.expander("🌿 Swamps", expanded=st.session_state.sections_expanded):
             for location, sides in hidden_path_config['Swamps'].items():
@@ -1336,76 +1396,103 @@ def render_character_form(char_data, char_id=None):
                     st.caption("Tile Side 1")
                     for path in sides['Tile Side 1']:
                         key = f"{path}_s1"
-                        if location not in hidden_paths:
-                            hidden_paths[location] = {}
-                        if key not in hidden_paths[location]:
-                            hidden_paths[location][key] = False
-                            
-                        hidden_paths[location][key] = st.checkbox(
+                        mask = Character.path_mask(location, key)
+                        if st.checkbox(
                             path,
-                            value=hidden_paths[location].get(key, False),
-                            key=f"hp_{location}_{key}_{char_id}"
-                        )
+                            value=bool(hidden_paths & mask),
+                            key=f"hp_{location}_{key}_{char_id}",
+                            on_change=mark_dirty,
+                            args=(char_id, 'hidden_paths', location, key)
+                        ):
+                            hidden_paths |= mask
+                        else:
+                            hidden_paths &= ~mask
                 
                 # Tile Side 2
                 with cols[1]:
                     st.caption("Tile Side 2")
                     for path in sides['Tile Side 2']:
                         key = f"{path}_s2"
-                        if location not in hidden_paths:
-                            hidden_paths[location] = {}
-                        if key not in hidden_paths[location]:
-                            hidden_paths[location][key] = False
-                            
-                        hidden_paths[location][key] = st.checkbox(
+                        mask = Character.path_mask(location, key)
+                        if st.checkbox(
                             path,
-                            value=hidden_paths[location].get(key, False),
-                            key=f"hp_{location}_{key}_{char_id}"
-                        )
+                            value=bool(hidden_paths & mask),
+                            key=f"hp_{location}_{key}_{char_id}",
+                            on_change=mark_dirty,
+                            args=(char_id, 'hidden_paths', location, key)
+                        ):
+                            hidden_paths |= mask
+                        else:
+                            hidden_paths &= ~mask
     
     # Discoveries Section
     st.header("Discoveries")
-    discoveries = char_data.get('discoveries', get_empty_character()['discoveries'])
+    discoveries = char_data.discoveries
     
     cols = st.columns(5)
-    discovery_items = list(discoveries.keys())
     
-    for idx, discovery in enumerate(discovery_items):
+    for idx, discovery in enumerate(DISCOVERY_KEYS):
         col_idx = idx % 5
-        discoveries[discovery] = cols[col_idx].checkbox(
+        mask = Character.discovery_mask(discovery)
+        if cols[col_idx].checkbox(
             discovery.replace('_', ' ').title(),
-            value=discoveries.get(discovery, False),
-            key=f"discovery_{discovery}_{char_id}"
-        )
-    
-    # Update character data
-    updated_char_data = {
-        'hero_name': hero_name,
-        'lineage_and_class': lineage_class,
-        'advantages': advantages,
-        'scenario': scenario,
-        'hero_story': hero_story,
-        'date': char_data.get('date', datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
-        'last_modified': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        'hidden_paths': hidden_paths,
-        'discoveries': discoveries,
-        'journal_entries': journal_entries
-    }
-    
-    # Auto-save
+            value=bool(discoveries & mask),
+            key=f"discovery_{discovery}_{char_id}",
+            on_change=mark_dirty,
+            args=(char_id, 'discoveries', discovery)
+        ):
+            discoveries |= mask
+        else:
+            discoveries &= ~mask
+    
+    # Update character data (keeps the version this sheet was loaded at;
+    # saves only succeed if it is still current)
+    updated_char_data = char_data.replace(
+        hero_name=hero_name,
+        lineage_and_class=lineage_class,
+        advantages=advantages,
+        scenario=scenario,
+        hero_story=hero_story,
+        date=char_data.date or datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        journal=tuple(journal_entries),
+        paths=hidden_paths,
+        discoveries=discoveries,
+    )
+    
+    # Auto-save only the fields edited since the last save
     if autosave and char_id and char_id != "new_character":
-        if updated_char_data != char_data:
-            save_character(char_id, updated_char_data)
-            st.caption("✅ Auto-saved")
+        if st.session_state.dirty_fields.get(char_id):
+            if save_dirty_fields(char_id, updated_char_data, expected_version=updated_char_data.version):
+                st.caption("✅ Auto-saved")
     elif autosave and char_id == "new_character" and hero_name:
         # Auto-save for new character - create it when hero name is entered
-        new_char_id = create_character_id(hero_name)
-        if save_character(new_char_id, updated_char_data):
+        new_char_id = create_character_id()
+        if save_character(new_char_id, updated_char_data, expected_version=0):
             st.session_state.current_character = new_char_id
             st.session_state.show_create_form = False
+            st.session_state.dirty_fields.pop("new_character", None)
             st.caption(f"✅ Auto-saved as: {new_char_id}")
             st.rerun()
     
+    # Someone else saved this character since it was loaded
+    conflict_version = st.session_state.save_conflicts.get(char_id)
+    if conflict_version is not None:
+        st.warning(
+            f"⚠️ This character was changed in another tab or session (now version {conflict_version}). "
+            "Your latest edits have not been saved."
+        )
+        col_c1, col_c2, col_c3 = st.columns([1, 1, 3])
+        with col_c1:
+            if st.button("🔄 Load Their Version", key=f"conflict_reload_{char_id}", use_container_width=True):
+                reload_character(char_id)
+                st.rerun()
+        with col_c2:
+            if st.button("💾 Keep My Version", key=f"conflict_overwrite_{char_id}", use_container_width=True,
+                         help="Write the fields you edited on top of their version"):
+                if save_dirty_fields(char_id, updated_char_data, expected_version=conflict_version):
+                    reload_character(char_id)
+                    st.rerun()
+    
     # Save Button
     st.markdown("---")
     col1, col2, col3 = st.columns([1, 1, 3])
@@ -1413,31 +1500,20 @@ def render_character_form(char_data, char_id=None):
     with col1:
         if st.button("💾 Save Character", type="primary", use_container_width=True):
             if char_id and char_id != "new_character":
-                # Check if hero name changed
-                old_char_data = st.session_state.characters.get(char_id, {})
-                if hero_name != old_char_data.get('hero_name', ''):
-                    # Create new ID with updated name
-                    new_char_id = create_character_id(hero_name)
-                    
-                    # Save with new ID and delete old
-                    if save_character(new_char_id, updated_char_data):
-                        delete_character(char_id)
-                        st.session_state.current_character = new_char_id
-                        st.success(f"✅ Character saved as: {new_char_id}")
-                        st.rerun()
-                    else:
-                        st.error("❌ Failed to save character")
+                # IDs no longer contain the hero name, so a rename is an ordinary field edit
+                if save_dirty_fields(char_id, updated_char_data, expected_version=updated_char_data.version):
+                    st.success("✅ Character saved successfully!")
+                elif char_id in st.session_state.save_conflicts:
+                    st.error("❌ Not saved: this character was changed elsewhere")
                 else:
-                    if save_character(char_id, updated_char_data):
-                        st.success("✅ Character saved successfully!")
-                    else:
-                        st.error("❌ Failed to save character")
+                    st.error("❌ Failed to save character")
             else:
                 # New character
-                new_char_id = create_character_id(hero_name)
-                if save_character(new_char_id, updated_char_data):
+                new_char_id = create_character_id()
+                if save_character(new_char_id, updated_char_data, expected_version=0):
                     st.session_state.current_character = new_char_id
                     st.session_state.show_create_form = False
+                    st.session_state.dirty_fields.pop("new_character", None)
                     st.success(f"✅ Character created: {new_char_id}")
                     st.rerun()
                 else:
@@ -1451,9 +1527,257 @@ def render_character_form(char_data, char_id=None):
                 st.rerun()
             else:
                 st.error("❌ Failed to delete character")
+    
+    if char_id and char_id != "new_character":
+        render_history(char_id, updated_char_data.version)
+        render_progress(char_id)
+
+
+def render_progress(char_id):
+    """Chart a character's hidden paths, discoveries and journal over time (read only when opened)"""
+    if not st.toggle("📈 Progress over time", key=f"progress_{char_id}"):
+        return
+    
+    points = get_repository().get_progress(char_id)
+    if len(points) < 2:
+        st.caption("Progress is charted once the character has been saved a few times.")
+        return
+    st.line_chart({
+        'time': [datetime.fromtimestamp(point['time'] / 1000) for point in points],
+        'Hidden paths': [point['paths'] for point in points],
+        'Discoveries': [point['discoveries'] for point in points],
+        'Journal lines': [point['journal_lines'] for point in points],
+    }, x='time')
+
+
+def format_history_path(path):
+    """Readable name of a document path from a version diff"""
+    if path[0] == 'journal_entries':
+        return f"Journal line {path[1] + 1}"
+    return " / ".join(str(part) for part in path)
+
+
+def render_history(char_id, current_version):
+    """Render the version list of a character with diff and restore (read only when opened)"""
+    if not st.toggle("🕘 Version history", key=f"history_{char_id}"):
+        return
+    
+    repository = get_repository()
+    versions = [entry for entry in repository.list_versions(char_id) if entry['version'] != current_version]
+    if not versions:
+        st.caption("No earlier versions recorded yet.")
+        return
+    
+    by_version = {entry['version']: entry for entry in versions}
+    selected = st.selectbox(
+        "Version",
+        options=[entry['version'] for entry in reversed(versions)],
+        format_func=lambda version: (f"v{version} · {by_version[version]['last_modified'] or 'unknown time'}"
+                                     f" · changed: {', '.join(by_version[version]['changed']) or 'nothing'}"),
+        key=f"history_version_{char_id}",
+    )
+    
+    changes = repository.diff_versions(char_id, selected, current_version)
+    if changes:
+        st.caption(f"Restoring v{selected} undoes these changes made since:")
+        lines = [f"- **{format_history_path(path)}**: {old!r} → {new!r}"
+                 for path, (old, new) in changes.items() if path != ('last_modified',)]
+        st.markdown("\n".join(lines[:50]) + (f"\n- … and {len(lines) - 50} more" if len(lines) > 50 else ""))
+    
+    if st.button(f"⏪ Restore v{selected}", key=f"history_restore_{char_id}"):
+        try:
+            if repository.restore(char_id, selected, expected_version=current_version):
+                reload_character(char_id)
+                st.rerun()
+            else:
+                st.error("❌ Failed to restore character")
+        except VersionConflictError:
+            st.error("❌ Not restored: this character was changed elsewhere")
+
+
+def search_match_text(character, field, line):
+    """Text of one matched line of a search result"""
+    if field == 'journal_entries':
+        return character.journal[line] if line < len(character.journal) else ''
+    lines = getattr(character, field).splitlines()
+    return lines[line] if line < len(lines) else ''
+
+
+def render_character_search():
+    """Search all journals, stories and scenarios from the sidebar"""
+    query = st.text_input("🔎 Search journals", key="journal_search", placeholder="e.g. lost battalion")
+    if not query.strip():
+        return
+    
+    results = get_repository().search(query, limit=10)
+    if not results:
+        st.caption("No character mentions that.")
+        return
+    
+    cache = get_character_cache()
+    labels = {'journal_entries': "Journal", 'hero_story': "Story", 'scenario': "Scenario"}
+    for result in results:
+        char_id = result['character_id']
+        character = cache.get_character(char_id)
+        if character is None:
+            continue
+        if st.button(character.hero_name or char_id, key=f"search_{char_id}", use_container_width=True):
+            st.session_state.current_character = char_id
+            st.session_state.show_create_form = False
+            st.session_state.show_realm_builder = False
+            st.session_state.show_combat_tracker = False
+            st.session_state.show_game_reference = False
+            st.rerun()
+        for field, line in result['matches'][:3]:
+            line_label = f"{labels[field]} {line + 1}" if field == 'journal_entries' else labels[field]
+            st.caption(f"{line_label}: {search_match_text(character, field, line)[:80]}")
+
+
+def render_metrics_admin():
+    """Render the hidden repository metrics page (open with ?admin=metrics)"""
+    st.title("📈 Repository Metrics")
+    
+    metrics = metrics_from_env()
+    if metrics is None:
+        st.info(f"Instrumentation is disabled. Set {METRICS_PATH_ENV} to an export path to enable it.")
+    elif not metrics.snapshot():
+        st.caption(f"Exported to {os.environ[METRICS_PATH_ENV]}")
+        st.info("No repository calls recorded yet")
+    else:
+        st.caption(f"Exported to {os.environ[METRICS_PATH_ENV]}")
+        rows = [
+            {
+                'Repository': entry['repository'],
+                'Method': entry['method'],
+                'Calls': entry['calls'],
+                'Errors': entry['errors'],
+                'Total (ms)': round(entry['latency_sum_s'] * 1000, 1),
+                'p50 (ms)': entry['p50_s'] * 1000,
+                'p95 (ms)': entry['p95_s'] * 1000,
+                'p99 (ms)': entry['p99_s'] * 1000,
+                'Bytes read': entry['bytes_read'],
+                'Bytes written': entry['bytes_written'],
+            }
+            for entry in metrics.snapshot()
+        ]
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+        
+        with st.expander("Prometheus text", expanded=False):
+            st.code(metrics.to_prometheus(), language=None)
+    
+    st.subheader("🔒 Lock Contention")
+    lock_stats = get_repository().locks.stats()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Acquisitions", lock_stats['acquisitions'])
+    col2.metric("Contended", f"{lock_stats['contended']} ({lock_stats['contention_rate']:.1%})")
+    col3.metric("Total wait (ms)", f"{lock_stats['wait_seconds'] * 1000:.1f}")
+    col4.metric("Max wait (ms)", f"{lock_stats['max_wait_seconds'] * 1000:.1f}")
+    st.caption(f"{lock_stats['stripes']} stripes, cross-process file locks "
+               f"{'enabled' if lock_stats['process_locks'] else 'disabled'}")
+
+
+def render_analytics_admin():
+    """Render the hidden cross-character analytics page (open with ?admin=analytics)"""
+    st.title("📊 Character Analytics")
+    
+    analytics = get_character_analytics()
+    start = time.perf_counter()
+    analytics.refresh()
+    tiles = analytics.tile_completion()
+    land_packs = analytics.land_pack_completion()
+    discoveries = analytics.discovery_rates()
+    missed = analytics.most_missed_paths(limit=15)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Characters", analytics.character_count())
+    col2.metric("Paths found (avg)", f"{land_packs.mean():.1%}" if len(land_packs) else "–")
+    col3.metric("Discoveries made (avg)", f"{discoveries.mean():.1%}" if len(discoveries) else "–")
+    st.caption(f"Computed in {elapsed_ms:.0f} ms · {analytics.full_loads} full load(s), "
+               f"{analytics.rows_updated} incremental row update(s) since start")
+    
+    st.subheader("Completion per Land Pack")
+    st.bar_chart(land_packs)
+    
+    st.subheader("Discoveries")
+    st.bar_chart(discoveries)
+    
+    st.subheader("Completion per Tile")
+    st.dataframe(tiles.reset_index(), use_container_width=True, hide_index=True,
+                 column_config={'completion': st.column_config.ProgressColumn("completion", min_value=0, max_value=1)})
+    
+    st.subheader("Most Commonly Missed Hidden Paths")
+    st.dataframe(missed.reset_index(), use_container_width=True, hide_index=True)
+    
+    # Running totals kept by the repository on every write
+    stats = get_repository().get_statistics()
+    if stats:
+        st.subheader("Characters per Lineage / Class")
+        col1, col2 = st.columns(2)
+        col1.metric("Journals started", f"{stats['journals_started']} of {stats['characters']}")
+        col2.metric("Journal lines written", stats['journal_lines'])
+        if stats['lineage_and_class']:
+            st.bar_chart(stats['lineage_and_class'])
+
+
+def render_backup_admin():
+    """Render the hidden bulk export/import page (open with ?admin=backup)"""
+    st.title("💾 Backup")
+    repository = get_repository()
+    
+    st.subheader("Export")
+    compress = st.checkbox("Compress (gzip)", value=True)
+    if st.button("Prepare export", type="primary"):
+        character_ids = sorted(repository.list_character_ids(), key=sort_key)
+        suffix = ".ndjson.gz" if compress else ".ndjson"
+        # Streamed to a temporary file, so the export never sits in memory as a whole
+        path = Path(tempfile.gettempdir()) / f"dragonsdown-{datetime.now():%Y%m%d_%H%M%S}{suffix}"
+        bar = st.progress(0.0, text="Exporting...")
+        done = 0
+        
+        def advance(count):
+            nonlocal done
+            done += count
+            bar.progress(done / max(len(character_ids), 1), text=f"Exporting... {done:,}/{len(character_ids):,}")
+        
+        stats = export_characters(repository, path, compress=compress, character_ids=character_ids, progress=advance)
+        bar.empty()
+        st.session_state.backup_export = (str(path), stats.summary("exported"), stats.problems)
+    
+    if st.session_state.get('backup_export'):
+        path, summary, problems = st.session_state.backup_export
+        if os.path.exists(path):
+            st.caption(summary)
+            for character_id, messages in problems.items():
+                st.warning(f"{character_id}: {'; '.join(messages)}")
+            with open(path, 'rb') as f:
+                st.download_button("⬇️ Download export", f, file_name=os.path.basename(path),
+                                   mime="application/gzip" if path.endswith(".gz") else "application/x-ndjson")
+    
+    st.subheader("Import")
+    uploaded = st.file_uploader("NDJSON export, plain or gzip", type=["ndjson", "jsonl", "gz"])
+    skip_existing = st.checkbox("Keep characters that already exist", value=True)
+    if uploaded is not None and st.button("Import"):
+        status = st.empty()
+        done = 0
+        
+        def advance(count):
+            nonlocal done
+            done += count
+            status.caption(f"Importing... {done:,} sheets")
+        
+        stats = import_characters(repository, uploaded, skip_existing=skip_existing, progress=advance)
+        status.empty()
+        st.success(stats.summary("imported"))
+        if stats.problems:
+            with st.expander(f"{len(stats.problems)} problem(s)", expanded=True):
+                for key, messages in stats.problems.items():
+                    st.text(f"{key}: {'; '.join(messages)}")
 
 
 def main():
+    sync_character_ids()
+    
     # Sidebar
     with st.sidebar:
         st.title("📜 Character Sheets")
@@ -1496,16 +1820,19 @@ def main():
         
         st.markdown("---")
         
+        render_character_search()
+        
         # List existing characters
-        if st.session_state.characters:
+        if st.session_state.character_ids:
             st.subheader("Your Characters")
-            for char_id, char_data in st.session_state.characters.items():
-                hero_name = char_data.get('hero_name', 'Unnamed')
+            cache = get_character_cache()
+            for char_id in st.session_state.character_ids:
+                hero_name = cache.hero_name(char_id)
                 display_name = hero_name[:4] if hero_name else char_id[:4]
                 
-                # Extract date from char_id
-                date_part = char_id.split('_', 1)[1] if '_' in char_id else ''
-                label = f"{display_name}_{date_part}" if date_part else display_name
+                # Creation time is encoded in both ULID and legacy IDs
+                created = id_datetime(char_id)
+                label = f"{display_name}_{created:%Y%m%d_%H%M%S}" if created else display_name
                 
                 if st.button(label, key=f"btn_{char_id}", use_container_width=True):
                     st.session_state.current_character = char_id
@@ -1521,17 +1848,23 @@ def main():
         st.caption("Dragons Down Adventure Journal v1.0")
     
     # Main content area
-    if st.session_state.show_realm_builder:
+    if st.query_params.get("admin") == "metrics":
+        render_metrics_admin()
+    elif st.query_params.get("admin") == "analytics":
+        render_analytics_admin()
+    elif st.query_params.get("admin") == "backup":
+        render_backup_admin()
+    elif st.session_state.show_realm_builder:
         render_realm_builder()
     elif st.session_state.show_combat_tracker:
         render_combat_tracker()
     elif st.session_state.show_game_reference:
         render_game_reference()
     elif st.session_state.show_create_form:
-        render_character_form(get_empty_character())
+        render_character_form(Character.empty())
     elif st.session_state.current_character:
         char_id = st.session_state.current_character
-        char_data = st.session_state.characters.get(char_id, get_empty_character())
+        char_data = get_editing_character(char_id)
         render_character_form(char_data, char_id)
     else:
         st.title("🐉 Dragons Down Adventure Journal")
@@ -1575,8 +1908,15 @@ def main():
             </p>
         </div>
         """, unsafe_allow_html=True)
+    
+    metrics = metrics_from_env()
+    if metrics:
+        metrics.export_if_due(os.environ[METRICS_PATH_ENV])
 
 
 if __name__ == "__main__":
-    main()
+    if profiling_enabled():
+        run_profiled(main)
+    else:
+        main()
 
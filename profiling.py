@@ -0,0 +1,82 @@
+"""
+Per-rerun profiling for the Streamlit app
+Set DRAGONSDOWN_PROFILE_DIR to run every rerun of main() under cProfile.
+Stats files are tagged with the view the rerun ended on; the top hotspots are shown in an expander.
+"""
+import cProfile
+import io
+import os
+import pstats
+import re
+import time
+from datetime import datetime
+from pathlib import Path
+
+import streamlit as st
+
+
+PROFILE_DIR_ENV = "DRAGONSDOWN_PROFILE_DIR"
+PROFILE_TOP_N_ENV = "DRAGONSDOWN_PROFILE_TOP_N"
+
+
+def profiling_enabled() -> bool:
+    """Check whether per-rerun profiling is switched on"""
+    return bool(os.environ.get(PROFILE_DIR_ENV))
+
+
+def active_view() -> str:
+    """Name of the view the current rerun renders, derived from ?admin= and the show_* flags"""
+    admin = st.query_params.get("admin")
+    if admin:
+        # Query parameters are user input; keep them out of the file path
+        return "admin_" + re.sub(r"\W", "_", admin)
+    state = st.session_state
+    if state.get('show_realm_builder'):
+        return 'realm_builder'
+    if state.get('show_combat_tracker'):
+        return 'combat_tracker'
+    if state.get('show_game_reference'):
+        return 'game_reference'
+    if state.get('show_create_form'):
+        return 'create_character'
+    if state.get('current_character'):
+        return 'character_form'
+    return 'home'
+
+
+def run_profiled(main_func):
+    """
+    Run one rerun of the app under cProfile
+
+    Writes <view>_<timestamp>.prof into DRAGONSDOWN_PROFILE_DIR (load it with
+    pstats or snakeviz) and, if the rerun completes, renders the top-N
+    functions by cumulative time. The view is read after main() returns, so
+    a rerun whose click opened another view is filed under the new one.
+    
+    Args:
+        main_func: The app's main() function
+    """
+    profile_dir = Path(os.environ[PROFILE_DIR_ENV])
+    top_n = int(os.environ.get(PROFILE_TOP_N_ENV, "20"))
+    
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        main_func()
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - start
+        view = active_view()
+        try:
+            profile_dir.mkdir(parents=True, exist_ok=True)
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            profiler.dump_stats(str(profile_dir / f"{view}_{timestamp}.prof"))
+        except Exception as e:
+            print(f"Error writing profile for {view}: {e}")
+    
+    # Only reached when the rerun completed (st.rerun() raises past this point)
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(top_n)
+    with st.expander(f"🔬 Profile: {view} ({elapsed * 1000:.0f} ms)", expanded=False):
+        st.code(stream.getvalue(), language=None)
@@ -3,11 +3,16 @@ Dragons Down Game Reference - Streamlit Tab Component
 """
 import streamlit as st
 from game_reference_repository import GameReferenceRepository
+from repository import instrument, metrics_from_env
 
 # Initialize repository
 @st.cache_resource
 def get_repository():
-    return GameReferenceRepository()
+    repo = GameReferenceRepository()
+    metrics = metrics_from_env()
+    if metrics:
+        instrument(repo, metrics)
+    return repo
 
 def render_game_reference():
     """Render the game reference tabs"""
@@ -1,4 +1,8 @@
 """Repository package for data persistence"""
-from .character_repository import CharacterRepository
+from .character_model import Character
+from .character_repository import BatchResult, CharacterRepository, VersionConflictError
+from .character_cache import CharacterCache
+from .async_repository import AsyncCharacterRepository
+from .instrumentation import RepositoryMetrics, instrument, metrics_from_env
 
-__all__ = ['CharacterRepository']
+__all__ = ['Character', 'CharacterRepository', 'BatchResult', 'VersionConflictError', 'AsyncCharacterRepository', 'CharacterCache', 'RepositoryMetrics', 'instrument', 'metrics_from_env']
@@ -0,0 +1,392 @@
+"""
+Character Aggregates
+Running totals over all characters: how many found each hidden path and made
+each discovery, characters per lineage/class, and how much of the journals is
+filled. Every write records the difference between the old and the new
+document, touching only the counters of fields that changed, so reading the
+totals never scans the store.
+
+The totals live in .store/aggregates.json (or only in memory, for a recount),
+like the search index's segments: the file is a folded base, and each store
+appends its writes' differences to a delta log of its own
+(.store/aggregates/delta-<pid>-<sortable id>.log) under an in-process lock.
+Readers add the lines appended to every log since they last looked. Once a
+store's log outgrows compact_bytes, and when it closes, the logs are folded
+into the base under .store/aggregates/merge.lock; the base records how far
+each log is folded, so nothing is counted twice. Logs left by a crashed
+process are folded (and removed) by the next store that opens or compacts.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+from .character_model import DISCOVERY_KEYS, HIDDEN_PATH_KEYS, Character, set_bits
+from .ids import new_character_id
+from .locking import FileLock
+
+_PATH_BITS = {path: bit for bit, path in enumerate(HIDDEN_PATH_KEYS)}
+_DISCOVERY_BITS = {name: bit for bit, name in enumerate(DISCOVERY_KEYS)}
+
+
+def _complete_lines(path: Path, offset: int) -> bytes:
+    """Whole lines of a log past offset (a line still being written is left for later)"""
+    try:
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return b""
+    return data[:data.rfind(b"\n") + 1]
+
+
+class AggregateStore:
+    """Persisted, incrementally maintained totals over all characters"""
+
+    def __init__(self, path: Optional[Path], compact_bytes: int = 256 * 1024):
+        """
+        Initialize the aggregate store, folding in delta logs left by crashed processes
+
+        Args:
+            path: JSON file holding the folded totals (its delta logs sit in a
+                directory of the same name), or None for totals kept only in
+                memory (e.g. a recount to compare)
+            compact_bytes: Size of this store's delta log that triggers a fold
+        """
+        self.path = Path(path) if path is not None else None
+        self.compact_bytes = compact_bytes
+        self._lock = threading.RLock()
+        # The loaded base stays open, so its inode cannot be reused by a later
+        # base and an inode comparison is enough to notice a replacement
+        self._base = None
+        self._base_inode = None
+        self._loaded = False
+        self._offsets: Dict[str, int] = {}
+        self._log: Optional[FileLock] = None
+        self._log_bytes = 0
+        self._merge_lock = None
+        self._reset()
+        if self.path is not None:
+            self.log_dir = self.path.with_suffix("")
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            self._merge_lock = FileLock(self.log_dir / "merge.lock")
+            if self.exists() and self._log_names():
+                self.compact()
+
+    def _reset(self) -> None:
+        self.characters = 0
+        self.path_counts = [0] * len(HIDDEN_PATH_KEYS)
+        self.discovery_counts = [0] * len(DISCOVERY_KEYS)
+        self.lineage_counts: Dict[str, int] = {}
+        self.journal_lines = 0
+        self.journals_started = 0
+
+    def exists(self) -> bool:
+        return self.path is not None and self.path.exists()
+
+    def _log_names(self) -> List[str]:
+        return sorted(name for name in os.listdir(self.log_dir)
+                      if name.startswith("delta-") and name.endswith(".log"))
+
+    # -- differences ---------------------------------------------------------
+
+    @staticmethod
+    def _delta(old: Optional[Character], new: Optional[Character]) -> Dict:
+        """
+        Counters changed by one write, as sparse totals (only fields that moved)
+
+        Returns:
+            Dict: Same shape as snapshot(), e.g. {'paths': {'Oakwood': {'1-6_s1': 1}},
+            'lineage_and_class': {'Elf Ranger': -1, 'Elf Mage': 1}}
+        """
+        delta = {}
+        characters = (new is not None) - (old is not None)
+        if characters:
+            delta['characters'] = characters
+
+        old_paths, new_paths = (old.paths if old else 0), (new.paths if new else 0)
+        for bit in set_bits(old_paths ^ new_paths):
+            location, key = HIDDEN_PATH_KEYS[bit]
+            delta.setdefault('paths', {}).setdefault(location, {})[key] = 1 if new_paths >> bit & 1 else -1
+        old_discoveries, new_discoveries = (old.discoveries if old else 0), (new.discoveries if new else 0)
+        for bit in set_bits(old_discoveries ^ new_discoveries):
+            delta.setdefault('discoveries', {})[DISCOVERY_KEYS[bit]] = 1 if new_discoveries >> bit & 1 else -1
+
+        old_lineage, new_lineage = (old.lineage_and_class if old else ''), (new.lineage_and_class if new else '')
+        if old_lineage != new_lineage:
+            lineages = {}
+            if old_lineage:
+                lineages[old_lineage] = -1
+            if new_lineage:
+                lineages[new_lineage] = 1
+            if lineages:
+                delta['lineage_and_class'] = lineages
+
+        old_journal, new_journal = (old.journal_lines() if old else 0), (new.journal_lines() if new else 0)
+        if new_journal != old_journal:
+            delta['journal_lines'] = new_journal - old_journal
+        started = (new_journal > 0) - (old_journal > 0)
+        if started:
+            delta['journals_started'] = started
+        return delta
+
+    def _add(self, totals: Dict) -> None:
+        """Add totals or a delta (in snapshot() format, fields optional) to the counters"""
+        self.characters += totals.get('characters', 0)
+        for location, keys in totals.get('paths', {}).items():
+            for key, count in keys.items():
+                bit = _PATH_BITS.get((location, key))
+                if bit is not None:
+                    self.path_counts[bit] += count
+        for name, count in totals.get('discoveries', {}).items():
+            bit = _DISCOVERY_BITS.get(name)
+            if bit is not None:
+                self.discovery_counts[bit] += count
+        for lineage, count in totals.get('lineage_and_class', {}).items():
+            # Logs are read in any order, so a count may dip below zero for a while;
+            # only values no character has any more are dropped
+            count += self.lineage_counts.get(lineage, 0)
+            if count:
+                self.lineage_counts[lineage] = count
+            else:
+                self.lineage_counts.pop(lineage, None)
+        self.journal_lines += totals.get('journal_lines', 0)
+        self.journals_started += totals.get('journals_started', 0)
+
+    def _add_lines(self, data: bytes) -> None:
+        for line in data.splitlines():
+            try:
+                self._add(json.loads(line))
+            except ValueError:
+                continue
+
+    # -- reading -------------------------------------------------------------
+
+    def _read_base(self) -> Dict:
+        """The folded totals file, {} if there is none yet"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _base_inode_now(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return None
+
+    def _load_base(self) -> None:
+        """Load the base and start every log where the base stopped folding it (lock held)"""
+        if self._base is not None:
+            self._base.close()
+        try:
+            self._base = open(self.path, 'r', encoding='utf-8')
+            base = json.load(self._base)
+            self._base_inode = os.fstat(self._base.fileno()).st_ino
+        except FileNotFoundError:
+            self._base, self._base_inode, base = None, None, {}
+        self._reset()
+        self._add(base)
+        self._offsets = dict(base.get('folded', {}))
+        self._loaded = True
+
+    def _refresh(self) -> None:
+        """Reload the base if it was replaced and add the log lines written since the last look (lock held)"""
+        if self.path is None:
+            return
+        while True:
+            if not self._loaded or self._base_inode_now() != self._base_inode:
+                self._load_base()
+            for name in self._log_names():
+                data = _complete_lines(self.log_dir / name, self._offsets.get(name, 0))
+                if data:
+                    self._add_lines(data)
+                    self._offsets[name] = self._offsets.get(name, 0) + len(data)
+            # A fold that replaced the base meanwhile may have removed log lines not read yet
+            if self._base_inode_now() == self._base_inode:
+                return
+
+    def _snapshot(self) -> Dict:
+        paths: Dict[str, Dict[str, int]] = {}
+        for (location, key), count in zip(HIDDEN_PATH_KEYS, self.path_counts):
+            paths.setdefault(location, {})[key] = count
+        return {
+            'characters': self.characters,
+            'paths': paths,
+            'discoveries': dict(zip(DISCOVERY_KEYS, self.discovery_counts)),
+            'lineage_and_class': dict(self.lineage_counts),
+            'journal_lines': self.journal_lines,
+            'journals_started': self.journals_started,
+        }
+
+    def snapshot(self) -> Dict:
+        """
+        Current totals (a stat of the base and each delta log, plus the lines appended since the last call)
+
+        Returns:
+            Dict: {'characters', 'paths' (location -> path key -> characters),
+            'discoveries' (name -> characters), 'lineage_and_class' (value ->
+            characters), 'journal_lines' (filled lines in all journals),
+            'journals_started' (characters with at least one journal line)}
+        """
+        with self._lock:
+            self._refresh()
+            return self._snapshot()
+
+    # -- writing -------------------------------------------------------------
+
+    def update(self, old_document: Optional[Dict], new_document: Optional[Dict]) -> None:
+        """
+        Record one write (called with the character's lock held)
+
+        Args:
+            old_document: The character before the write (None if it was created)
+            new_document: The character after the write (None if it was deleted)
+        """
+        old = Character.from_dict(old_document) if old_document is not None else None
+        new = Character.from_dict(new_document) if new_document is not None else None
+        delta = self._delta(old, new)
+        if not delta:
+            return
+        if self.path is None:
+            with self._lock:
+                self._add(delta)
+            return
+        # ASCII-only, so the line's length is its length in bytes
+        line = json.dumps(delta, separators=(',', ':')) + "\n"
+        with self._lock:
+            if self._log is None:
+                self._log = FileLock(self.log_dir / f"delta-{os.getpid()}-{new_character_id()}.log")
+                self._log.acquire()
+                self._log_bytes = 0
+            self._log.handle.write(line)
+            self._log.handle.flush()
+            self._log_bytes += len(line)
+            if self._log_bytes >= self.compact_bytes:
+                self.compact()
+
+    def _write_base(self, totals: Dict, folded: Dict[str, int]) -> None:
+        """Atomically replace the folded totals file (merge lock held)"""
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({**totals, 'folded': folded}, ensure_ascii=False, separators=(',', ':')))
+        os.replace(tmp_path, self.path)
+        # Re-read on the next refresh: the base now starts where each log was folded
+        self._loaded = False
+
+    def compact(self) -> None:
+        """
+        Fold every delta log into the base file
+
+        This store's own log is retired (the next write starts a new one), as
+        are the logs of stores that are gone; both are removed once folded.
+        Logs of other live stores are folded as far as they are written.
+        """
+        if self.path is None:
+            return
+        with self._lock, self._merge_lock:
+            retired = []
+            if self._log is not None:
+                retired.append(self._log)
+                self._log = None
+            base = self._read_base()
+            folded = dict(base.get('folded', {}))
+            totals = AggregateStore(None)
+            totals._add(base)
+            for name in self._log_names():
+                log_path = self.log_dir / name
+                if all(log.path != log_path for log in retired):
+                    log = FileLock(log_path)
+                    if log.acquire(blocking=False):
+                        retired.append(log)  # its store is gone
+                    else:
+                        log.close()
+                data = _complete_lines(log_path, folded.get(name, 0))
+                totals._add_lines(data)
+                folded[name] = folded.get(name, 0) + len(data)
+            names = set(self._log_names())
+            self._write_base(totals._snapshot(), {name: offset for name, offset in folded.items() if name in names})
+            # Offsets of removed logs stay in the base until the next fold, so a
+            # reader can never mistake a removed log for one not yet folded
+            for log in retired:
+                try:
+                    os.unlink(log.path)
+                except FileNotFoundError:
+                    pass
+                log.release()
+                log.close()
+
+    def _replace_base(self) -> None:
+        """Persist the in-memory counters as the base, covering everything logged so far (lock held)"""
+        if self.path is None:
+            return
+        with self._merge_lock:
+            folded = {name: len(_complete_lines(self.log_dir / name, 0)) for name in self._log_names()}
+            self._write_base(self._snapshot(), folded)
+
+    def rebuild(self, documents: Iterable[Union[Dict, Character]]) -> None:
+        """
+        Recompute the totals from scratch
+
+        Writes that happen while the documents are being read may be counted
+        twice or not at all, so rebuild while the store is quiet.
+
+        Args:
+            documents: Every stored character, as documents or Characters
+        """
+        with self._lock:
+            self._reset()
+            for document in documents:
+                character = document if isinstance(document, Character) else Character.from_dict(document)
+                self._add(self._delta(None, character))
+            self._replace_base()
+
+    def replace(self, totals: Dict) -> None:
+        """
+        Overwrite the totals, e.g. with a recount summed up by add_totals()
+
+        Args:
+            totals: Totals in the format returned by snapshot()
+        """
+        with self._lock:
+            self._reset()
+            self._add(totals)
+            self._replace_base()
+
+    def close(self) -> None:
+        """Fold this store's delta log into the base and release its files"""
+        if self.path is None:
+            return
+        with self._lock:
+            if self._log is not None:
+                self.compact()
+            if self._base is not None:
+                self._base.close()
+                self._base = None
+            self._merge_lock.close()
+
+
+def add_totals(total: Optional[Dict], part: Dict) -> Dict:
+    """
+    Sum two sets of totals (as returned by snapshot()), e.g. counted over separate chunks of the store
+
+    Args:
+        total: Running sum (None to start one); updated in place
+        part: Totals to add
+
+    Returns:
+        Dict: The sum
+    """
+    if total is None:
+        return json.loads(json.dumps(part))
+    for field in ('characters', 'journal_lines', 'journals_started'):
+        total[field] += part[field]
+    for location, keys in part['paths'].items():
+        for key, count in keys.items():
+            total['paths'].setdefault(location, {})[key] = total['paths'].get(location, {}).get(key, 0) + count
+    for field in ('discoveries', 'lineage_and_class'):
+        for name, count in part[field].items():
+            total[field][name] = total[field].get(name, 0) + count
+    return total
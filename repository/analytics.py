@@ -0,0 +1,228 @@
+"""
+Character Analytics
+Holds every character's hidden paths and discoveries as boolean matrices (one
+row per character, one column per catalog entry) and answers cross-character
+questions with vectorized pandas/numpy operations: completion per tile, per
+land pack and per discovery, and the most commonly missed hidden paths.
+
+The matrices and their column sums are kept current from the repository's
+change feed, so after the first load a refresh only reads the characters that
+changed and updates the sums in O(changed rows).
+"""
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .character_model import DISCOVERY_KEYS, HIDDEN_PATH_KEYS, HIDDEN_PATH_REGIONS, Character
+
+_LAND_PACK_OF = {location: region for region, locations in HIDDEN_PATH_REGIONS.items() for location in locations}
+PATH_COLUMNS = pd.MultiIndex.from_tuples(
+    [(_LAND_PACK_OF[location], location, key) for location, key in HIDDEN_PATH_KEYS],
+    names=['land_pack', 'tile', 'path'],
+)
+DISCOVERY_COLUMNS = pd.Index(DISCOVERY_KEYS, name='discovery')
+
+
+def unpack_masks(masks: Iterable[int], width: int) -> np.ndarray:
+    """
+    Expand integer bitsets into a boolean matrix
+
+    Args:
+        masks: One bitset per row (bit i is column i)
+        width: Number of columns
+
+    Returns:
+        np.ndarray: (len(masks), width) boolean matrix
+    """
+    masks = list(masks)
+    row_bytes = (width + 7) // 8
+    buffer = b"".join(mask.to_bytes(row_bytes, 'little') for mask in masks)
+    packed = np.frombuffer(buffer, dtype=np.uint8).reshape(len(masks), row_bytes)
+    return np.unpackbits(packed, axis=1, bitorder='little')[:, :width].astype(bool)
+
+
+class CharacterAnalytics:
+    """Incrementally maintained progress statistics over all characters"""
+
+    def __init__(self, repository):
+        """
+        Initialize the analytics
+
+        Args:
+            repository: CharacterRepository (or compatible) to read characters and changes from
+        """
+        self.repository = repository
+        self._lock = threading.Lock()
+        self._version = None
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._paths = np.zeros((0, len(HIDDEN_PATH_KEYS)), dtype=bool)
+        self._discoveries = np.zeros((0, len(DISCOVERY_KEYS)), dtype=bool)
+        self._path_counts = np.zeros(len(HIDDEN_PATH_KEYS), dtype=np.int64)
+        self._discovery_counts = np.zeros(len(DISCOVERY_KEYS), dtype=np.int64)
+        self._results: Dict[str, object] = {}
+        self.full_loads = 0
+        self.rows_updated = 0
+
+    def _load_all(self) -> None:
+        """Rebuild the matrices from every stored character (lock held)"""
+        version = self.repository.get_version()
+        characters = [(result.character_id, Character.from_dict(result.value))
+                      for result in self.repository.get_many(self.repository.list_character_ids())
+                      if result.ok and result.value is not None]
+        self._ids = [character_id for character_id, _ in characters]
+        self._rows = {character_id: row for row, character_id in enumerate(self._ids)}
+        self._paths = unpack_masks((c.paths for _, c in characters), len(HIDDEN_PATH_KEYS))
+        self._discoveries = unpack_masks((c.discoveries for _, c in characters), len(DISCOVERY_KEYS))
+        self._path_counts = self._paths.sum(axis=0, dtype=np.int64)
+        self._discovery_counts = self._discoveries.sum(axis=0, dtype=np.int64)
+        self._version = version
+        self.full_loads += 1
+
+    def _remove_row(self, character_id: str) -> None:
+        """Drop a character by moving the last row into its place (lock held)"""
+        row = self._rows.pop(character_id, None)
+        if row is None:
+            return
+        self._path_counts -= self._paths[row]
+        self._discovery_counts -= self._discoveries[row]
+        last = len(self._ids) - 1
+        if row != last:
+            moved = self._ids[last]
+            self._ids[row] = moved
+            self._rows[moved] = row
+            self._paths[row] = self._paths[last]
+            self._discoveries[row] = self._discoveries[last]
+        self._ids.pop()
+        self._paths = self._paths[:last]
+        self._discoveries = self._discoveries[:last]
+
+    def _apply_changes(self, changes: Dict) -> None:
+        """Re-read added and modified characters and drop removed ones (lock held)"""
+        for character_id in changes['removed']:
+            self._remove_row(character_id)
+        changed = changes['added'] + changes['modified']
+        characters = [(result.character_id, Character.from_dict(result.value))
+                      for result in self.repository.get_many(changed)
+                      if result.ok and result.value is not None]
+        for character_id in set(changed) - {character_id for character_id, _ in characters}:
+            self._remove_row(character_id)  # vanished again or unreadable
+        if not characters:
+            return
+
+        paths = unpack_masks((c.paths for _, c in characters), len(HIDDEN_PATH_KEYS))
+        discoveries = unpack_masks((c.discoveries for _, c in characters), len(DISCOVERY_KEYS))
+        new_rows = []
+        for index, (character_id, _) in enumerate(characters):
+            row = self._rows.get(character_id)
+            if row is None:
+                new_rows.append(index)
+                continue
+            self._path_counts += paths[index].astype(np.int64) - self._paths[row]
+            self._discovery_counts += discoveries[index].astype(np.int64) - self._discoveries[row]
+            self._paths[row] = paths[index]
+            self._discoveries[row] = discoveries[index]
+        if new_rows:
+            for index in new_rows:
+                self._rows[characters[index][0]] = len(self._ids)
+                self._ids.append(characters[index][0])
+            self._paths = np.concatenate([self._paths, paths[new_rows]])
+            self._discoveries = np.concatenate([self._discoveries, discoveries[new_rows]])
+            self._path_counts += paths[new_rows].sum(axis=0, dtype=np.int64)
+            self._discovery_counts += discoveries[new_rows].sum(axis=0, dtype=np.int64)
+        self.rows_updated += len(characters)
+
+    def refresh(self) -> None:
+        """Bring the matrices up to date with the repository (cheap when nothing changed)"""
+        with self._lock:
+            if self._version is None:
+                self._load_all()
+                self._results.clear()
+                return
+            if self.repository.get_version() == self._version:
+                return
+            changes = self.repository.changes_since(self._version)
+            if changes is None:
+                self._load_all()
+            else:
+                self._apply_changes(changes)
+                self._version = changes['version']
+            self._results.clear()
+
+    def _cached(self, name: str, compute):
+        self.refresh()
+        with self._lock:
+            if name not in self._results:
+                self._results[name] = compute()
+            return self._results[name]
+
+    def character_count(self) -> int:
+        """Number of characters included in the statistics"""
+        self.refresh()
+        return len(self._ids)
+
+    def path_frame(self) -> pd.DataFrame:
+        """Boolean frame of found hidden paths: one row per character ID, columns (land_pack, tile, path)"""
+        self.refresh()
+        with self._lock:
+            return pd.DataFrame(self._paths.copy(), index=pd.Index(self._ids, name='character_id'),
+                                columns=PATH_COLUMNS)
+
+    def discovery_frame(self) -> pd.DataFrame:
+        """Boolean frame of discoveries: one row per character ID, one column per discovery"""
+        self.refresh()
+        with self._lock:
+            return pd.DataFrame(self._discoveries.copy(), index=pd.Index(self._ids, name='character_id'),
+                                columns=DISCOVERY_COLUMNS)
+
+    def _path_rates(self) -> pd.Series:
+        characters = max(len(self._ids), 1)
+        return pd.Series(self._path_counts / characters, index=PATH_COLUMNS, name='found_rate')
+
+    def tile_completion(self) -> pd.DataFrame:
+        """
+        Share of each tile's hidden paths found, averaged over all characters
+
+        Returns:
+            pd.DataFrame: Indexed by (land_pack, tile) with 'paths' (hidden paths on
+            the tile) and 'completion' (0..1), highest completion first
+        """
+        def compute():
+            rates = self._path_rates().groupby(level=['land_pack', 'tile'])
+            return (pd.DataFrame({'paths': rates.size(), 'completion': rates.mean()})
+                    .sort_values('completion', ascending=False))
+        return self._cached('tile_completion', compute)
+
+    def land_pack_completion(self) -> pd.Series:
+        """Share of each land pack's hidden paths found, averaged over all characters"""
+        return self._cached('land_pack_completion', lambda: (
+            self._path_rates().groupby(level='land_pack').mean().rename('completion')
+            .sort_values(ascending=False)))
+
+    def discovery_rates(self) -> pd.Series:
+        """Share of characters that made each discovery, most common first"""
+        def compute():
+            characters = max(len(self._ids), 1)
+            return (pd.Series(self._discovery_counts / characters, index=DISCOVERY_COLUMNS, name='found_rate')
+                    .sort_values(ascending=False))
+        return self._cached('discovery_rates', compute)
+
+    def most_missed_paths(self, limit: Optional[int] = 10) -> pd.DataFrame:
+        """
+        Hidden paths the fewest characters found
+
+        Args:
+            limit: Number of paths to return (None for all)
+
+        Returns:
+            pd.DataFrame: Indexed by (land_pack, tile, path) with 'found_rate' and
+            'missed_by' (number of characters without the path), most missed first
+        """
+        def compute():
+            rates = self._path_rates()
+            missed = pd.DataFrame({'found_rate': rates, 'missed_by': len(self._ids) - self._path_counts})
+            return missed.sort_values(['found_rate', 'missed_by'], ascending=[True, False], kind='stable')
+        missed = self._cached('most_missed_paths', compute)
+        return missed if limit is None else missed.head(limit)
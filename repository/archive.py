@@ -0,0 +1,317 @@
+"""
+Archive Tier
+Characters nobody has written for a while move out of the sheet directory
+into compressed, append-only pack files under .store/archive/. The hot
+directory, and everything that lists or scans it, then stays small:
+
+    pack-000001.pack   header: b"DDPACK1\\n", dictionary length, dictionary;
+                       then records: id length, data length, id, data
+    index.log          one JSON line per change, {"id", "pack", "offset", "length"},
+                       or {"id", "pack": null} once a character leaves the archive
+
+Each record is the document's compact JSON, deflated on its own against
+the pack's preset dictionary. The dictionary is an empty sheet, so the
+catalog keys that every sheet repeats cost almost nothing. Records are read
+through a memory map of their pack, so a read costs one slice and one
+inflate. Every process replays the index log on open and tails it before
+each lookup, like the shared manifest, so it sees characters archived by
+the others.
+
+A sheet in the directory always wins over its archived copy. A write to an
+archived character stores the sheet first and then drops the archive
+entry. compact() rewrites the live records into new packs, reclaiming the
+space of characters that were written again or deleted.
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .character_model import Character
+from .locking import FileLock
+from .migrations import migrate_document
+
+PACK_MAGIC = b"DDPACK1\n"
+# A pack is closed for appends past this size and a new one started
+PACK_BYTES = 64 * 1024 * 1024
+COMPRESS_LEVEL = 9
+
+_LENGTH = struct.Struct('>I')
+_RECORD = struct.Struct('>HI')  # id length, data length
+
+
+def encode_record(document: Dict) -> bytes:
+    return json.dumps(document, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def pack_dictionary() -> bytes:
+    """Preset deflate dictionary for new packs: an empty sheet in the current schema"""
+    document = migrate_document(Character.empty().to_dict(), "")
+    document['version'] = 1
+    return encode_record(document)
+
+
+def _pack_name(number: int) -> str:
+    return f"pack-{number:06d}.pack"
+
+
+class _MappedPack:
+    """A pack file mapped for reading, remapped when appends outgrow the map"""
+
+    def __init__(self, path: Path):
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:len(PACK_MAGIC)] != PACK_MAGIC:
+            raise ValueError(f"{path.name} is not an archive pack")
+        start = len(PACK_MAGIC) + _LENGTH.size
+        (length,) = _LENGTH.unpack_from(self.map, len(PACK_MAGIC))
+        self.dictionary = bytes(self.map[start:start + length])
+
+    def record(self, offset: int, length: int) -> Tuple[str, bytes]:
+        """(character_id, compressed data) of the record at offset"""
+        if offset + length > len(self.map):
+            # Mapped before this record was appended
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        id_length, data_length = _RECORD.unpack_from(self.map, offset)
+        start = offset + _RECORD.size
+        character_id = self.map[start:start + id_length].decode('utf-8')
+        return character_id, self.map[start + id_length:start + id_length + data_length]
+
+    def inflate(self, data: bytes) -> bytes:
+        decompressor = zlib.decompressobj(-15, zdict=self.dictionary)
+        return decompressor.decompress(data) + decompressor.flush()
+
+    def close(self) -> None:
+        self.map.close()
+        self.file.close()
+
+
+class ArchiveStore:
+    """Compressed pack files of archived characters with an offset index"""
+
+    def __init__(self, root: Path):
+        """
+        Initialize the archive
+
+        Args:
+            root: Directory holding the packs and index.log (created if missing)
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.root / "index.log"
+        # Serializes appends and compaction across threads and processes
+        self._lock = FileLock(self.index_path)
+        self._state_lock = threading.Lock()
+        self._entries: Dict[str, Tuple[int, int, int]] = {}
+        self._inode = None
+        self._offset = 0
+        self._packs: Dict[int, _MappedPack] = {}
+        self._dictionary = None
+        with self._state_lock:
+            self._poll()
+
+    def _poll(self) -> None:
+        """Apply index lines written since the last poll (state lock held)"""
+        try:
+            stat = os.stat(self.index_path)
+        except FileNotFoundError:
+            return
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            # First poll, or compacted by some process: replay from the start
+            self._inode = stat.st_ino
+            self._offset = 0
+            self._entries = {}
+        if stat.st_size == self._offset:
+            return
+        with open(self.index_path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read(stat.st_size - self._offset)
+        # Only consume complete lines; a partial tail is re-read next poll
+        complete = data[:data.rfind(b"\n") + 1]
+        self._offset += len(complete)
+        for line in complete.splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get('pack') is None:
+                self._entries.pop(entry['id'], None)
+            else:
+                self._entries[entry['id']] = (entry['pack'], entry['offset'], entry['length'])
+
+    def _pack(self, number: int) -> _MappedPack:
+        """Mapped pack by number (state lock held); FileNotFoundError if compacted away"""
+        pack = self._packs.get(number)
+        if pack is None:
+            pack = _MappedPack(self.root / _pack_name(number))
+            self._packs[number] = pack
+        return pack
+
+    def _pack_numbers(self) -> List[int]:
+        return sorted(int(name[5:11]) for name in os.listdir(self.root)
+                      if name.startswith("pack-") and name.endswith(".pack"))
+
+    def contains(self, character_id: str) -> bool:
+        with self._state_lock:
+            self._poll()
+            return character_id in self._entries
+
+    def ids(self) -> List[str]:
+        """IDs of every archived character"""
+        with self._state_lock:
+            self._poll()
+            return list(self._entries)
+
+    def read(self, character_id: str) -> Optional[bytes]:
+        """
+        Read an archived document
+
+        Returns:
+            bytes: The document's JSON, None if the character is not archived
+        """
+        for attempt in range(2):
+            with self._state_lock:
+                self._poll()
+                entry = self._entries.get(character_id)
+                if entry is None:
+                    return None
+                try:
+                    pack = self._pack(entry[0])
+                except FileNotFoundError:
+                    if attempt:
+                        raise
+                    # Compacted since the poll; the index has moved on by now
+                    continue
+                record_id, data = pack.record(entry[1], entry[2])
+            if record_id != character_id:
+                raise ValueError(f"archive index of {character_id} points at the record of {record_id}")
+            return pack.inflate(data)
+        return None
+
+    def records(self) -> Iterator[Tuple[str, bytes]]:
+        """(character_id, document JSON) of every archived character, in pack order"""
+        with self._state_lock:
+            self._poll()
+            entries = sorted(self._entries.items(), key=lambda item: item[1])
+        for character_id, _ in entries:
+            data = self.read(character_id)
+            if data is not None:
+                yield character_id, data
+
+    def _new_pack(self, number: int, dictionary: bytes) -> int:
+        with open(self.root / _pack_name(number), 'xb') as f:
+            f.write(PACK_MAGIC + _LENGTH.pack(len(dictionary)) + dictionary)
+        return number
+
+    def _append_pack(self, dictionary: bytes) -> int:
+        """Pack to append to (index lock held): the newest one, unless full or for another dictionary"""
+        numbers = self._pack_numbers()
+        if numbers:
+            number = numbers[-1]
+            with self._state_lock:
+                same_dictionary = self._pack(number).dictionary == dictionary
+            if same_dictionary and (self.root / _pack_name(number)).stat().st_size < PACK_BYTES:
+                return number
+        return self._new_pack(numbers[-1] + 1 if numbers else 1, dictionary)
+
+    def _write_record(self, number: int, character_id: str, document_json: bytes, dictionary: bytes) -> Dict:
+        """Append one record to a pack (index lock held); return its index entry"""
+        compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, -15, zdict=dictionary)
+        data = compressor.compress(document_json) + compressor.flush()
+        id_bytes = character_id.encode('utf-8')
+        record = _RECORD.pack(len(id_bytes), len(data)) + id_bytes + data
+        with open(self.root / _pack_name(number), 'ab') as f:
+            offset = f.seek(0, os.SEEK_END)
+            f.write(record)
+        return {'id': character_id, 'pack': number, 'offset': offset, 'length': len(record)}
+
+    def add(self, character_id: str, document: Dict) -> None:
+        """
+        Append a character to the archive (called with the character's lock held)
+
+        The caller removes the sheet afterwards; until then the sheet wins.
+        """
+        if self._dictionary is None:
+            self._dictionary = pack_dictionary()
+        with self._lock as index:
+            number = self._append_pack(self._dictionary)
+            entry = self._write_record(number, character_id, encode_record(document), self._dictionary)
+            index.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            index.flush()
+            with self._state_lock:
+                self._poll()
+
+    def forget(self, character_id: str) -> None:
+        """Drop a character from the archive (called with its lock held, after its sheet was written or deleted)"""
+        if not self.contains(character_id):
+            return
+        with self._lock as index:
+            index.write(json.dumps({'id': character_id, 'pack': None}, ensure_ascii=False) + "\n")
+            index.flush()
+            with self._state_lock:
+                self._poll()
+
+    def stats(self) -> Dict:
+        """{'characters', 'packs', 'bytes' (all packs), 'live_bytes' (records still indexed)}"""
+        with self._state_lock:
+            self._poll()
+            characters = len(self._entries)
+            live_bytes = sum(length for _, _, length in self._entries.values())
+        numbers = self._pack_numbers()
+        size = sum((self.root / _pack_name(number)).stat().st_size for number in numbers)
+        return {'characters': characters, 'packs': len(numbers), 'bytes': size, 'live_bytes': live_bytes}
+
+    def compact(self) -> Dict:
+        """
+        Rewrite the live records into new packs and drop the old ones
+
+        Readers keep working throughout: packs they already mapped stay
+        readable after removal, and the replaced index makes them replay it.
+
+        Returns:
+            Dict: stats() before and after, as {'before', 'after'}
+        """
+        before = self.stats()
+        if self._dictionary is None:
+            self._dictionary = pack_dictionary()
+        with self._lock:
+            old_numbers = self._pack_numbers()
+            with self._state_lock:
+                self._poll()
+                entries = sorted(self._entries.items(), key=lambda item: item[1])
+            next_number = max(old_numbers, default=0) + 1
+            number = None
+            size = PACK_BYTES
+            lines = []
+            for character_id, _ in entries:
+                if size >= PACK_BYTES:
+                    number = self._new_pack(next_number, self._dictionary)
+                    next_number += 1
+                entry = self._write_record(number, character_id, self.read(character_id), self._dictionary)
+                size = entry['offset'] + entry['length']
+                lines.append(json.dumps(entry, ensure_ascii=False) + "\n")
+            tmp_path = self.index_path.with_name(f".index.{os.getpid()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.writelines(lines)
+            os.replace(tmp_path, self.index_path)
+            self._lock.reopen()
+            with self._state_lock:
+                for old in old_numbers:
+                    pack = self._packs.pop(old, None)
+                    if pack is not None:
+                        pack.close()
+                self._poll()
+            for old in old_numbers:
+                os.unlink(self.root / _pack_name(old))
+        return {'before': before, 'after': self.stats()}
+
+    def close(self) -> None:
+        with self._state_lock:
+            for pack in self._packs.values():
+                pack.close()
+            self._packs = {}
+        self._lock.close()
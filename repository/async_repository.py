@@ -0,0 +1,161 @@
+"""
+Async Character Repository
+asyncio front end for CharacterRepository, for bots, exporters and API servers.
+Blocking file I/O runs on a bounded thread pool behind a semaphore, so any number
+of coroutines can share one event loop with a fixed number of threads.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+from .character_model import Character
+from .character_repository import BatchResult, CharacterRepository
+
+
+class AsyncCharacterRepository:
+    """Awaitable mirror of CharacterRepository's public API"""
+
+    def __init__(self, repository: Optional[CharacterRepository] = None,
+                 storage_path: str = "character_sheets", max_concurrency: int = 32):
+        """
+        Initialize the async repository
+
+        Args:
+            repository: CharacterRepository to wrap (one is created for storage_path if None)
+            storage_path: Directory path used when no repository is given
+            max_concurrency: Maximum blocking repository calls in flight at once;
+                further calls wait on the event loop without holding a thread
+        """
+        self._owns_repository = repository is None
+        self.repository = repository if repository is not None else CharacterRepository(storage_path=storage_path)
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="character-async")
+
+    async def _call(self, func, *args, **kwargs):
+        """
+        Run a blocking call on the executor
+
+        Cancelling the awaiting task while it waits for the semaphore or for a
+        free thread means the call never runs. Once the call has started it
+        finishes in the background (a write is never torn) and the task sees
+        CancelledError.
+        """
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def get(self, character_id: str) -> Optional[Dict]:
+        """Retrieve a character by ID (None if missing or unreadable)"""
+        return await self._call(self.repository.get, character_id)
+
+    async def get_character(self, character_id: str) -> Optional[Character]:
+        """Retrieve a character by ID as a Character model"""
+        return await self._call(self.repository.get_character, character_id)
+
+    async def get_many(self, character_ids: Iterable[str]) -> List[BatchResult]:
+        """
+        Retrieve several characters concurrently
+
+        Each read is a separate executor call, so cancelling get_many() drops
+        every read that has not started yet.
+
+        Returns:
+            List[BatchResult]: One result per ID, in the same order (see CharacterRepository.get_many)
+        """
+        async def read(character_id: str) -> BatchResult:
+            try:
+                return BatchResult(character_id, await self._call(self.repository._get, character_id))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                return BatchResult(character_id, None, e)
+
+        return list(await asyncio.gather(*(read(character_id) for character_id in character_ids)))
+
+    async def get_all(self) -> Dict[str, Dict]:
+        """Retrieve all characters from storage"""
+        characters = {}
+        for result in await self.get_many(await self.list_character_ids()):
+            if result.error is not None:
+                print(f"Error loading character {result.character_id}: {result.error}")
+            elif result.value is not None:
+                characters[result.character_id] = result.value
+        return characters
+
+    async def save(self, character_id: str, character_data: Dict, expected_version: Optional[int] = None) -> bool:
+        """
+        Save a character to storage
+
+        Raises:
+            VersionConflictError: If expected_version does not match the stored version
+        """
+        return await self._call(self.repository.save, character_id, character_data, expected_version=expected_version)
+
+    async def save_many(self, items: Union[Mapping[str, Dict], Iterable[Tuple[str, Dict]]],
+                        expected_versions: Optional[Mapping[str, int]] = None) -> List[BatchResult]:
+        """Save several characters (see CharacterRepository.save_many) as one executor call"""
+        return await self._call(self.repository.save_many, items, expected_versions=expected_versions)
+
+    async def patch(self, character_id: str, changes: Mapping[Tuple, object],
+                    expected_version: Optional[int] = None) -> Optional[Dict]:
+        """
+        Change individual fields of a stored character (see CharacterRepository.patch)
+
+        Raises:
+            VersionConflictError: If expected_version does not match the stored version
+        """
+        return await self._call(self.repository.patch, character_id, changes, expected_version=expected_version)
+
+    async def update(self, character_id: str, character_data: Dict, expected_version: Optional[int] = None) -> bool:
+        """Update an existing character (alias for save)"""
+        return await self.save(character_id, character_data, expected_version=expected_version)
+
+    async def delete(self, character_id: str, expected_version: Optional[int] = None) -> bool:
+        """
+        Delete a character from storage
+
+        Raises:
+            VersionConflictError: If expected_version does not match the stored version
+        """
+        return await self._call(self.repository.delete, character_id, expected_version=expected_version)
+
+    async def rename(self, old_character_id: str, new_character_id: str,
+                     expected_version: Optional[int] = None) -> bool:
+        """
+        Rename a character
+
+        Raises:
+            VersionConflictError: If expected_version does not match the stored version
+        """
+        return await self._call(self.repository.rename, old_character_id, new_character_id,
+                                expected_version=expected_version)
+
+    async def exists(self, character_id: str) -> bool:
+        """Check if a character exists in storage"""
+        return await self._call(self.repository.exists, character_id)
+
+    async def list_character_ids(self) -> List[str]:
+        """Get a list of all character IDs"""
+        return await self._call(self.repository.list_character_ids)
+
+    def get_version(self) -> int:
+        """Get the current change-feed version (non-blocking outside replica mode)"""
+        return self.repository.get_version()
+
+    async def changes_since(self, version: int) -> Optional[Dict]:
+        """Get the net changes made after a given version (see CharacterRepository.changes_since)"""
+        return await self._call(self.repository.changes_since, version)
+
+    async def aclose(self) -> None:
+        """Wait for running calls and release the executor (and the repository if we created it)"""
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+        if self._owns_repository:
+            self.repository.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
@@ -0,0 +1,268 @@
+"""
+Bulk Export and Import
+Moves a whole store through a single NDJSON file, one sheet per line:
+
+    {"id": "01JC...", "document": {"hero_name": "Aria", ..., "version": 3}}
+
+Files whose name ends in .gz are gzip-compressed; imports detect gzip by its
+magic bytes, so any name works. Both directions stream: an export holds one
+batch of sheets at a time and an import one batch of lines, so memory does
+not grow with the store. Imports save through CharacterRepository.save_many(),
+so versions, history, running totals and the search index are kept as for
+any other write.
+
+Used by `dragonsdown-store export/import` (which reads sheets on a process
+pool instead) and by the app's backup page (?admin=backup).
+"""
+import gzip
+import json
+import os
+import time
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .character_model import validate_document
+from .character_repository import VersionConflictError
+from .ids import sort_key, valid_character_id
+
+EXPORT_BATCH = 256
+IMPORT_BATCH = 1000
+
+# Level 6 compresses sheets nearly as well as 9 at a fraction of the time
+GZIP_LEVEL = 6
+_GZIP_MAGIC = b"\x1f\x8b"
+
+Destination = Union[str, os.PathLike, BinaryIO]
+
+
+class BulkStats:
+    """Counts and throughput of one export or import"""
+
+    def __init__(self):
+        self.count = 0
+        self.skipped = 0
+        self.bytes = 0  # NDJSON bytes, before compression
+        self.problems: Dict[str, List[str]] = {}
+        self.start = time.perf_counter()
+        self.seconds = 0.0
+
+    def finish(self) -> 'BulkStats':
+        self.seconds = time.perf_counter() - self.start
+        return self
+
+    @property
+    def sheets_per_second(self) -> float:
+        return self.count / max(self.seconds, 1e-9)
+
+    @property
+    def megabytes_per_second(self) -> float:
+        return self.bytes / 1e6 / max(self.seconds, 1e-9)
+
+    def summary(self, verb: str) -> str:
+        """e.g. '12,000 sheets exported (9.8 MB) in 1.2s: 10,000 sheets/s, 8.2 MB/s'"""
+        text = f"{self.count:,} sheets {verb} ({self.bytes / 1e6:.1f} MB) in {self.seconds:.1f}s: " \
+               f"{self.sheets_per_second:,.0f} sheets/s, {self.megabytes_per_second:.1f} MB/s"
+        if self.skipped:
+            text += f", {self.skipped:,} already present"
+        return text
+
+
+def is_compressed_name(path) -> bool:
+    return str(path).endswith(".gz")
+
+
+def export_line(character_id: str, document: Dict) -> bytes:
+    """One NDJSON line of an export"""
+    return (json.dumps({'id': character_id, 'document': document}, ensure_ascii=False,
+                       separators=(',', ':')) + "\n").encode('utf-8')
+
+
+class NdjsonWriter:
+    """
+    Writes export lines to a path or binary file, gzip-compressed if asked
+
+    Args:
+        destination: Path, or a binary file (left open on close)
+        compress: gzip the output; None compresses paths ending in .gz
+    """
+
+    def __init__(self, destination: Destination, compress: Optional[bool] = None):
+        if isinstance(destination, (str, os.PathLike)):
+            self._raw = open(destination, 'wb')
+            self._owned = True
+            compress = is_compressed_name(destination) if compress is None else compress
+        else:
+            self._raw = destination
+            self._owned = False
+        # No name or time in the gzip header keeps exports of identical stores identical
+        self._stream = (gzip.GzipFile(filename='', fileobj=self._raw, mode='wb', compresslevel=GZIP_LEVEL, mtime=0)
+                        if compress else self._raw)
+        self.bytes = 0
+
+    def write(self, data: bytes) -> None:
+        self._stream.write(data)
+        self.bytes += len(data)
+
+    def close(self) -> None:
+        if self._stream is not self._raw:
+            self._stream.close()
+        if self._owned:
+            self._raw.close()
+        else:
+            self._raw.flush()
+
+    def __enter__(self) -> 'NdjsonWriter':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def open_ndjson(source: Destination) -> Tuple[BinaryIO, Callable[[], None]]:
+    """
+    Open an export for reading, decompressing gzip whatever its name
+
+    Args:
+        source: Path, or a binary file that is buffered (has peek()) or seekable
+
+    Returns:
+        Tuple: (binary line stream, close function; a file passed in is left open)
+    """
+    if isinstance(source, (str, os.PathLike)):
+        raw = open(source, 'rb')
+        close = raw.close
+    else:
+        raw = source
+
+        def close():
+            pass
+    if hasattr(raw, 'peek'):
+        head = raw.peek(2)[:2]
+    else:
+        # e.g. io.BytesIO or an uploaded file: read the magic bytes and rewind
+        position = raw.tell()
+        head = raw.read(2)
+        raw.seek(position)
+    if head != _GZIP_MAGIC:
+        return raw, close
+    stream = gzip.GzipFile(fileobj=raw, mode='rb')
+
+    def close_both():
+        stream.close()
+        close()
+    return stream, close_both
+
+
+def read_entries(lines: Iterable[bytes], problems: Dict[str, List[str]]) -> Iterator[Tuple[str, Dict]]:
+    """
+    Parse and validate export lines
+
+    Lines that are not an entry, or whose ID or document is invalid, are
+    recorded in problems (keyed 'line N' or 'line N (id)') and skipped.
+
+    Yields:
+        Tuple: (character_id, document)
+    """
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+            character_id, document = entry['id'], entry['document']
+        except (ValueError, KeyError, TypeError) as e:
+            problems[f"line {number}"] = [f"not an export entry: {e}"]
+            continue
+        found = validate_document(document) if valid_character_id(character_id) else ["invalid character id"]
+        if found:
+            problems[f"line {number} ({character_id})"] = found
+            continue
+        yield character_id, document
+
+
+def export_characters(repository, destination: Destination, compress: Optional[bool] = None,
+                      character_ids: Optional[Iterable[str]] = None, batch_size: int = EXPORT_BATCH,
+                      progress: Optional[Callable[[int], None]] = None) -> BulkStats:
+    """
+    Stream characters from a repository into one NDJSON file
+
+    Args:
+        repository: CharacterRepository (or anything with list_character_ids() and get_many())
+        destination: Path or binary file
+        compress: gzip the output; None compresses paths ending in .gz
+        character_ids: Characters to export (default: all, oldest first)
+        batch_size: Sheets read in parallel, and held in memory, at a time
+        progress: Called with the number of sheets handled after every batch
+
+    Returns:
+        BulkStats: Sheets exported, NDJSON bytes, throughput and problems
+    """
+    stats = BulkStats()
+    if character_ids is None:
+        character_ids = sorted(repository.list_character_ids(), key=sort_key)
+    character_ids = iter(character_ids)
+    with NdjsonWriter(destination, compress) as writer:
+        while True:
+            batch = [character_id for _, character_id in zip(range(batch_size), character_ids)]
+            if not batch:
+                break
+            for result in repository.get_many(batch):
+                if result.error is not None:
+                    stats.problems[result.character_id] = [f"not exported: {result.error}"]
+                elif result.value is not None:
+                    writer.write(export_line(result.character_id, result.value))
+                    stats.count += 1
+            if progress:
+                progress(len(batch))
+        stats.bytes = writer.bytes
+    return stats.finish()
+
+
+def import_characters(repository, source: Destination, skip_existing: bool = False,
+                      batch_size: int = IMPORT_BATCH,
+                      progress: Optional[Callable[[int], None]] = None) -> BulkStats:
+    """
+    Save every sheet of an NDJSON export, in batches through save_many()
+
+    Args:
+        repository: CharacterRepository to save into
+        source: Path or binary file, plain or gzip-compressed
+        skip_existing: Keep sheets that already exist instead of overwriting them
+        batch_size: Sheets saved in parallel, and held in memory, at a time
+        progress: Called with the number of sheets handled after every batch
+
+    Returns:
+        BulkStats: Sheets imported and skipped, NDJSON bytes read, throughput,
+        and problems (unreadable or invalid lines, failed saves)
+    """
+    stats = BulkStats()
+
+    def save(batch):
+        # Expected version 0 only creates, so existing sheets raise a conflict
+        expected_versions = {character_id: 0 for character_id, _ in batch} if skip_existing else None
+        for result in repository.save_many(batch, expected_versions=expected_versions):
+            if result.ok:
+                stats.count += 1
+            elif skip_existing and isinstance(result.error, VersionConflictError):
+                stats.skipped += 1
+            else:
+                stats.problems.setdefault(result.character_id, []).append(f"not imported: {result.error}")
+        if progress:
+            progress(len(batch))
+
+    def counted(lines):
+        for line in lines:
+            stats.bytes += len(line)
+            yield line
+
+    stream, close = open_ndjson(source)
+    try:
+        batch = []
+        for character_id, document in read_entries(counted(stream), stats.problems):
+            batch.append((character_id, document))
+            if len(batch) >= batch_size:
+                save(batch)
+                batch = []
+        if batch:
+            save(batch)
+    finally:
+        close()
+    return stats.finish()
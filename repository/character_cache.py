@@ -0,0 +1,327 @@
+"""
+Character Cache
+Process-wide, thread-safe read-through LRU cache in front of a CharacterRepository.
+Documents are held as slotted Character models rather than nested dicts.
+Sessions keep only character ids and a private copy of the sheet they edit.
+The cache follows the repository's change feed, so writes that bypass it
+(other tools, bulk imports) invalidate the affected entries.
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
+
+from .character_model import Character
+
+
+class CharacterCache:
+    """Shared LRU cache of character documents with size-based eviction"""
+
+    def __init__(self, repository, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Initialize the cache
+
+        Args:
+            repository: CharacterRepository (or compatible) used for reads and writes
+            max_bytes: Approximate upper bound on the memory held by cached characters
+        """
+        self.repository = repository
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._documents: "OrderedDict[str, Tuple[Character, int]]" = OrderedDict()
+        self._size = 0
+        # Lightweight id -> hero name index for the sidebar, never evicted.
+        # A None name means the character changed and its name is re-read lazily.
+        self._summaries: Optional[Dict[str, Optional[str]]] = None
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _document_size(character: Character) -> int:
+        return character.memory_size()
+
+    def _store(self, character_id: str, character_data: Union[Dict, Character]) -> None:
+        """
+        Insert a private copy of a character and evict down to max_bytes (lock held)
+
+        Reads and saves store their copy after the repository call returns, so
+        a slower caller can arrive with an older version than a concurrent
+        save already cached (and whose change event is already consumed).
+        An older version never replaces a newer one.
+        """
+        if isinstance(character_data, Character):
+            version = character_data.version
+        else:
+            version = character_data.get('version', 0)
+        entry = self._documents.get(character_id)
+        if entry is not None and entry[0].version > version:
+            return
+        if isinstance(character_data, Character):
+            document = character_data.copy()
+        else:
+            document = Character.from_dict(character_data)
+        size = self._document_size(document)
+        if entry is not None:
+            self._size -= self._documents.pop(character_id)[1]
+        if size > self.max_bytes:
+            return
+        self._documents[character_id] = (document, size)
+        self._size += size
+        while self._size > self.max_bytes:
+            _, (_, evicted_size) = self._documents.popitem(last=False)
+            self._size -= evicted_size
+            self.evictions += 1
+
+    def _changed_since(self, character_id: str, version: int, own_writes: int = 0) -> bool:
+        """
+        Whether a character may have changed after a change-feed version (lock held)
+
+        A copy read or written outside the lock must not be stored if some
+        other write to the same character landed meanwhile: that write's
+        event may already be consumed by another session's _sync, leaving
+        nothing to evict the older copy. The feed only reports net changes
+        per id, so with other events in between, the caller's own writes
+        cannot be told apart and the character counts as changed.
+
+        Args:
+            character_id: Character whose copy is about to be stored
+            version: get_version() from before the repository call
+            own_writes: Change events the caller itself produced since then
+        """
+        if self.repository.get_version() - version <= own_writes:
+            return False
+        changes = self.repository.changes_since(version)
+        if changes is None:
+            return True
+        return character_id in changes['added'] + changes['modified'] + changes['removed']
+
+    def _discard(self, character_id: str) -> None:
+        entry = self._documents.pop(character_id, None)
+        if entry is not None:
+            self._size -= entry[1]
+
+    def _load_summaries(self) -> Dict[str, Optional[str]]:
+        """Build the id -> hero name index with one scan per process (lock held)"""
+        if self._summaries is None:
+            # Read the version first: changes made during the scan are re-applied, never missed
+            self._version = self.repository.get_version()
+            self._summaries = {}
+            for character_id, character_data in self.repository.get_all().items():
+                self._summaries[character_id] = character_data.get('hero_name', '')
+                self._store(character_id, character_data)
+        else:
+            self._sync()
+        return self._summaries
+
+    def _sync(self) -> None:
+        """Apply repository changes made since the last sync (lock held)"""
+        if self._summaries is None or self.repository.get_version() == self._version:
+            return
+        changes = self.repository.changes_since(self._version)
+        if changes is None:
+            # Change log overflowed, start over
+            self._documents.clear()
+            self._size = 0
+            self._summaries = None
+            self._load_summaries()
+            return
+        for character_id in changes['added'] + changes['modified']:
+            self._discard(character_id)
+            self._summaries[character_id] = None
+        for character_id in changes['removed']:
+            self._discard(character_id)
+            self._summaries.pop(character_id, None)
+        self._version = changes['version']
+
+    def list_ids(self) -> List[str]:
+        """
+        Get all character IDs known to the store
+
+        Returns:
+            List[str]: Character IDs in load/creation order
+        """
+        with self._lock:
+            return list(self._load_summaries())
+
+    def hero_name(self, character_id: str) -> str:
+        """Get the hero name of a character without copying its document"""
+        with self._lock:
+            summaries = self._load_summaries()
+            if character_id in summaries and summaries[character_id] is None:
+                entry = self._documents.get(character_id)
+                if entry is not None:
+                    summaries[character_id] = entry[0].hero_name
+                else:
+                    character_data = self.repository.get(character_id)
+                    if character_data is not None:
+                        self._store(character_id, character_data)
+                    summaries[character_id] = (character_data or {}).get('hero_name', '')
+            return summaries.get(character_id) or ''
+
+    def get_character(self, character_id: str) -> Optional[Character]:
+        """
+        Get a private copy of a character (read-through on a miss)
+
+        The shared instance is never handed out, so callers may change the
+        returned copy freely.
+
+        Args:
+            character_id: Unique identifier for the character
+
+        Returns:
+            Character: Copy of the character if found, None otherwise
+        """
+        with self._lock:
+            self._sync()
+            entry = self._documents.get(character_id)
+            if entry is not None:
+                self._documents.move_to_end(character_id)
+                self.hits += 1
+                return entry[0].copy()
+            self.misses += 1
+            version = self.repository.get_version()
+
+        character = self.repository.get_character(character_id)
+        if character is None:
+            return None
+        with self._lock:
+            self._sync()
+            if not self._changed_since(character_id, version):
+                self._store(character_id, character)
+        return character
+
+    def get(self, character_id: str) -> Optional[Dict]:
+        """
+        Get a character as a newly built document (see get_character)
+
+        Args:
+            character_id: Unique identifier for the character
+
+        Returns:
+            Dict: Character data if found, None otherwise
+        """
+        character = self.get_character(character_id)
+        return character.to_dict() if character is not None else None
+
+    def save(self, character_id: str, character_data: Union[Dict, Character],
+             expected_version: Optional[int] = None) -> bool:
+        """
+        Save a character through the repository and refresh the cache
+
+        Args:
+            character_id: Unique identifier for the character
+            character_data: Character, or dictionary containing all character information
+            expected_version: If given, only save when the stored version matches
+
+        Returns:
+            bool: True if save was successful, False otherwise
+
+        Raises:
+            VersionConflictError: If expected_version does not match the stored version
+        """
+        version = self.repository.get_version()
+        if not self.repository.save(character_id, character_data, expected_version=expected_version):
+            return False
+        with self._lock:
+            # Consume our own change event first so it does not evict the fresh copy
+            self._sync()
+            if self._changed_since(character_id, version, own_writes=1):
+                self._discard(character_id)
+            else:
+                self._store(character_id, character_data)
+            if self._summaries is not None:
+                entry = self._documents.get(character_id)
+                self._summaries[character_id] = entry[0].hero_name if entry is not None else None
+        return True
+
+    def patch(self, character_id: str, changes: Dict[Tuple, object],
+              expected_version: Optional[int] = None) -> Optional[Character]:
+        """
+        Change individual fields through the repository and refresh the cache
+
+        Args:
+            character_id: Unique identifier for the character
+            changes: Document path -> new value (see CharacterRepository.patch)
+            expected_version: If given, only patch when the stored version matches
+
+        Returns:
+            Character: Copy of the stored character after the patch, None on failure
+
+        Raises:
+            VersionConflictError: If expected_version does not match the stored version
+        """
+        version = self.repository.get_version()
+        document = self.repository.patch(character_id, changes, expected_version=expected_version)
+        if document is None:
+            return None
+        character = Character.from_dict(document)
+        with self._lock:
+            self._sync()
+            if self._changed_since(character_id, version, own_writes=1):
+                self._discard(character_id)
+                if self._summaries is not None:
+                    self._summaries[character_id] = None
+            else:
+                self._store(character_id, character)
+                if self._summaries is not None:
+                    self._summaries[character_id] = character.hero_name
+        return character
+
+    def delete(self, character_id: str, expected_version: Optional[int] = None) -> bool:
+        """
+        Delete a character through the repository and drop it from the cache
+
+        Args:
+            character_id: Unique identifier for the character
+            expected_version: If given, only delete when the stored version matches
+
+        Returns:
+            bool: True if deletion was successful, False otherwise
+        """
+        if not self.repository.delete(character_id, expected_version=expected_version):
+            return False
+        with self._lock:
+            self._discard(character_id)
+            self._sync()
+        return True
+
+    def rename(self, old_character_id: str, new_character_id: str, expected_version: Optional[int] = None) -> bool:
+        """
+        Rename a character through the repository and refresh the cache
+
+        Args:
+            old_character_id: Current character ID
+            new_character_id: New character ID
+            expected_version: If given, only rename when the stored version matches
+
+        Returns:
+            bool: True if rename was successful, False otherwise
+        """
+        if not self.repository.rename(old_character_id, new_character_id, expected_version=expected_version):
+            return False
+        with self._lock:
+            self._sync()
+        return True
+
+    def invalidate(self, character_id: Optional[str] = None) -> None:
+        """Drop one cached document, or everything (including the id index) if no id is given"""
+        with self._lock:
+            if character_id is None:
+                self._documents.clear()
+                self._size = 0
+                self._summaries = None
+            else:
+                self._discard(character_id)
+
+    def stats(self) -> Dict:
+        """Get cache occupancy and hit/miss counters"""
+        with self._lock:
+            return {
+                'documents': len(self._documents),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
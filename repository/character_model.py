@@ -0,0 +1,372 @@
+"""
+Character Model
+Compact, slotted in-memory representation of a character sheet, plus the
+catalog of hidden paths and discoveries the sheet tracks. The journal is a
+fixed-size tuple and hidden paths/discoveries are bitsets over the catalog,
+so copies are cheap and change detection compares a handful of fields.
+The stored document format (see to_dict) is unchanged.
+"""
+import json
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+
+# Hidden path connections per region and location, as printed on each tile side
+HIDDEN_PATH_REGIONS: Dict[str, Dict[str, Dict[str, Tuple[str, ...]]]] = {
+    'Caves': {
+        'Ancient Hole': {'Tile Side 1': ('1-6',), 'Tile Side 2': ('1-6', '3-4', '5-6')},
+        'Black Caves': {'Tile Side 1': ('3-4',), 'Tile Side 2': ('1-6', '3-4', '5-6')},
+        'Dark Passes': {'Tile Side 1': ('1-4', '3-6'), 'Tile Side 2': ('1-4', '2-3', '3-6')},
+        'Forlorn Tunnel': {'Tile Side 1': ('1-5', '2-3'), 'Tile Side 2': ('1-5', '2-3', '2-6', '4-5')},
+        'Secret Dens': {'Tile Side 1': ('5-6',), 'Tile Side 2': ('2-3',)},
+    },
+    'Mountains': {
+        'Barriers': {'Tile Side 1': ('1-3',), 'Tile Side 2': ('1-3', '1-6')},
+        'High Pass': {'Tile Side 1': ('1-5',), 'Tile Side 2': ('1-5', '3-4')},
+        'Lonely Mountains': {'Tile Side 1': ('2-5',), 'Tile Side 2': ('2-5', '3-4')},
+        'Narrow Ridges': {'Tile Side 1': ('5-6',), 'Tile Side 2': ('3-4', '5-6')},
+        'Tri-Peaks': {'Tile Side 1': ('1-5', '4-5'), 'Tile Side 2': ('2-6', '4-5')},
+    },
+    'Woods': {
+        'Deep Woods': {'Tile Side 1': ('1-3',), 'Tile Side 2': ('1-6',)},
+        'Elder Woods': {'Tile Side 1': ('4-6',), 'Tile Side 2': ('3-4',)},
+        'Mirky Woods': {'Tile Side 1': ('2-6',), 'Tile Side 2': ('1-6',)},
+        'Oakwood': {'Tile Side 1': ('1-6',), 'Tile Side 2': ('1-3',)},
+        'Timberlands': {'Tile Side 1': ('3-6',), 'Tile Side 2': ('1-4',)},
+    },
+    'Plains': {
+        'Flatlands': {'Tile Side 1': ('1-2',), 'Tile Side 2': ('5-6',)},
+        'Grassy Plains': {'Tile Side 1': ('4-5',), 'Tile Side 2': ('3-4',)},
+        'The Meadows': {'Tile Side 1': ('1-5',), 'Tile Side 2': ('2-3',)},
+        'Twisted Steppe': {'Tile Side 1': ('1-6',), 'Tile Side 2': ('4-6',)},
+        'Unbroken Lands': {'Tile Side 1': ('1-3',), 'Tile Side 2': ('2-4',)},
+    },
+    'Swamps': {
+        'Decayed Swamp': {'Tile Side 1': ('5-6',), 'Tile Side 2': ('4-5',)},
+        'Foul Swamp': {'Tile Side 1': ('5-6',), 'Tile Side 2': ('1-3',)},
+        'Moorland': {'Tile Side 1': ('2-4',), 'Tile Side 2': ('4-6',)},
+        'Putrid Waters': {'Tile Side 1': ('2-5',), 'Tile Side 2': ('4-6',)},
+        'Quiet Bog': {'Tile Side 1': ('2-3',), 'Tile Side 2': ('5-6',)},
+    },
+}
+
+DISCOVERY_KEYS: Tuple[str, ...] = (
+    'altar', 'crypt', 'hoard', 'secret_cache', 'wrecked_wagons',
+    'catacombs', 'grotto', 'lost_battalion', 'shrine', 'deserted_ruins',
+    'chamber', 'hideout', 'monolith', 'trove', 'forgotten_city',
+)
+
+JOURNAL_LINES = 30
+
+# (location, key) for every hidden path, in bit order; keys look like "1-6_s1"
+HIDDEN_PATH_KEYS: Tuple[Tuple[str, str], ...] = tuple(
+    (location, f"{path}_s{side}")
+    for locations in HIDDEN_PATH_REGIONS.values()
+    for location, sides in locations.items()
+    for side in (1, 2)
+    for path in sides[f'Tile Side {side}']
+)
+
+_PATH_MASKS: Dict[Tuple[str, str], int] = {key: 1 << bit for bit, key in enumerate(HIDDEN_PATH_KEYS)}
+_LOCATION_MASKS: Dict[str, Tuple[Tuple[str, int], ...]] = {}
+for (_location, _key), _mask in _PATH_MASKS.items():
+    _LOCATION_MASKS[_location] = _LOCATION_MASKS.get(_location, ()) + ((_key, _mask),)
+_DISCOVERY_MASKS: Dict[str, int] = {name: 1 << bit for bit, name in enumerate(DISCOVERY_KEYS)}
+
+TEXT_FIELDS = ('hero_name', 'lineage_and_class', 'advantages', 'scenario', 'hero_story')
+# schema_version is dropped on load: a Character is always in the current schema,
+# and the repository stamps it on every write (see migrations.py)
+_KNOWN_KEYS = frozenset(TEXT_FIELDS + ('date', 'last_modified', 'hidden_paths', 'discoveries',
+                                       'journal_entries', 'version', 'schema_version'))
+EMPTY_JOURNAL: Tuple[str, ...] = ('',) * JOURNAL_LINES
+
+
+def set_bits(value: int) -> List[int]:
+    """Indices of the set bits of a bitset, lowest first"""
+    bits = []
+    while value:
+        low = value & -value
+        bits.append(low.bit_length() - 1)
+        value ^= low
+    return bits
+
+
+def validate_document(document) -> List[str]:
+    """
+    Check a stored document against the sheet schema
+
+    Fields may be missing (older sheets) and unknown fields are allowed, but
+    every field present must have the expected type.
+
+    Args:
+        document: Decoded document
+
+    Returns:
+        List[str]: One message per problem, empty if the document is valid
+    """
+    if not isinstance(document, dict):
+        return [f"document is a {type(document).__name__}, not an object"]
+    problems = []
+    for field in TEXT_FIELDS:
+        if not isinstance(document.get(field, ''), str):
+            problems.append(f"{field} is not a string")
+    for field in ('date', 'last_modified'):
+        if not isinstance(document.get(field), (str, type(None))):
+            problems.append(f"{field} is not a string")
+    version = document.get('version', 1)
+    if not isinstance(version, int) or isinstance(version, bool) or version < 1:
+        problems.append("version is not a positive integer")
+
+    hidden_paths = document.get('hidden_paths', {})
+    if not isinstance(hidden_paths, dict):
+        problems.append("hidden_paths is not an object")
+    else:
+        for location, sides in hidden_paths.items():
+            if not isinstance(sides, dict):
+                problems.append(f"hidden_paths/{location} is not an object")
+            elif not all(isinstance(found, bool) for found in sides.values()):
+                problems.append(f"hidden_paths/{location} has non-boolean values")
+    discoveries = document.get('discoveries', {})
+    if not isinstance(discoveries, dict):
+        problems.append("discoveries is not an object")
+    elif not all(isinstance(found, bool) for found in discoveries.values()):
+        problems.append("discoveries has non-boolean values")
+
+    journal = document.get('journal_entries', [])
+    if not isinstance(journal, list):
+        problems.append("journal_entries is not a list")
+    elif not all(isinstance(line, str) for line in journal):
+        problems.append("journal_entries has non-string lines")
+    return problems
+
+
+class Character:
+    """
+    One character sheet
+
+    Text fields are plain strings, journal is a tuple of at least JOURNAL_LINES
+    strings, and paths/discoveries are ints with one bit per catalog entry.
+    Fields outside the catalog (older or newer sheets) are kept in extra and
+    written back unchanged.
+    """
+
+    __slots__ = ('hero_name', 'lineage_and_class', 'advantages', 'scenario', 'hero_story',
+                 'date', 'last_modified', 'journal', 'paths', 'discoveries', 'version', 'extra')
+
+    def __init__(self, hero_name: str = '', lineage_and_class: str = '', advantages: str = '',
+                 scenario: str = '', hero_story: str = '', date: Optional[str] = None,
+                 last_modified: Optional[str] = None, journal: Tuple[str, ...] = EMPTY_JOURNAL,
+                 paths: int = 0, discoveries: int = 0, version: int = 0, extra: Optional[Dict] = None):
+        self.hero_name = hero_name
+        self.lineage_and_class = lineage_and_class
+        self.advantages = advantages
+        self.scenario = scenario
+        self.hero_story = hero_story
+        self.date = date
+        self.last_modified = last_modified
+        self.journal = journal
+        self.paths = paths
+        self.discoveries = discoveries
+        self.version = version
+        self.extra = extra
+
+    @classmethod
+    def empty(cls) -> "Character":
+        """A blank sheet dated now"""
+        return cls(date=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Character":
+        """
+        Build a character from a stored document
+
+        Args:
+            data: Document as returned by CharacterRepository.get()
+
+        Returns:
+            Character: New character; data is not modified
+        """
+        extra = None
+        paths = 0
+        for location, sides in (data.get('hidden_paths') or {}).items():
+            for key, found in sides.items():
+                mask = _PATH_MASKS.get((location, key))
+                if mask is None:
+                    extra = extra or {}
+                    extra.setdefault('hidden_paths', {}).setdefault(location, {})[key] = found
+                elif found:
+                    paths |= mask
+
+        discoveries = 0
+        for name, found in (data.get('discoveries') or {}).items():
+            mask = _DISCOVERY_MASKS.get(name)
+            if mask is None:
+                extra = extra or {}
+                extra.setdefault('discoveries', {})[name] = found
+            elif found:
+                discoveries |= mask
+
+        for key, value in data.items():
+            if key not in _KNOWN_KEYS:
+                extra = extra or {}
+                extra[key] = value
+
+        journal = tuple(data.get('journal_entries') or ())
+        if len(journal) < JOURNAL_LINES:
+            journal += ('',) * (JOURNAL_LINES - len(journal))
+
+        return cls(
+            hero_name=data.get('hero_name', ''),
+            lineage_and_class=data.get('lineage_and_class', ''),
+            advantages=data.get('advantages', ''),
+            scenario=data.get('scenario', ''),
+            hero_story=data.get('hero_story', ''),
+            date=data.get('date'),
+            last_modified=data.get('last_modified'),
+            journal=journal,
+            paths=paths,
+            discoveries=discoveries,
+            version=data.get('version', 0),
+            extra=extra,
+        )
+
+    def to_dict(self) -> Dict:
+        """
+        Convert to the stored document format
+
+        Returns:
+            Dict: Newly built document (callers may mutate it freely)
+        """
+        paths = self.paths
+        hidden_paths = {
+            location: {key: bool(paths & mask) for key, mask in masks}
+            for location, masks in _LOCATION_MASKS.items()
+        }
+        discoveries = {name: bool(self.discoveries & mask) for name, mask in _DISCOVERY_MASKS.items()}
+
+        data = {
+            'hero_name': self.hero_name,
+            'lineage_and_class': self.lineage_and_class,
+            'advantages': self.advantages,
+            'scenario': self.scenario,
+            'hero_story': self.hero_story,
+        }
+        if self.date is not None:
+            data['date'] = self.date
+        if self.last_modified is not None:
+            data['last_modified'] = self.last_modified
+        data['hidden_paths'] = hidden_paths
+        data['discoveries'] = discoveries
+        data['journal_entries'] = list(self.journal)
+        data['version'] = self.version
+
+        if self.extra:
+            for key, value in json.loads(json.dumps(self.extra)).items():
+                if key == 'hidden_paths':
+                    for location, sides in value.items():
+                        hidden_paths.setdefault(location, {}).update(sides)
+                elif key == 'discoveries':
+                    discoveries.update(value)
+                else:
+                    data[key] = value
+        return data
+
+    def copy(self) -> "Character":
+        """Independent copy (strings, the journal tuple and bitsets are immutable, so only extra is copied)"""
+        return Character(
+            self.hero_name, self.lineage_and_class, self.advantages, self.scenario, self.hero_story,
+            self.date, self.last_modified, self.journal, self.paths, self.discoveries, self.version,
+            json.loads(json.dumps(self.extra)) if self.extra else None,
+        )
+
+    def replace(self, **changes) -> "Character":
+        """Copy with some fields changed"""
+        character = self.copy()
+        for field, value in changes.items():
+            setattr(character, field, value)
+        return character
+
+    def content_key(self) -> Tuple:
+        """Everything a player can edit (not version or last_modified), as a hashable tuple"""
+        return (self.hero_name, self.lineage_and_class, self.advantages, self.scenario, self.hero_story,
+                self.date, self.journal, self.paths, self.discoveries,
+                json.dumps(self.extra, sort_keys=True) if self.extra else None)
+
+    def content_hash(self) -> int:
+        """Structural hash of content_key(), for cheap change detection"""
+        return hash(self.content_key())
+
+    def same_content(self, other: "Character") -> bool:
+        """True if both sheets hold the same player-editable content"""
+        return self.content_key() == other.content_key()
+
+    @staticmethod
+    def path_mask(location: str, key: str) -> int:
+        """Bit of a catalog hidden path (KeyError if it is not in the catalog)"""
+        return _PATH_MASKS[(location, key)]
+
+    @staticmethod
+    def discovery_mask(name: str) -> int:
+        """Bit of a catalog discovery (KeyError if it is not in the catalog)"""
+        return _DISCOVERY_MASKS[name]
+
+    def journal_lines(self) -> int:
+        """Number of journal lines with text"""
+        return sum(1 for line in self.journal if line.strip())
+
+    def has_path(self, location: str, key: str) -> bool:
+        mask = _PATH_MASKS.get((location, key))
+        if mask is None:
+            return bool(((self.extra or {}).get('hidden_paths') or {}).get(location, {}).get(key, False))
+        return bool(self.paths & mask)
+
+    def has_discovery(self, name: str) -> bool:
+        mask = _DISCOVERY_MASKS.get(name)
+        if mask is None:
+            return bool(((self.extra or {}).get('discoveries') or {}).get(name, False))
+        return bool(self.discoveries & mask)
+
+    def value_at(self, path: Tuple) -> object:
+        """
+        Value at a document path, as used by CharacterRepository.patch()
+
+        Args:
+            path: e.g. ('hero_name',), ('journal_entries', 3),
+                ('hidden_paths', 'Oakwood', '1-6_s1') or ('discoveries', 'altar')
+        """
+        field = path[0]
+        if field == 'journal_entries':
+            return self.journal[path[1]]
+        if field == 'hidden_paths':
+            return self.has_path(path[1], path[2])
+        if field == 'discoveries':
+            return self.has_discovery(path[1])
+        if field in self.__slots__:
+            return getattr(self, field)
+        return (self.extra or {}).get(field)
+
+    def memory_size(self) -> int:
+        """Approximate bytes held by this object and the values it owns"""
+        size = sys.getsizeof(self) + sys.getsizeof(self.journal) + sys.getsizeof(self.paths)
+        size += sys.getsizeof(self.discoveries)
+        for field in TEXT_FIELDS:
+            size += sys.getsizeof(getattr(self, field))
+        for value in (self.date, self.last_modified):
+            if value is not None:
+                size += sys.getsizeof(value)
+        size += sum(sys.getsizeof(line) for line in self.journal)
+        if self.extra:
+            size += len(json.dumps(self.extra))
+        return size
+
+    def __eq__(self, other):
+        if not isinstance(other, Character):
+            return NotImplemented
+        return (self.content_key() == other.content_key() and self.version == other.version
+                and self.last_modified == other.last_modified)
+
+    __hash__ = None  # mutable; use content_hash() for change detection
+
+    def __repr__(self):
+        return f"Character(hero_name={self.hero_name!r}, version={self.version})"
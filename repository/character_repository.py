@@ -3,66 +3,563 @@ Character Repository
 Handles persistence of character data using JSON files.
 This implementation can be easily replaced with a NoSQL database (MongoDB, etc.) later.
 """
+import bisect
+import contextvars
+import copy
 import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Dict, List
+from typing import Optional, Dict, Iterable, List, Mapping, NamedTuple, Tuple, Union
 from datetime import datetime
 
+from .aggregates import AggregateStore
+from .archive import ArchiveStore
+from .character_model import Character
+from .history import HistoryStore
+from .progress import ProgressLog
+from .search import SearchIndex
+from .ids import sort_key
+from .locking import FileLock, StripedLockManager
+from .migrations import migrate_document
+from .serialization import DEFAULT_CODEC, decode_document, get_codec
+
+
+class VersionConflictError(Exception):
+    """Raised when a write's expected version does not match the stored version"""
+    
+    def __init__(self, character_id: str, expected_version: int, actual_version: int):
+        super().__init__(
+            f"Character {character_id} is at version {actual_version}, expected {expected_version}"
+        )
+        self.character_id = character_id
+        self.expected_version = expected_version
+        self.actual_version = actual_version
+
+
+class BatchResult(NamedTuple):
+    """Outcome of one item of get_many() or save_many()"""
+    character_id: str
+    value: object = None
+    error: Optional[Exception] = None
+    
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
 
 class CharacterRepository:
     """Repository for managing character data persistence"""
     
-    def __init__(self, storage_path: str = "character_sheets"):
+    def __init__(self, storage_path: str = "character_sheets", change_log_size: int = 1024,
+                 lock_stripes: Optional[int] = None, process_locks: bool = True, shared_manifest: bool = False,
+                 manifest_compact_bytes: int = 4 * 1024 * 1024, io_workers: Optional[int] = None,
+                 codec=DEFAULT_CODEC, history: bool = True, progress: bool = True,
+                 aggregates: bool = True, search: bool = True, archive: bool = True):
         """
         Initialize the character repository
         
         Args:
             storage_path: Directory path where character JSON files will be stored
+            change_log_size: Number of recent changes kept for changes_since()
+            lock_stripes: Number of lock stripes shared by all character IDs (None for
+                the count the store was created with); a store's count cannot change,
+                so a different one raises ValueError
+            process_locks: Also take fcntl file locks so other processes are excluded
+            shared_manifest: Publish changes to a manifest shared by every process
+                using this storage path (replica mode), so each process's change
+                feed and caches also see the other processes' writes
+            manifest_compact_bytes: Rewrite the manifest as a snapshot once it grows past this size
+            io_workers: Threads used by get_many()/save_many() (None for min(32, CPUs + 4))
+            codec: Name (or Codec instance) of the format new writes use; documents
+                in any available format are always readable (see serialization.py)
+            history: Record every write in the deduplicated version history
+                (see history.py), so earlier versions can be listed, diffed and restored
+            progress: Record each write's path, discovery and journal progress in a
+                delta-encoded time series (see progress.py) for get_progress()
+            aggregates: Maintain running totals over all characters on every write
+                (see aggregates.py) for get_statistics()
+            search: Maintain a full-text index of journals, stories and scenarios
+                (see search.py) for search()
+            archive: Read characters that archive_idle() moved into compressed
+                pack files (see archive.py); without it they are invisible
         """
+        self.codec = get_codec(codec)
         self.storage_path = Path(storage_path)
         self.storage_path.mkdir(exist_ok=True)
+        
+        # Writers lock their character's stripe; readers need no lock because
+        # every write atomically replaces the file
+        lock_dir = self.storage_path / ".store" / "locks" if process_locks else None
+        self.locks = StripedLockManager(stripes=lock_stripes, lock_dir=lock_dir)
+        self.history = HistoryStore(self.storage_path / ".store" / "history") if history else None
+        self.progress = ProgressLog(self.storage_path / ".store" / "progress") if progress else None
+        self.aggregates = AggregateStore(self.storage_path / ".store" / "aggregates.json") if aggregates else None
+        # Before the search index, whose loader may read archived characters while it opens
+        self.archive = ArchiveStore(self.storage_path / ".store" / "archive") if archive else None
+        self.search_index = SearchIndex(self.storage_path / ".store" / "search", loader=self._get) if search else None
+        
+        # Change feed: a monotonic version plus the most recent (version, op, id) events
+        self._change_lock = threading.Lock()
+        self._version = 0
+        self._changes = deque(maxlen=change_log_size)
+        
+        # IDs sorted by creation time, built from file names on first use and
+        # then kept current from the change feed
+        self._id_index = None
+        
+        # Replica mode: events go through .store/manifest.log, an append-only
+        # JSON-lines file; each process tails it from where it joined
+        self.manifest_compact_bytes = manifest_compact_bytes
+        self._manifest = None
+        if shared_manifest:
+            self._manifest = FileLock(self.storage_path / ".store" / "manifest.log")
+            with self._manifest:
+                stat = os.stat(self._manifest.path)
+            self._manifest_inode = stat.st_ino
+            self._manifest_offset = stat.st_size
+        
+        # Batch file I/O pool, created on first use
+        self.io_workers = io_workers or min(32, (os.cpu_count() or 1) + 4)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        
+        # A store that predates the totals (or lost them) is counted once
+        if self.aggregates is not None and not self.aggregates.exists():
+            self.rebuild_statistics()
+        if self.search_index is not None and self.search_index.is_empty() and self.list_character_ids():
+            self.rebuild_search_index()
     
-    def save(self, character_id: str, character_data: Dict) -> bool:
+    def _record_change(self, op: str, character_id: str) -> None:
+        """
+        Append an 'added', 'modified' or 'removed' event to the change feed
+        
+        Called with the character's lock held, so events for one character
+        reach the feed (and the shared manifest) in write order.
+        """
+        if self._manifest is None:
+            with self._change_lock:
+                self._version += 1
+                self._changes.append((self._version, op, character_id))
+                self._index_event(op, character_id)
+            return
+        
+        line = json.dumps({'op': op, 'id': character_id}, ensure_ascii=False) + "\n"
+        with self._manifest as handle:
+            handle.write(line)
+            handle.flush()
+            if handle.tell() > self.manifest_compact_bytes:
+                self._compact_manifest()
+            with self._change_lock:
+                self._poll_manifest()
+    
+    def _poll_manifest(self) -> None:
+        """Read manifest events written since the last poll (change lock held)"""
+        try:
+            stat = os.stat(self._manifest.path)
+        except FileNotFoundError:
+            return
+        if stat.st_ino != self._manifest_inode or stat.st_size < self._manifest_offset:
+            # Compacted by some process: events may have been dropped, so skip a
+            # version to make changes_since() report that callers must reload
+            self._manifest_inode = stat.st_ino
+            self._manifest_offset = 0
+            self._changes.clear()
+            self._version += 1
+            self._id_index = None
+        if stat.st_size == self._manifest_offset:
+            return
+        
+        with open(self._manifest.path, 'rb') as f:
+            f.seek(self._manifest_offset)
+            data = f.read(stat.st_size - self._manifest_offset)
+        # Only consume complete lines; a partial tail is re-read next poll
+        complete = data[:data.rfind(b"\n") + 1]
+        self._manifest_offset += len(complete)
+        for line in complete.splitlines():
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            self._version += 1
+            self._changes.append((self._version, event['op'], event['id']))
+            self._index_event(event['op'], event['id'])
+    
+    def _index_event(self, op: str, character_id: str) -> None:
+        """Apply a change-feed event to the creation-time index (change lock held)"""
+        if self._id_index is None:
+            return
+        entry = sort_key(character_id)
+        position = bisect.bisect_left(self._id_index, entry)
+        present = position < len(self._id_index) and self._id_index[position] == entry
+        if op == 'removed' and present:
+            del self._id_index[position]
+        elif op != 'removed' and not present:
+            self._id_index.insert(position, entry)
+    
+    def _compact_manifest(self) -> None:
+        """Replace the manifest with one 'added' event per stored character (manifest lock held)"""
+        tmp_path = self._manifest.path.with_name(f".manifest.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for character_id in self.list_character_ids():
+                f.write(json.dumps({'op': 'added', 'id': character_id}, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self._manifest.path)
+        self._manifest.reopen()
+    
+    def get_version(self) -> int:
+        """
+        Get the current change-feed version (cheap enough to poll every rerun)
+        
+        In replica mode this stats the shared manifest and reads any new events.
+        
+        Returns:
+            int: Version that increases on every save, delete and rename
+        """
+        if self._manifest is not None:
+            with self._change_lock:
+                self._poll_manifest()
+        return self._version
+    
+    def changes_since(self, version: int) -> Optional[Dict]:
+        """
+        Get the net changes made after a given version
+        
+        Args:
+            version: Version previously returned by get_version() or changes_since()
+            
+        Returns:
+            Dict: {'version', 'added', 'removed', 'modified'} with lists of IDs,
+            or None if the change log no longer reaches back to that version
+            and the caller must reload everything
+        """
+        with self._change_lock:
+            if self._manifest is not None:
+                self._poll_manifest()
+            current = self._version
+            if version >= current:
+                return {'version': current, 'added': [], 'removed': [], 'modified': []}
+            if not self._changes or self._changes[0][0] > version + 1:
+                return None
+            events = [event for event in self._changes if event[0] > version]
+        
+        # Fold each ID's events into a net effect: did it exist before and after?
+        existed_before = {}
+        exists_after = {}
+        for _, op, character_id in events:
+            existed_before.setdefault(character_id, op != 'added')
+            exists_after[character_id] = op != 'removed'
+        
+        changes = {'version': current, 'added': [], 'removed': [], 'modified': []}
+        for character_id, before in existed_before.items():
+            after = exists_after[character_id]
+            if after and not before:
+                changes['added'].append(character_id)
+            elif before and not after:
+                changes['removed'].append(character_id)
+            elif before and after:
+                changes['modified'].append(character_id)
+        return changes
+    
+    def _read_document(self, filepath: Path) -> Dict:
+        """Read and decode a single character file, upgraded to the current schema"""
+        with open(filepath, 'rb') as f:
+            return self._decode(f.read(), filepath.stem)
+    
+    def _decode(self, data: bytes, character_id: str) -> Dict:
+        character_data = decode_document(data)
+        # Sheets written before versioning count as version 1
+        character_data.setdefault('version', 1)
+        return migrate_document(character_data, character_id)
+    
+    def _read_archived(self, character_id: str) -> Optional[Dict]:
+        """Read a character from the archive tier (None if it is not archived)"""
+        if self.archive is None:
+            return None
+        data = self.archive.read(character_id)
+        return self._decode(data, character_id) if data is not None else None
+    
+    def _thaw(self, character_id: str) -> None:
+        """Drop the archived copy of a character whose sheet was just written or deleted (lock held)"""
+        if self.archive is not None:
+            self.archive.forget(character_id)
+    
+    def _write_document(self, filepath: Path, character_data: Dict) -> None:
+        """Encode and atomically replace a single character file"""
+        tmp_path = filepath.with_name(f".{filepath.name}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(self.codec.encode(character_data))
+        os.replace(tmp_path, filepath)
+    
+    def _written(self, character_id: str, old_document: Optional[Dict], document: Optional[Dict]) -> None:
+        """
+        Bookkeeping after a write (character lock held)
+        
+        The write is already on disk, so a failing step is logged and the
+        others still run; the caller goes on to report the write and record
+        its change event.
+        
+        Args:
+            character_id: Unique identifier for the character
+            old_document: The stored document before the write (None if created)
+            document: The document written (None if deleted)
+        """
+        if document is not None:
+            self._after_write("archive", character_id, self._thaw, character_id)
+            if self.history is not None:
+                self._after_write("history", character_id, self.history.record, character_id, document)
+            if self.progress is not None:
+                self._after_write("progress", character_id, self.progress.record, character_id, document)
+        if self.aggregates is not None:
+            self._after_write("running totals", character_id, self.aggregates.update, old_document, document)
+        if self.search_index is not None:
+            self._after_write("search index", character_id, self.search_index.update, character_id, document)
+    
+    @staticmethod
+    def _after_write(what: str, character_id: str, step, *args) -> None:
+        """Run one bookkeeping step of a committed write, logging instead of raising"""
+        try:
+            step(*args)
+        except Exception as e:
+            print(f"Error updating {what} for character {character_id}: {e}")
+    
+    def _stored_document(self, filepath: Path) -> Optional[Dict]:
+        """Document currently on disk (None if the character does not exist)"""
+        try:
+            return self._read_document(filepath)
+        except FileNotFoundError:
+            return self._read_archived(filepath.stem)
+    
+    def _check_version(self, character_id: str, filepath: Path, expected_version: Optional[int]) -> Optional[Dict]:
+        """Raise VersionConflictError unless the stored version matches; return the stored document"""
+        stored = self._stored_document(filepath)
+        stored_version = stored['version'] if stored is not None else 0
+        if expected_version is not None and stored_version != expected_version:
+            raise VersionConflictError(character_id, expected_version, stored_version)
+        return stored
+    
+    def save(self, character_id: str, character_data: Union[Dict, Character],
+             expected_version: Optional[int] = None) -> bool:
         """
         Save a character to storage
         
+        The repository maintains the character's version: each save stores
+        the next version and writes it back into character_data.
+        
         Args:
             character_id: Unique identifier for the character
-            character_data: Dictionary containing all character information
+            character_data: Character, or dictionary containing all character information
+            expected_version: If given, only save when the stored version matches
+                (0 means the character must not exist yet)
             
         Returns:
             bool: True if save was successful, False otherwise
+            
+        Raises:
+            VersionConflictError: If expected_version does not match the stored version
         """
         try:
-            filepath = self.storage_path / f"{character_id}.json"
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(character_data, f, indent=2, ensure_ascii=False)
+            self._save(character_id, character_data, expected_version)
             return True
+        except VersionConflictError:
+            raise
         except Exception as e:
             print(f"Error saving character {character_id}: {e}")
             return False
     
-    def get(self, character_id: str) -> Optional[Dict]:
+    def _save(self, character_id: str, character_data: Union[Dict, Character], expected_version: Optional[int]) -> int:
+        """Save one character, raising on any failure; return the new version"""
+        filepath = self.storage_path / f"{character_id}.json"
+        is_model = isinstance(character_data, Character)
+        with self.locks.lock(character_id):
+            stored = self._check_version(character_id, filepath, expected_version)
+            document = character_data.to_dict() if is_model else dict(character_data)
+            document = migrate_document(document, character_id, copy_on_write=not is_model)
+            document['version'] = (stored['version'] if stored is not None else 0) + 1
+            self._write_document(filepath, document)
+            self._written(character_id, stored, document)
+            self._record_change('modified' if stored is not None else 'added', character_id)
+        if is_model:
+            character_data.version = document['version']
+        else:
+            character_data['version'] = document['version']
+        return document['version']
+    
+    def _get(self, character_id: str) -> Optional[Dict]:
+        """Read one character, raising on any failure other than it being missing"""
+        try:
+            return self._read_document(self.storage_path / f"{character_id}.json")
+        except FileNotFoundError:
+            return self._read_archived(character_id)
+    
+    def patch(self, character_id: str, changes: Mapping[Tuple, object],
+              expected_version: Optional[int] = None) -> Optional[Dict]:
         """
-        Retrieve a character by ID
+        Change individual fields of a stored character
+        
+        Only the given fields are written; everything else keeps its stored
+        value, so fields edited elsewhere are not overwritten with stale copies.
         
         Args:
             character_id: Unique identifier for the character
+            changes: Document path -> new value, e.g. {('hero_name',): 'Aria',
+                ('journal_entries', 3): 'Day 4', ('hidden_paths', 'Oakwood', '1-6_s1'): True}
+            expected_version: If given, only patch when the stored version matches
             
         Returns:
-            Dict: Character data if found, None otherwise
+            Dict: The stored document after the patch (with its new version),
+            None if the character does not exist or the write failed
+            
+        Raises:
+            VersionConflictError: If expected_version does not match the stored version
         """
         try:
             filepath = self.storage_path / f"{character_id}.json"
-            if not filepath.exists():
-                return None
+            with self.locks.lock(character_id):
+                stored = self._stored_document(filepath)
+                if stored is None:
+                    return None
+                if expected_version is not None and stored['version'] != expected_version:
+                    raise VersionConflictError(character_id, expected_version, stored['version'])
+                document = copy.deepcopy(stored)
+                for path, value in changes.items():
+                    _set_path(document, path, value)
+                document['version'] += 1
+                self._write_document(filepath, document)
+                self._written(character_id, stored, document)
+                self._record_change('modified', character_id)
+            return document
+        except VersionConflictError:
+            raise
+        except Exception as e:
+            print(f"Error patching character {character_id}: {e}")
+            return None
+    
+    def get(self, character_id: str) -> Optional[Dict]:
+        """
+        Retrieve a character by ID
+        
+        Args:
+            character_id: Unique identifier for the character
             
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return json.load(f)
+        Returns:
+            Dict: Character data (including its 'version') if found, None otherwise
+        """
+        try:
+            return self._get(character_id)
         except Exception as e:
             print(f"Error loading character {character_id}: {e}")
             return None
     
+    def get_character(self, character_id: str) -> Optional[Character]:
+        """
+        Retrieve a character by ID as a Character model
+        
+        Args:
+            character_id: Unique identifier for the character
+            
+        Returns:
+            Character: The character if found, None otherwise
+        """
+        character_data = self.get(character_id)
+        return Character.from_dict(character_data) if character_data is not None else None
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.io_workers,
+                                                    thread_name_prefix="character-io")
+            return self._executor
+    
+    def _map_batch(self, func, keys: List) -> List[Tuple[object, Optional[Exception]]]:
+        """
+        Call func(key) for every key on the I/O pool
+        
+        Keys are submitted in a few chunks per worker rather than one task
+        each, so per-task overhead stays small next to the file I/O.
+        
+        Returns:
+            List: (value, error) pairs in key order
+        """
+        def run_chunk(chunk):
+            outcomes = []
+            for key in chunk:
+                try:
+                    outcomes.append((func(key), None))
+                except Exception as e:
+                    outcomes.append((None, e))
+            return outcomes
+        
+        if len(keys) <= 1:
+            return run_chunk(keys)
+        executor = self._get_executor()
+        chunk_size = max(1, -(-len(keys) // (self.io_workers * 4)))
+        # Copy the context so per-call instrumentation follows the work
+        futures = [executor.submit(contextvars.copy_context().run, run_chunk, keys[i:i + chunk_size])
+                   for i in range(0, len(keys), chunk_size)]
+        return [outcome for future in futures for outcome in future.result()]
+    
+    def get_many(self, character_ids: Iterable[str]) -> List[BatchResult]:
+        """
+        Retrieve several characters, reading files in parallel
+        
+        Args:
+            character_ids: Unique identifiers of the characters
+            
+        Returns:
+            List[BatchResult]: One result per ID, in the same order; value is the
+            character data (None if it does not exist) and error the exception
+            raised while reading it, if any
+        """
+        return self._get_many(character_ids)
+    
+    def _get_many(self, character_ids: Iterable[str]) -> List[BatchResult]:
+        character_ids = list(character_ids)
+        return [BatchResult(character_id, value, error)
+                for character_id, (value, error) in zip(character_ids, self._map_batch(self._get, character_ids))]
+    
+    def save_many(self, items: Union[Mapping[str, Union[Dict, Character]], Iterable[Tuple[str, Union[Dict, Character]]]],
+                  expected_versions: Optional[Mapping[str, int]] = None) -> List[BatchResult]:
+        """
+        Save several characters, writing files in parallel
+        
+        Each item is saved independently: a failure or version conflict only
+        affects that item. Repeated IDs are written one after another, in order.
+        
+        Args:
+            items: Mapping or (character_id, character_data) pairs; data may be dicts or Characters
+            expected_versions: Optional per-ID expected versions (see save())
+            
+        Returns:
+            List[BatchResult]: One result per item, in the same order; value is the
+            new version, or None with error set (e.g. VersionConflictError)
+        """
+        items = list(items.items() if isinstance(items, Mapping) else items)
+        expected_versions = expected_versions or {}
+        
+        # One task per ID keeps repeated IDs in order
+        positions: Dict[str, List[int]] = {}
+        for index, (character_id, _) in enumerate(items):
+            positions.setdefault(character_id, []).append(index)
+        
+        def save_group(character_id: str) -> List[BatchResult]:
+            group = []
+            for index in positions[character_id]:
+                try:
+                    version = self._save(character_id, items[index][1], expected_versions.get(character_id))
+                    group.append(BatchResult(character_id, version))
+                except Exception as e:
+                    group.append(BatchResult(character_id, None, e))
+            return group
+        
+        results: List[Optional[BatchResult]] = [None] * len(items)
+        for character_id, (group, _) in zip(positions, self._map_batch(save_group, list(positions))):
+            for index, result in zip(positions[character_id], group):
+                results[index] = result
+        return results
+    
     def get_all(self) -> Dict[str, Dict]:
         """
         Retrieve all characters from storage
@@ -71,36 +568,41 @@ class CharacterRepository:
             Dict: Dictionary mapping character IDs to character data
         """
         characters = {}
-        try:
-            for filepath in self.storage_path.glob("*.json"):
-                try:
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        char_data = json.load(f)
-                        characters[filepath.stem] = char_data
-                except Exception as e:
-                    print(f"Error loading character from {filepath}: {e}")
-                    continue
-        except Exception as e:
-            print(f"Error scanning character directory: {e}")
+        for result in self._get_many(self.list_character_ids()):
+            if result.error is not None:
+                print(f"Error loading character {result.character_id}: {result.error}")
+            elif result.value is not None:
+                characters[result.character_id] = result.value
         
         return characters
     
-    def delete(self, character_id: str) -> bool:
+    def delete(self, character_id: str, expected_version: Optional[int] = None) -> bool:
         """
         Delete a character from storage
         
         Args:
             character_id: Unique identifier for the character
+            expected_version: If given, only delete when the stored version matches
             
         Returns:
             bool: True if deletion was successful, False otherwise
+            
+        Raises:
+            VersionConflictError: If expected_version does not match the stored version
         """
         try:
             filepath = self.storage_path / f"{character_id}.json"
-            if filepath.exists():
-                filepath.unlink()
-                return True
-            return False
+            with self.locks.lock(character_id):
+                if not self.exists(character_id):
+                    return False
+                stored = self._check_version(character_id, filepath, expected_version)
+                filepath.unlink(missing_ok=True)
+                self._thaw(character_id)
+                self._written(character_id, stored, None)
+                self._record_change('removed', character_id)
+            return True
+        except VersionConflictError:
+            raise
         except Exception as e:
             print(f"Error deleting character {character_id}: {e}")
             return False
@@ -116,71 +618,414 @@ class CharacterRepository:
             bool: True if character exists, False otherwise
         """
         filepath = self.storage_path / f"{character_id}.json"
-        return filepath.exists()
+        return filepath.exists() or (self.archive is not None and self.archive.contains(character_id))
     
     def list_character_ids(self) -> List[str]:
         """
         Get a list of all character IDs
         
         Returns:
-            List[str]: List of character IDs
+            List[str]: List of character IDs, archived ones included
         """
         try:
-            return [f.stem for f in self.storage_path.glob("*.json")]
+            character_ids = [f.stem for f in self.storage_path.glob("*.json")]
+            if self.archive is not None:
+                hot = set(character_ids)
+                character_ids.extend(character_id for character_id in self.archive.ids() if character_id not in hot)
+            return character_ids
         except Exception as e:
             print(f"Error listing character IDs: {e}")
             return []
     
-    def update(self, character_id: str, character_data: Dict) -> bool:
+    def list_character_ids_between(self, start: Optional[datetime] = None,
+                                   end: Optional[datetime] = None) -> List[str]:
+        """
+        Get the IDs of characters created in a time range, oldest first
+        
+        Creation times come from the IDs themselves (see ids.py), so no
+        character file is opened. IDs that carry no time sort first and are
+        only returned when start is None.
+        
+        Args:
+            start: Earliest creation time, inclusive (None for no lower bound)
+            end: Latest creation time, exclusive (None for no upper bound)
+            
+        Returns:
+            List[str]: Matching character IDs in creation order
+        """
+        with self._change_lock:
+            if self._manifest is not None:
+                self._poll_manifest()
+            if self._id_index is None:
+                self._id_index = sorted(sort_key(character_id) for character_id in self.list_character_ids())
+            index = self._id_index
+            start_ms, end_ms = _time_range_ms(start, end)
+            low = 0 if start_ms is None else bisect.bisect_left(index, (start_ms, ""))
+            high = len(index) if end_ms is None else bisect.bisect_left(index, (end_ms, ""))
+            return [character_id for _, character_id in index[low:high]]
+    
+    def update(self, character_id: str, character_data: Union[Dict, Character],
+               expected_version: Optional[int] = None) -> bool:
         """
         Update an existing character (alias for save)
         
         Args:
             character_id: Unique identifier for the character
             character_data: Dictionary containing updated character information
+            expected_version: If given, only update when the stored version matches
             
         Returns:
             bool: True if update was successful, False otherwise
+            
+        Raises:
+            VersionConflictError: If expected_version does not match the stored version
         """
-        return self.save(character_id, character_data)
+        return self.save(character_id, character_data, expected_version=expected_version)
     
-    def rename(self, old_character_id: str, new_character_id: str) -> bool:
+    def rename(self, old_character_id: str, new_character_id: str, expected_version: Optional[int] = None) -> bool:
         """
         Rename a character (useful when hero name changes)
         
         Args:
             old_character_id: Current character ID
             new_character_id: New character ID
+            expected_version: If given, only rename when the old character's stored version matches
             
         Returns:
             bool: True if rename was successful, False otherwise
+            
+        Raises:
+            VersionConflictError: If expected_version does not match the stored version
         """
         try:
             old_filepath = self.storage_path / f"{old_character_id}.json"
             new_filepath = self.storage_path / f"{new_character_id}.json"
             
-            if not old_filepath.exists():
-                return False
+            with self.locks.lock(old_character_id, new_character_id):
+                if not self.exists(old_character_id):
+                    return False
+                
+                if self.exists(new_character_id):
+                    print(f"Character {new_character_id} already exists")
+                    return False
+                
+                # History and progress outlive deletes; renaming onto a deleted
+                # character would replace its versions and progress series
+                if any(store is not None and store.has_log(new_character_id)
+                       for store in (self.history, self.progress)):
+                    print(f"Character {new_character_id} was deleted but its history is kept")
+                    return False
+                
+                # Read the old file
+                stored = self._check_version(old_character_id, old_filepath, expected_version)
+                char_data = dict(stored)
+                char_data['version'] += 1
+                
+                # Save to new location
+                self._write_document(new_filepath, char_data)
+                
+                # Delete old file; the history moves with the character
+                old_filepath.unlink(missing_ok=True)
+                self._thaw(old_character_id)
+                if self.history is not None:
+                    self._after_write("history", old_character_id, self.history.rename,
+                                      old_character_id, new_character_id)
+                if self.progress is not None:
+                    self._after_write("progress", old_character_id, self.progress.rename,
+                                      old_character_id, new_character_id)
+                self._written(old_character_id, stored, None)
+                self._written(new_character_id, None, char_data)
+                self._record_change('removed', old_character_id)
+                self._record_change('added', new_character_id)
+            return True
+        except VersionConflictError:
+            raise
+        except Exception as e:
+            print(f"Error renaming character from {old_character_id} to {new_character_id}: {e}")
+            return False
+    
+    def list_versions(self, character_id: str) -> List[Dict]:
+        """
+        List the recorded versions of a character, including deleted characters
+        
+        Args:
+            character_id: Unique identifier for the character
             
-            if new_filepath.exists():
-                print(f"Character {new_character_id} already exists")
-                return False
+        Returns:
+            List[Dict]: {'version', 'last_modified', 'recorded', 'changed'} per
+            version, oldest first; 'changed' names the sections ('info',
+            'journal', 'hidden_paths', 'discoveries') that differ from the
+            previous version. Empty if history is disabled.
+        """
+        if self.history is None:
+            return []
+        try:
+            return self.history.versions(character_id)
+        except Exception as e:
+            print(f"Error listing versions of character {character_id}: {e}")
+            return []
+    
+    def load_version(self, character_id: str, version: int) -> Optional[Dict]:
+        """
+        Retrieve a recorded version of a character
+        
+        Args:
+            character_id: Unique identifier for the character
+            version: Version number from list_versions()
+            
+        Returns:
+            Dict: The character as it was at that version, None if not recorded
+        """
+        if self.history is None:
+            return None
+        try:
+            document = self.history.load(character_id, version)
+            return migrate_document(document, character_id) if document is not None else None
+        except Exception as e:
+            print(f"Error loading version {version} of character {character_id}: {e}")
+            return None
+    
+    def diff_versions(self, character_id: str, from_version: int,
+                      to_version: int) -> Optional[Dict[Tuple, Tuple[object, object]]]:
+        """
+        Compare two recorded versions of a character
+        
+        Args:
+            character_id: Unique identifier for the character
+            from_version: Older version number
+            to_version: Newer version number
+            
+        Returns:
+            Dict: Document path -> (old value, new value) for each changed field,
+            e.g. {('hidden_paths', 'Oakwood', '1-6_s1'): (False, True)};
+            None if either version is not recorded
+        """
+        if self.history is None:
+            return None
+        try:
+            return self.history.diff(character_id, from_version, to_version)
+        except Exception as e:
+            print(f"Error comparing versions of character {character_id}: {e}")
+            return None
+    
+    def restore(self, character_id: str, version: int, expected_version: Optional[int] = None) -> Optional[int]:
+        """
+        Write a recorded version back as the character's newest version
+        
+        Nothing is overwritten in the history: the restored content is saved
+        as a new version, so a restore can itself be undone. Deleted
+        characters can be restored too.
+        
+        Args:
+            character_id: Unique identifier for the character
+            version: Version number from list_versions()
+            expected_version: If given, only restore when the stored version matches
+            
+        Returns:
+            int: The new version, None if that version is not recorded or the write failed
+            
+        Raises:
+            VersionConflictError: If expected_version does not match the stored version
+        """
+        document = self.load_version(character_id, version)
+        if document is None:
+            return None
+        document['last_modified'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            return self._save(character_id, document, expected_version)
+        except VersionConflictError:
+            raise
+        except Exception as e:
+            print(f"Error restoring version {version} of character {character_id}: {e}")
+            return None
+    
+    def get_progress(self, character_id: str, start: Optional[datetime] = None,
+                     end: Optional[datetime] = None, details: bool = False) -> List[Dict]:
+        """
+        Get a character's progress over time from its progress log
+        
+        Only the compact log is read; no character document is opened.
+        
+        Args:
+            character_id: Unique identifier for the character
+            start: Earliest write to include (None for no lower bound)
+            end: Latest write to include, exclusive (None for no upper bound)
+            details: Also list the paths and discoveries found or lost at each write
             
-            # Read the old file
-            with open(old_filepath, 'r', encoding='utf-8') as f:
-                char_data = json.load(f)
+        Returns:
+            List[Dict]: One point per write, oldest first: {'time' (Unix ms),
+            'version', 'paths', 'discoveries', 'journal_lines'} counts, plus
+            'found' and 'lost' when details is True. Empty if progress is disabled.
+        """
+        if self.progress is None:
+            return []
+        try:
+            return self.progress.series(character_id, *_time_range_ms(start, end), details=details)
+        except Exception as e:
+            print(f"Error loading progress of character {character_id}: {e}")
+            return []
+    
+    def get_progress_many(self, character_ids: Iterable[str], start: Optional[datetime] = None,
+                          end: Optional[datetime] = None) -> Dict[str, List[Dict]]:
+        """
+        Get the progress of several characters, reading their logs in parallel
+        
+        Returns:
+            Dict[str, List[Dict]]: Character ID -> points as from get_progress()
+            (an empty list for characters without a readable log)
+        """
+        character_ids = list(character_ids)
+        if self.progress is None:
+            return {character_id: [] for character_id in character_ids}
+        start_ms, end_ms = _time_range_ms(start, end)
+        outcomes = self._map_batch(lambda character_id: self.progress.series(character_id, start_ms, end_ms),
+                                   character_ids)
+        return {character_id: value if error is None else []
+                for character_id, (value, error) in zip(character_ids, outcomes)}
+    
+    def get_statistics(self) -> Optional[Dict]:
+        """
+        Get running totals over all characters without scanning the store
+        
+        Returns:
+            Dict: {'characters', 'paths' (location -> path key -> characters that
+            found it), 'discoveries' (name -> characters), 'lineage_and_class'
+            (value -> characters), 'journal_lines' (filled lines in all journals),
+            'journals_started' (characters with at least one journal line)};
+            None if aggregates are disabled or unreadable
+        """
+        if self.aggregates is None:
+            return None
+        try:
+            return self.aggregates.snapshot()
+        except Exception as e:
+            print(f"Error loading statistics: {e}")
+            return None
+    
+    def rebuild_statistics(self) -> Optional[Dict]:
+        """
+        Recompute the running totals by reading every character
+        
+        Use after sheets were changed outside the repository. Writes made
+        while the rebuild runs may be miscounted, so run it on a quiet store.
+        
+        Returns:
+            Dict: The new totals (as from get_statistics()), None if aggregates are disabled
+        """
+        if self.aggregates is None:
+            return None
+        documents = (result.value for result in self._get_many(self.list_character_ids())
+                     if result.ok and result.value is not None)
+        self.aggregates.rebuild(documents)
+        return self.aggregates.snapshot()
+    
+    def search(self, query: str, limit: Optional[int] = 20,
+               character_ids: Optional[Iterable[str]] = None) -> List[Dict]:
+        """
+        Search journals, hero stories and scenarios of all characters
+        
+        Args:
+            query: Free text, e.g. "lost battalion"
+            limit: Maximum number of results (None for all)
+            character_ids: Only consider these characters
             
-            # Save to new location
-            with open(new_filepath, 'w', encoding='utf-8') as f:
-                json.dump(char_data, f, indent=2, ensure_ascii=False)
+        Returns:
+            List[Dict]: {'character_id', 'score', 'matches'} best first, where
+            matches are document paths such as ('journal_entries', 3) or
+            ('hero_story', 0) (line 0 of the story); empty if search is disabled
+        """
+        if self.search_index is None:
+            return []
+        try:
+            return self.search_index.search(query, limit=limit, character_ids=character_ids)
+        except Exception as e:
+            print(f"Error searching for {query!r}: {e}")
+            return []
+    
+    def rebuild_search_index(self) -> None:
+        """Re-index every character from scratch (run on a quiet store)"""
+        if self.search_index is None:
+            return
+        character_ids = self.list_character_ids()
+        documents = ((result.character_id, result.value) for result in self._get_many(character_ids)
+                     if result.ok and result.value is not None)
+        self.search_index.rebuild(documents)
+    
+    def archive_character(self, character_id: str) -> bool:
+        """
+        Move a character's sheet into the archive's pack files
+        
+        Nothing changes for readers: get() and list_character_ids() still
+        return the character, and the next write moves it back to a sheet.
+        
+        Args:
+            character_id: Unique identifier for the character
             
-            # Delete old file
-            old_filepath.unlink()
+        Returns:
+            bool: True if the sheet was archived, False if it has none (or archiving is disabled)
+        """
+        if self.archive is None:
+            return False
+        filepath = self.storage_path / f"{character_id}.json"
+        try:
+            with self.locks.lock(character_id):
+                try:
+                    document = self._read_document(filepath)
+                except FileNotFoundError:
+                    return False
+                self.archive.add(character_id, document)
+                filepath.unlink()
             return True
         except Exception as e:
-            print(f"Error renaming character from {old_character_id} to {new_character_id}: {e}")
+            print(f"Error archiving character {character_id}: {e}")
             return False
     
+    def archive_idle(self, idle_days: float, now: Optional[float] = None) -> List[str]:
+        """
+        Archive every character whose sheet was not written for idle_days
+        
+        Args:
+            idle_days: Days since the sheet's last write (its file modification time)
+            now: Unix time to measure from (default: now)
+            
+        Returns:
+            List[str]: IDs of the characters archived
+        """
+        if self.archive is None:
+            return []
+        cutoff = (now if now is not None else time.time()) - idle_days * 86400
+        idle = [entry.name[:-5] for entry in os.scandir(self.storage_path)
+                if entry.name.endswith(".json") and entry.is_file() and entry.stat().st_mtime < cutoff]
+        return [character_id for character_id in idle if self.archive_character(character_id)]
+    
+    def compact_archive(self) -> Optional[Dict]:
+        """
+        Rewrite the archive's packs without the copies of characters written or deleted since
+        
+        Returns:
+            Dict: {'before', 'after'} archive stats ('characters', 'packs',
+            'bytes', 'live_bytes'), None if archiving is disabled
+        """
+        if self.archive is None:
+            return None
+        return self.archive.compact()
+    
+    def close(self) -> None:
+        """Release the I/O pool and lock files (the repository must not be used afterwards)"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+        self.locks.close()
+        if self.aggregates is not None:
+            self.aggregates.close()
+        if self.search_index is not None:
+            self.search_index.close()
+        if self.archive is not None:
+            self.archive.close()
+        if self._manifest is not None:
+            self._manifest.close()
+    
     def get_storage_path(self) -> Path:
         """
         Get the storage path for character files
@@ -191,6 +1036,25 @@ class CharacterRepository:
         return self.storage_path
 
 
+def _time_range_ms(start: Optional[datetime], end: Optional[datetime]) -> Tuple[Optional[int], Optional[int]]:
+    """Convert an optional datetime range to Unix milliseconds"""
+    return (None if start is None else int(start.timestamp() * 1000),
+            None if end is None else int(end.timestamp() * 1000))
+
+
+def _set_path(document: Dict, path: Tuple, value) -> None:
+    """Set document[path[0]][path[1]]... = value, creating missing dicts and journal lines"""
+    container = document
+    for depth, key in enumerate(path[:-1]):
+        if key not in container:
+            container[key] = [] if path[0] == 'journal_entries' and depth == 0 else {}
+        container = container[key]
+    last = path[-1]
+    if isinstance(container, list):
+        container.extend([''] * (last + 1 - len(container)))
+    container[last] = value
+
+
 # Future implementation stub for MongoDB
 class MongoCharacterRepository:
     """
@@ -212,16 +1076,29 @@ class MongoCharacterRepository:
         # self.db = self.client[database_name]
         # self.collection = self.db.characters
     
-    def save(self, character_id: str, character_data: Dict) -> bool:
+    def save(self, character_id: str, character_data: Dict, expected_version: Optional[int] = None) -> bool:
         raise NotImplementedError("MongoDB repository not yet implemented")
     
     def get(self, character_id: str) -> Optional[Dict]:
         raise NotImplementedError("MongoDB repository not yet implemented")
     
+    def get_character(self, character_id: str) -> Optional[Character]:
+        raise NotImplementedError("MongoDB repository not yet implemented")
+    
+    def patch(self, character_id: str, changes: Mapping[Tuple, object],
+              expected_version: Optional[int] = None) -> Optional[Dict]:
+        raise NotImplementedError("MongoDB repository not yet implemented")
+    
     def get_all(self) -> Dict[str, Dict]:
         raise NotImplementedError("MongoDB repository not yet implemented")
     
-    def delete(self, character_id: str) -> bool:
+    def get_many(self, character_ids: Iterable[str]) -> List[BatchResult]:
+        raise NotImplementedError("MongoDB repository not yet implemented")
+    
+    def save_many(self, items, expected_versions: Optional[Mapping[str, int]] = None) -> List[BatchResult]:
+        raise NotImplementedError("MongoDB repository not yet implemented")
+    
+    def delete(self, character_id: str, expected_version: Optional[int] = None) -> bool:
         raise NotImplementedError("MongoDB repository not yet implemented")
     
     def exists(self, character_id: str) -> bool:
@@ -230,8 +1107,54 @@ class MongoCharacterRepository:
     def list_character_ids(self) -> List[str]:
         raise NotImplementedError("MongoDB repository not yet implemented")
     
-    def update(self, character_id: str, character_data: Dict) -> bool:
+    def list_character_ids_between(self, start: Optional[datetime] = None,
+                                   end: Optional[datetime] = None) -> List[str]:
+        raise NotImplementedError("MongoDB repository not yet implemented")
+    
+    def list_versions(self, character_id: str) -> List[Dict]:
+        raise NotImplementedError("MongoDB repository not yet implemented")
+    
+    def load_version(self, character_id: str, version: int) -> Optional[Dict]:
+        raise NotImplementedError("MongoDB repository not yet implemented")
+    
+    def diff_versions(self, character_id: str, from_version: int, to_version: int) -> Optional[Dict]:
+        raise NotImplementedError("MongoDB repository not yet implemented")
+    
+    def restore(self, character_id: str, version: int, expected_version: Optional[int] = None) -> Optional[int]:
+        raise NotImplementedError("MongoDB repository not yet implemented")
+    
+    def get_progress(self, character_id: str, start: Optional[datetime] = None,
+                     end: Optional[datetime] = None, details: bool = False) -> List[Dict]:
+        raise NotImplementedError("MongoDB repository not yet implemented")
+    
+    def get_progress_many(self, character_ids: Iterable[str], start: Optional[datetime] = None,
+                          end: Optional[datetime] = None) -> Dict[str, List[Dict]]:
+        raise NotImplementedError("MongoDB repository not yet implemented")
+    
+    def get_statistics(self) -> Optional[Dict]:
+        raise NotImplementedError("MongoDB repository not yet implemented")
+    
+    def rebuild_statistics(self) -> Optional[Dict]:
+        raise NotImplementedError("MongoDB repository not yet implemented")
+    
+    def search(self, query: str, limit: Optional[int] = 20,
+               character_ids: Optional[Iterable[str]] = None) -> List[Dict]:
+        raise NotImplementedError("MongoDB repository not yet implemented")
+    
+    def rebuild_search_index(self) -> None:
+        raise NotImplementedError("MongoDB repository not yet implemented")
+    
+    def archive_character(self, character_id: str) -> bool:
+        raise NotImplementedError("MongoDB repository not yet implemented")
+    
+    def archive_idle(self, idle_days: float, now: Optional[float] = None) -> List[str]:
+        raise NotImplementedError("MongoDB repository not yet implemented")
+    
+    def compact_archive(self) -> Optional[Dict]:
+        raise NotImplementedError("MongoDB repository not yet implemented")
+    
+    def update(self, character_id: str, character_data: Dict, expected_version: Optional[int] = None) -> bool:
         raise NotImplementedError("MongoDB repository not yet implemented")
     
-    def rename(self, old_character_id: str, new_character_id: str) -> bool:
+    def rename(self, old_character_id: str, new_character_id: str, expected_version: Optional[int] = None) -> bool:
         raise NotImplementedError("MongoDB repository not yet implemented")
@@ -0,0 +1,760 @@
+"""
+Store Maintenance CLI
+Bulk operations over a character store, run without the Streamlit UI:
+
+    dragonsdown-store validate               check every sheet against the schema
+    dragonsdown-store migrate --codec NAME   rewrite sheets in another storage format
+    dragonsdown-store upgrade                rewrite sheets written with an older schema
+    dragonsdown-store reindex                rebuild the search index and running totals
+    dragonsdown-store export FILE[.gz]       write every sheet to one NDJSON file
+    dragonsdown-store import FILE[.gz]       save every line of an NDJSON file
+    dragonsdown-store check                  compare the sheets with the store's metadata
+    dragonsdown-store fsck [--quarantine]    check every sheet's integrity, with a JSON report
+    dragonsdown-store archive --days N       move sheets idle for N days into compressed packs
+
+(or python -m repository.cli ...). The sheets are split into chunks that
+worker processes read on their own, sending back only small results, so
+bulk passes scale with the number of cores. migrate and upgrade rewrite each
+sheet under the character's lock, so they are safe next to a running app; reindex and import
+recount the store and are best run while it is quiet. validate, migrate,
+upgrade and fsck cover the sheets; reindex, check and export also read the
+characters in the archive tier (see archive.py). Progress is printed to
+stderr and the exit status is 1 when problems were found.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .aggregates import AggregateStore, add_totals
+from .archive import ArchiveStore
+from .bulk import BulkStats, NdjsonWriter, export_line, import_characters
+from .character_model import Character, validate_document
+from .character_repository import CharacterRepository
+from .fsck import FsckState, case_collisions, check_sheet, file_stamp, fingerprint, has_errors
+from .locking import FileLock, StripedLockManager
+from .migrations import SCHEMA_VERSION, migrate_document, needs_migration
+from .search import SearchIndex, extract_terms
+from .serialization import DEFAULT_CODEC, available_codecs, decode_document, detect_codec, get_codec
+
+STORAGE_ENV = "DRAGONSDOWN_STORAGE_PATH"
+
+# Most sheets per worker task: large enough to amortize pickling, small enough for steady progress
+CHUNK_SIZE = 1024
+
+# Temporary files older than this are left over from interrupted writes
+STALE_TMP_SECONDS = 3600
+
+
+class Progress:
+    """Sheets-done counter on stderr (updated live on a terminal, printed once otherwise)"""
+
+    def __init__(self, label: str, total: Optional[int], enabled: bool = True, stream=None):
+        self.label = label
+        self.total = total
+        self.enabled = enabled
+        self.stream = stream or sys.stderr
+        self.live = enabled and self.stream.isatty()
+        self.done = 0
+        self.start = time.perf_counter()
+        self._shown = 0.0
+
+    def _line(self) -> str:
+        elapsed = time.perf_counter() - self.start
+        line = f"{self.label}: {self.done:,}"
+        if self.total is not None:
+            line += f"/{self.total:,}"
+            if self.total:
+                line += f" ({self.done * 100 // self.total}%)"
+        return line + f" sheets, {self.done / max(elapsed, 1e-9):,.0f}/s, {elapsed:.1f}s"
+
+    def advance(self, count: int) -> None:
+        self.done += count
+        now = time.perf_counter()
+        if self.live and now - self._shown >= 0.1:
+            self._shown = now
+            self.stream.write("\r" + self._line())
+            self.stream.flush()
+
+    def finish(self) -> None:
+        if self.enabled:
+            self.stream.write(("\r" if self.live else "") + self._line() + "\n")
+            self.stream.flush()
+
+
+def sheet_names(storage_path: Path) -> List[str]:
+    """File names of every sheet in a store, in a stable order"""
+    return sorted(entry.name for entry in os.scandir(storage_path)
+                  if entry.name.endswith(".json") and not entry.name.startswith(".") and entry.is_file())
+
+
+def run_chunks(task: Callable[[str, List[str], Dict], Dict], storage_path: Path, names: List[str],
+               workers: int, progress: Progress, **options) -> Iterator[Dict]:
+    """
+    Run a task over chunks of sheet names on a process pool
+
+    Args:
+        task: Module-level function task(storage_path, names, options) -> result
+        storage_path: Store directory
+        names: Sheet file names
+        workers: Worker processes (1 runs everything in this process)
+        progress: Advanced as chunks complete
+        options: Passed to every task call
+
+    Yields:
+        Dict: The task's result for each chunk, in chunk order
+    """
+    chunk_size = max(1, min(CHUNK_SIZE, -(-len(names) // (workers * 4))))
+    chunks = [names[i:i + chunk_size] for i in range(0, len(names), chunk_size)]
+    if workers <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            result = task(str(storage_path), chunk, options)
+            progress.advance(len(chunk))
+            yield result
+        return
+    # At most two chunks per worker are in flight, so results waiting to be
+    # consumed (e.g. by a slow export writer) do not pile up in memory
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append((chunk, pool.submit(task, str(storage_path), chunk, options)))
+            if len(pending) >= workers * 2:
+                done, future = pending.popleft()
+                progress.advance(len(done))
+                yield future.result()
+        while pending:
+            done, future = pending.popleft()
+            progress.advance(len(done))
+            yield future.result()
+
+
+# -- worker tasks (run in worker processes, so module level and picklable) ----
+
+_lock_managers: Dict[str, StripedLockManager] = {}
+
+
+def _lock_manager(storage_path: str) -> StripedLockManager:
+    # One per worker process, so the stripe lock files are opened once; the
+    # stripe count is the one recorded in the store, as the repository's is
+    manager = _lock_managers.get(storage_path)
+    if manager is None:
+        manager = StripedLockManager(lock_dir=Path(storage_path) / ".store" / "locks")
+        _lock_managers[storage_path] = manager
+    return manager
+
+
+def _read_sheet(path: Path) -> Dict:
+    with open(path, 'rb') as f:
+        return decode_document(f.read())
+
+
+def _validate_chunk(storage_path: str, names: List[str], options: Dict) -> Dict:
+    problems = {}
+    for name in names:
+        try:
+            found = validate_document(_read_sheet(Path(storage_path) / name))
+        except FileNotFoundError:
+            continue  # deleted meanwhile
+        except Exception as e:
+            found = [f"unreadable: {e}"]
+        if found:
+            problems[name[:-5]] = found
+    return {'problems': problems}
+
+
+def _migrate_chunk(storage_path: str, names: List[str], options: Dict) -> Dict:
+    codec = get_codec(options['codec'])
+    locks = _lock_manager(storage_path)
+    rewritten = 0
+    problems = {}
+    for name in names:
+        character_id = name[:-5]
+        path = Path(storage_path) / name
+        try:
+            with locks.lock(character_id):
+                with open(path, 'rb') as f:
+                    data = f.read()
+                encoded = codec.encode(decode_document(data))
+                if encoded == data:
+                    continue
+                tmp_path = path.with_name(f".{name}.{os.getpid()}.tmp")
+                with open(tmp_path, 'wb') as f:
+                    f.write(encoded)
+                os.replace(tmp_path, path)
+                rewritten += 1
+        except FileNotFoundError:
+            continue
+        except Exception as e:
+            problems[character_id] = [f"not migrated: {e}"]
+    return {'rewritten': rewritten, 'problems': problems}
+
+
+def _upgrade_chunk(storage_path: str, names: List[str], options: Dict) -> Dict:
+    locks = _lock_manager(storage_path)
+    upgraded = 0
+    problems = {}
+    for name in names:
+        character_id = name[:-5]
+        path = Path(storage_path) / name
+        try:
+            with locks.lock(character_id):
+                with open(path, 'rb') as f:
+                    data = f.read()
+                document = decode_document(data)
+                if not needs_migration(document):
+                    continue
+                # Keep the sheet's format; untagged sheets are JSON
+                codec = get_codec(detect_codec(data) or DEFAULT_CODEC)
+                tmp_path = path.with_name(f".{name}.{os.getpid()}.tmp")
+                with open(tmp_path, 'wb') as f:
+                    f.write(codec.encode(migrate_document(document, character_id)))
+                os.replace(tmp_path, path)
+                upgraded += 1
+        except FileNotFoundError:
+            continue
+        except Exception as e:
+            problems[character_id] = [f"not upgraded: {e}"]
+    return {'upgraded': upgraded, 'problems': problems}
+
+
+def _quarantine(storage_path: str, name: str, checked: bytes, quarantine_dir: str) -> bool:
+    """Move a bad sheet aside unless a writer replaced it since it was checked"""
+    path = Path(storage_path) / name
+    with _lock_manager(storage_path).lock(name[:-5]):
+        try:
+            with open(path, 'rb') as f:
+                if f.read() != checked:
+                    return False
+        except FileNotFoundError:
+            return False
+        os.makedirs(quarantine_dir, exist_ok=True)
+        os.replace(path, Path(quarantine_dir) / name)
+    return True
+
+
+def _fsck_chunk(storage_path: str, names: List[str], options: Dict) -> Dict:
+    verdicts = {}
+    quarantined = []
+    for name in names:
+        path = Path(storage_path) / name
+        try:
+            stat = os.stat(path)
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            continue
+        issues = check_sheet(name[:-5], data, options['now_ms'])
+        if has_errors(issues) and options['quarantine_dir'] and _quarantine(
+                storage_path, name, data, options['quarantine_dir']):
+            quarantined.append(name)
+        verdicts[name] = (file_stamp(stat), issues)
+    return {'verdicts': verdicts, 'quarantined': quarantined}
+
+
+def _count(documents: Iterable[Tuple[str, Dict]], terms: bool, problems: Dict[str, List[str]]) -> Dict:
+    """IDs, totals and (optionally) search terms of decoded documents"""
+    ids = []
+    characters = []
+    entries = []
+    for character_id, document in documents:
+        try:
+            character = Character.from_dict(document)
+        except Exception as e:
+            problems[character_id] = [f"unreadable: {e}"]
+            continue
+        ids.append(character_id)
+        characters.append(character)
+        if terms:
+            entries.append((character_id, extract_terms(document)))
+    totals = AggregateStore(None)
+    totals.rebuild(characters)
+    return {'ids': ids, 'totals': totals.snapshot(), 'entries': entries, 'problems': problems}
+
+
+def _scan_chunk(storage_path: str, names: List[str], options: Dict) -> Dict:
+    """Read a chunk and count it: IDs read, their totals and (optionally) their search terms"""
+    documents = []
+    problems = {}
+    for name in names:
+        character_id = name[:-5]
+        try:
+            documents.append((character_id, _read_sheet(Path(storage_path) / name)))
+        except FileNotFoundError:
+            continue
+        except Exception as e:
+            problems[character_id] = [f"unreadable: {e}"]
+    return _count(documents, options.get('terms'), problems)
+
+
+def _export_chunk(storage_path: str, names: List[str], options: Dict) -> Dict:
+    lines = []
+    problems = {}
+    for name in names:
+        character_id = name[:-5]
+        try:
+            document = _read_sheet(Path(storage_path) / name)
+        except FileNotFoundError:
+            continue
+        except Exception as e:
+            problems[character_id] = [f"not exported: {e}"]
+            continue
+        document.setdefault('version', 1)
+        migrate_document(document, character_id)
+        lines.append(export_line(character_id, document))
+    return {'data': b"".join(lines), 'exported': len(lines), 'problems': problems}
+
+
+# -- archived characters (read in this process: a pack read is one slice and one inflate) --
+
+def archived_documents(storage_path: Path, names: List[str],
+                       problems: Dict[str, List[str]]) -> Iterator[Tuple[str, Dict]]:
+    """Decoded documents of archived characters that have no sheet among names, in pack order"""
+    if not (storage_path / ".store" / "archive" / "index.log").exists():
+        return
+    hot = {name[:-5] for name in names}
+    archive = ArchiveStore(storage_path / ".store" / "archive")
+    try:
+        for character_id, data in archive.records():
+            if character_id in hot:
+                continue
+            try:
+                document = decode_document(data)
+            except Exception as e:
+                problems[character_id] = [f"unreadable archived copy: {e}"]
+                continue
+            document.setdefault('version', 1)
+            yield character_id, migrate_document(document, character_id)
+    finally:
+        archive.close()
+
+
+def _archived_chunks(storage_path: Path, names: List[str]) -> Iterator[List[Tuple[str, Dict]]]:
+    """archived_documents() in chunks of CHUNK_SIZE, each followed by its problems"""
+    problems = {}
+    chunk = []
+    for item in archived_documents(storage_path, names, problems):
+        chunk.append(item)
+        if len(chunk) >= CHUNK_SIZE:
+            yield chunk, problems
+            chunk, problems = [], {}
+    if chunk or problems:
+        yield chunk, problems
+
+
+def _scan_store(storage_path: Path, names: List[str], workers: int, progress: Progress,
+                terms: bool = False) -> Iterator[Dict]:
+    """_scan_chunk() results for every sheet, then for every archived character"""
+    yield from run_chunks(_scan_chunk, storage_path, names, workers, progress, terms=terms)
+    for chunk, problems in _archived_chunks(storage_path, names):
+        yield _count(chunk, terms, problems)
+
+
+# -- commands ------------------------------------------------------------------
+
+def _report(problems: Dict[str, List[str]], out=None) -> int:
+    """Print problems as 'id: message' lines; return the exit status"""
+    out = out or sys.stdout
+    for character_id in sorted(problems):
+        for message in problems[character_id]:
+            out.write(f"{character_id}: {message}\n")
+    return 1 if problems else 0
+
+
+def _sheet_loader(storage_path: Path) -> Callable[[str], Optional[Dict]]:
+    def load(character_id: str) -> Optional[Dict]:
+        try:
+            return _read_sheet(storage_path / f"{character_id}.json")
+        except FileNotFoundError:
+            pass
+        # Rare (the search index only loads sheets to replay interrupted updates)
+        if not (storage_path / ".store" / "archive" / "index.log").exists():
+            return None
+        archive = ArchiveStore(storage_path / ".store" / "archive")
+        try:
+            data = archive.read(character_id)
+        finally:
+            archive.close()
+        return decode_document(data) if data is not None else None
+    return load
+
+
+def cmd_validate(args) -> int:
+    names = sheet_names(args.storage)
+    progress = Progress("validate", len(names), not args.quiet)
+    problems = {}
+    for result in run_chunks(_validate_chunk, args.storage, names, args.workers, progress):
+        problems.update(result['problems'])
+    progress.finish()
+    print(f"{len(names):,} sheets checked, {len(problems):,} invalid")
+    return _report(problems)
+
+
+def cmd_migrate(args) -> int:
+    names = sheet_names(args.storage)
+    progress = Progress(f"migrate to {args.codec}", len(names), not args.quiet)
+    rewritten = 0
+    problems = {}
+    for result in run_chunks(_migrate_chunk, args.storage, names, args.workers, progress, codec=args.codec):
+        rewritten += result['rewritten']
+        problems.update(result['problems'])
+    progress.finish()
+    print(f"{rewritten:,} of {len(names):,} sheets rewritten as {args.codec}")
+    return _report(problems)
+
+
+def cmd_upgrade(args) -> int:
+    names = sheet_names(args.storage)
+    progress = Progress(f"upgrade to schema {SCHEMA_VERSION}", len(names), not args.quiet)
+    upgraded = 0
+    problems = {}
+    for result in run_chunks(_upgrade_chunk, args.storage, names, args.workers, progress):
+        upgraded += result['upgraded']
+        problems.update(result['problems'])
+    progress.finish()
+    print(f"{upgraded:,} of {len(names):,} sheets upgraded to schema {SCHEMA_VERSION}")
+    return _report(problems)
+
+
+def reindex(storage_path: Path, workers: int, search: bool = True, statistics: bool = True,
+            quiet: bool = False) -> Dict[str, List[str]]:
+    """
+    Rebuild the search index and/or running totals of a store on a process pool
+
+    Returns:
+        Dict: Problems by character ID (sheets that could not be read)
+    """
+    names = sheet_names(storage_path)
+    progress = Progress("reindex", len(names), not quiet)
+    problems = {}
+    totals = None
+
+    def entries():
+        nonlocal totals
+        for result in _scan_store(storage_path, names, workers, progress, terms=search):
+            totals = add_totals(totals, result['totals'])
+            problems.update(result['problems'])
+            yield from result['entries']
+
+    if search:
+        index = SearchIndex(storage_path / ".store" / "search", loader=_sheet_loader(storage_path))
+        try:
+            index.rebuild_terms(entries())
+        finally:
+            index.close()
+    else:
+        for _ in entries():
+            pass
+    progress.finish()
+
+    if statistics:
+        aggregates = AggregateStore(storage_path / ".store" / "aggregates.json")
+        try:
+            aggregates.replace(totals if totals is not None else AggregateStore(None).snapshot())
+        finally:
+            aggregates.close()
+    return problems
+
+
+def cmd_reindex(args) -> int:
+    search = statistics = True
+    if args.search or args.statistics:
+        search, statistics = args.search, args.statistics
+    problems = reindex(args.storage, args.workers, search=search, statistics=statistics, quiet=args.quiet)
+    rebuilt = " and ".join(name for name, chosen in (("search index", search), ("running totals", statistics))
+                           if chosen)
+    print(f"Rebuilt the {rebuilt}")
+    return _report(problems)
+
+
+def cmd_export(args) -> int:
+    names = sheet_names(args.storage)
+    progress = Progress("export", len(names), not args.quiet)
+    stats = BulkStats()
+    compress = True if args.gzip else None
+    with NdjsonWriter(sys.stdout.buffer if args.file == "-" else args.file, compress) as writer:
+        for result in run_chunks(_export_chunk, args.storage, names, args.workers, progress):
+            writer.write(result['data'])
+            stats.count += result['exported']
+            stats.problems.update(result['problems'])
+        for chunk, problems in _archived_chunks(args.storage, names):
+            writer.write(b"".join(export_line(character_id, document) for character_id, document in chunk))
+            stats.count += len(chunk)
+            stats.problems.update(problems)
+    stats.bytes = writer.bytes
+    progress.finish()
+    print(stats.finish().summary("exported"), file=sys.stderr if args.file == "-" else sys.stdout)
+    return _report(stats.problems, out=sys.stderr if args.file == "-" else None)
+
+
+def cmd_import(args) -> int:
+    shared_manifest = (args.storage / ".store" / "manifest.log").exists()
+    # Totals and the search index are rebuilt once at the end instead of on every save
+    repository = CharacterRepository(storage_path=str(args.storage), shared_manifest=shared_manifest,
+                                     aggregates=False, search=False)
+    progress = Progress("import", None, not args.quiet)
+    try:
+        stats = import_characters(repository, sys.stdin.buffer if args.file == "-" else args.file,
+                                  skip_existing=args.skip_existing, progress=progress.advance)
+    finally:
+        repository.close()
+    progress.finish()
+
+    problems = dict(stats.problems)
+    problems.update(reindex(args.storage, args.workers, quiet=args.quiet))
+    print(stats.summary("imported"))
+    return _report(problems)
+
+
+def cmd_check(args) -> int:
+    names = sheet_names(args.storage)
+    progress = Progress("check", len(names), not args.quiet)
+    problems = {}
+    ids = set()
+    totals = None
+    for result in _scan_store(args.storage, names, args.workers, progress):
+        ids.update(result['ids'])
+        totals = add_totals(totals, result['totals'])
+        problems.update(result['problems'])
+    progress.finish()
+    if totals is None:
+        totals = AggregateStore(None).snapshot()
+
+    store = []
+    now = time.time()
+    for entry in os.scandir(args.storage):
+        if entry.name.endswith(".tmp") and now - entry.stat().st_mtime > STALE_TMP_SECONDS:
+            store.append(f"stale temporary file {entry.name} (left by an interrupted write)")
+
+    aggregates_path = args.storage / ".store" / "aggregates.json"
+    if not aggregates_path.exists():
+        store.append("running totals are missing")
+    else:
+        aggregates = AggregateStore(aggregates_path)
+        try:
+            stored = aggregates.snapshot()
+        finally:
+            aggregates.close()
+        differing = [field for field in totals if stored.get(field) != totals[field]]
+        if differing:
+            store.append(f"running totals differ from a recount in: {', '.join(differing)}")
+
+    search_path = args.storage / ".store" / "search"
+    if not search_path.exists():
+        store.append("search index is missing")
+    else:
+        index = SearchIndex(search_path, loader=_sheet_loader(args.storage))
+        try:
+            indexed = index.document_ids()
+        finally:
+            index.close()
+        if indexed - ids:
+            store.append(f"search index lists {len(indexed - ids):,} characters that have no sheet")
+        if ids - indexed:
+            store.append(f"search index misses {len(ids - indexed):,} characters")
+
+    if store:
+        problems["store"] = store + (["run 'reindex' to rebuild the totals and index"]
+                                     if any("totals" in message or "index" in message for message in store) else [])
+    archived = len(ids - {name[:-5] for name in names})
+    print(f"{len(names):,} sheets" + (f" and {archived:,} archived characters" if archived else "")
+          + f" checked, {len(problems):,} problems found")
+    return _report(problems)
+
+
+def _announce_removed(storage_path: Path, character_ids: List[str]) -> None:
+    """Tell replicas sharing the store's manifest that characters are gone"""
+    manifest_path = storage_path / ".store" / "manifest.log"
+    if not character_ids or not manifest_path.exists():
+        return
+    manifest = FileLock(manifest_path)
+    try:
+        with manifest as handle:
+            for character_id in character_ids:
+                handle.write(json.dumps({'op': 'removed', 'id': character_id}, ensure_ascii=False) + "\n")
+            handle.flush()
+    finally:
+        manifest.close()
+
+
+def cmd_fsck(args) -> int:
+    started = time.time()
+    state = FsckState(args.storage / ".store" / "fsck" / "state.json")
+    verdicts = {}
+    to_check = []
+    for name in sheet_names(args.storage):
+        try:
+            stat = os.stat(args.storage / name)
+        except FileNotFoundError:
+            continue
+        # Sheets with errors are always read again, so a later --quarantine run sees them
+        stamp = file_stamp(stat)
+        issues = None if args.full else state.verdict(name, stamp)
+        if issues is None or has_errors(issues):
+            to_check.append(name)
+        else:
+            verdicts[name] = (stamp, issues)
+
+    quarantine_dir = None
+    if args.quarantine:
+        quarantine_dir = args.storage / ".store" / "quarantine" / time.strftime("%Y%m%dT%H%M%S", time.gmtime(started))
+    progress = Progress("fsck", len(to_check), not args.quiet)
+    quarantined = []
+    for result in run_chunks(_fsck_chunk, args.storage, to_check, args.workers, progress,
+                             now_ms=int(started * 1000), quarantine_dir=str(quarantine_dir) if quarantine_dir else None):
+        verdicts.update(result['verdicts'])
+        quarantined.extend(result['quarantined'])
+    progress.finish()
+    # Quarantined sheets leave the store, and its state, but stay in the report
+    moved = {name: verdicts.pop(name) for name in quarantined}
+    state.save(verdicts)
+    _announce_removed(args.storage, [name[:-5] for name in quarantined])
+
+    store_issues = [{'check': 'id', 'severity': 'warning',
+                     'message': f"{', '.join(group)} differ only in case and collide on case-insensitive disks"}
+                    for group in case_collisions(list(verdicts))]
+    problems = [{'id': name[:-5], 'file': name, 'quarantined': name in moved, 'issues': issues}
+                for name, (_, issues) in sorted({**verdicts, **moved}.items()) if issues]
+    errors = sum(1 for problem in problems if has_errors(problem['issues']))
+    report = {
+        'storage': str(args.storage),
+        'started': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(started)),
+        'seconds': round(time.time() - started, 3),
+        'fingerprint': fingerprint(),
+        'sheets': len(verdicts) + len(moved),
+        'checked': len(to_check),
+        'errors': errors,
+        'warnings': len(problems) - errors,
+        'quarantined': sorted(name[:-5] for name in moved),
+        'quarantine_dir': str(quarantine_dir) if moved else None,
+        'reindex_needed': bool(moved),
+        'store': store_issues,
+        'problems': problems,
+    }
+
+    text = json.dumps(report, ensure_ascii=False, indent=2) + "\n"
+    last_report = args.storage / ".store" / "fsck" / "last-report.json"
+    tmp_path = last_report.with_name(f".{last_report.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(text, encoding='utf-8')
+    os.replace(tmp_path, last_report)
+    if args.report == "-":
+        sys.stdout.write(text)
+    elif args.report:
+        Path(args.report).write_text(text, encoding='utf-8')
+
+    # With the report on stdout, the human summary goes to stderr
+    out = sys.stderr if args.report == "-" else sys.stdout
+    for problem in problems:
+        suffix = " [quarantined]" if problem['quarantined'] else ""
+        for issue in problem['issues']:
+            out.write(f"{problem['id']}: {issue['severity']} ({issue['check']}): {issue['message']}{suffix}\n")
+    for issue in store_issues:
+        out.write(f"store: {issue['severity']} ({issue['check']}): {issue['message']}\n")
+    out.write(f"{report['sheets']:,} sheets ({report['sheets'] - len(to_check):,} unchanged since the last run), "
+              f"{errors:,} with errors, {report['warnings']:,} with warnings, {len(moved):,} quarantined\n")
+    if moved:
+        out.write(f"Quarantined sheets are in {quarantine_dir}; run 'reindex' to update the totals and index\n")
+    if errors or (args.strict and (problems or store_issues)):
+        return 1
+    return 0
+
+
+def cmd_archive(args) -> int:
+    if args.days is None and not args.compact:
+        print("Nothing to do: pass --days N and/or --compact", file=sys.stderr)
+        return 2
+    shared_manifest = (args.storage / ".store" / "manifest.log").exists()
+    # Archiving changes no document, so totals, index, history and progress are left alone
+    repository = CharacterRepository(storage_path=str(args.storage), shared_manifest=shared_manifest,
+                                     history=False, progress=False, aggregates=False, search=False)
+    try:
+        if args.days is not None:
+            start = time.perf_counter()
+            archived = repository.archive_idle(args.days)
+            print(f"{len(archived):,} sheets not written for {args.days:g} days archived "
+                  f"in {time.perf_counter() - start:.1f}s")
+        if args.compact:
+            result = repository.compact_archive()
+            print(f"Archive compacted from {result['before']['bytes'] / 1e6:.1f} MB "
+                  f"to {result['after']['bytes'] / 1e6:.1f} MB")
+        stats = repository.archive.stats()
+    finally:
+        repository.close()
+    print(f"{stats['characters']:,} characters archived in {stats['packs']:,} pack(s), "
+          f"{stats['bytes'] / 1e6:.1f} MB ({stats['live_bytes'] / 1e6:.1f} MB live)")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="dragonsdown-store", description="Bulk maintenance of a character store")
+    parser.add_argument("--storage", type=Path, default=Path(os.environ.get(STORAGE_ENV, "character_sheets")),
+                        help=f"store directory (default: ${STORAGE_ENV} or character_sheets)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--quiet", action="store_true", help="no progress output")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("validate", help="check every sheet against the schema").set_defaults(run=cmd_validate)
+
+    migrate = commands.add_parser("migrate", help="rewrite sheets in another storage format")
+    migrate.add_argument("--codec", required=True, choices=available_codecs())
+    migrate.set_defaults(run=cmd_migrate)
+
+    commands.add_parser("upgrade", help="rewrite sheets written with an older schema").set_defaults(run=cmd_upgrade)
+
+    reindex_parser = commands.add_parser("reindex", help="rebuild the search index and running totals")
+    reindex_parser.add_argument("--search", action="store_true", help="only the search index")
+    reindex_parser.add_argument("--statistics", action="store_true", help="only the running totals")
+    reindex_parser.set_defaults(run=cmd_reindex)
+
+    export = commands.add_parser("export", help="write every sheet to an NDJSON file ('-' for stdout)")
+    export.add_argument("file")
+    export.add_argument("--gzip", action="store_true", help="compress the output (implied by a .gz file name)")
+    export.set_defaults(run=cmd_export)
+
+    import_parser = commands.add_parser("import", help="save every sheet of an NDJSON export, plain or gzip ('-' for stdin)")
+    import_parser.add_argument("file")
+    import_parser.add_argument("--skip-existing", action="store_true", help="keep sheets that already exist")
+    import_parser.set_defaults(run=cmd_import)
+
+    commands.add_parser("check", help="compare the sheets with the store's totals and index").set_defaults(run=cmd_check)
+
+    fsck = commands.add_parser("fsck", help="check every sheet's integrity and write a JSON report")
+    fsck.add_argument("--quarantine", action="store_true", help="move sheets with errors to .store/quarantine/")
+    fsck.add_argument("--report", help="also write the JSON report here ('-' for stdout)")
+    fsck.add_argument("--full", action="store_true", help="read every sheet, not only those changed since the last run")
+    fsck.add_argument("--strict", action="store_true", help="exit with status 1 on warnings too")
+    fsck.set_defaults(run=cmd_fsck)
+
+    archive = commands.add_parser("archive", help="move sheets not written for a while into compressed packs")
+    archive.add_argument("--days", type=float, help="archive sheets not written for this many days")
+    archive.add_argument("--compact", action="store_true",
+                         help="rewrite the packs without copies of characters written or deleted since")
+    archive.set_defaults(run=cmd_archive)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run one maintenance command
+
+    Args:
+        argv: Command-line arguments (default: sys.argv[1:])
+
+    Returns:
+        int: Exit status (0 clean, 1 problems found, 2 usage error)
+    """
+    args = build_parser().parse_args(argv)
+    if not args.storage.is_dir():
+        print(f"Store {args.storage} does not exist", file=sys.stderr)
+        return 2
+    args.workers = max(1, args.workers)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+Sheet Integrity Checks
+fsck-style checks of stored sheets, run in parallel over the whole store by
+`dragonsdown-store fsck`. Every problem is an issue dict:
+
+    {'check': 'schema', 'severity': 'error', 'message': 'hero_name is not a string'}
+
+Errors ('decode', 'schema' and invalid IDs) mean the app cannot use the sheet;
+fsck --quarantine moves such files to .store/quarantine/<run>/. Warnings
+('catalog', 'journal', 'id') mean the sheet loads but holds data the app
+does not show or an ID it cannot date.
+
+Verdicts are remembered in .store/fsck/state.json together with each file's
+size, modification time and inode, so a scheduled run only reads sheets written
+since the previous one. A change to the checks or the catalog invalidates
+the whole state.
+"""
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .character_model import DISCOVERY_KEYS, HIDDEN_PATH_KEYS, JOURNAL_LINES, validate_document
+from .ids import id_timestamp_ms, valid_character_id
+from .serialization import decode_document
+
+ERROR = 'error'
+WARNING = 'warning'
+
+# Bump when a check changes, so remembered verdicts are not reused
+CHECKS_VERSION = 1
+
+_CATALOG_PATHS: Dict[str, frozenset] = {}
+for _location, _key in HIDDEN_PATH_KEYS:
+    _CATALOG_PATHS[_location] = _CATALOG_PATHS.get(_location, frozenset()) | {_key}
+_CATALOG_DISCOVERIES = frozenset(DISCOVERY_KEYS)
+
+# IDs dated more than this after the check are reported (clock skew or a forged ID)
+_FUTURE_TOLERANCE_MS = 24 * 3600 * 1000
+
+
+def _issue(check: str, severity: str, message: str) -> Dict:
+    return {'check': check, 'severity': severity, 'message': message}
+
+
+def fingerprint() -> str:
+    """Identifies the checks and catalog that produced a verdict"""
+    catalog = json.dumps([CHECKS_VERSION, HIDDEN_PATH_KEYS, DISCOVERY_KEYS, JOURNAL_LINES])
+    return hashlib.sha256(catalog.encode('utf-8')).hexdigest()[:16]
+
+
+def check_id(character_id: str, now_ms: Optional[int] = None) -> List[Dict]:
+    """Issues of a character ID (the sheet's file name without .json)"""
+    if not valid_character_id(character_id):
+        return [_issue('id', ERROR, "file name is not a valid character ID")]
+    timestamp = id_timestamp_ms(character_id)
+    if timestamp is None:
+        return [_issue('id', WARNING, "ID carries no creation time (neither a ULID nor NAME_YYYYMMDD_HHMMSS)")]
+    now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+    if timestamp > now_ms + _FUTURE_TOLERANCE_MS:
+        return [_issue('id', WARNING, "ID's creation time is in the future")]
+    return []
+
+
+def check_document(document) -> List[Dict]:
+    """Issues of a decoded document: schema errors, then catalog and journal warnings"""
+    issues = [_issue('schema', ERROR, message) for message in validate_document(document)]
+    if not isinstance(document, dict):
+        return issues
+
+    hidden_paths = document.get('hidden_paths')
+    if isinstance(hidden_paths, dict):
+        for location, sides in hidden_paths.items():
+            known = _CATALOG_PATHS.get(location)
+            if known is None:
+                issues.append(_issue('catalog', WARNING, f"hidden paths of {location!r}, which is not a catalog tile"))
+            elif isinstance(sides, dict):
+                unknown = sorted(set(sides) - known)
+                if unknown:
+                    issues.append(_issue('catalog', WARNING,
+                                         f"hidden paths {', '.join(unknown)} are not on the tiles of {location}"))
+    discoveries = document.get('discoveries')
+    if isinstance(discoveries, dict):
+        unknown = sorted(set(discoveries) - _CATALOG_DISCOVERIES)
+        if unknown:
+            issues.append(_issue('catalog', WARNING, f"discoveries {', '.join(unknown)} are not in the catalog"))
+
+    journal = document.get('journal_entries')
+    if isinstance(journal, list) and len(journal) > JOURNAL_LINES:
+        hidden = sum(1 for line in journal[JOURNAL_LINES:] if line)
+        if hidden:
+            issues.append(_issue('journal', WARNING, f"{hidden} journal lines after line {JOURNAL_LINES} are never shown"))
+    return issues
+
+
+def check_sheet(character_id: str, data: bytes, now_ms: Optional[int] = None) -> List[Dict]:
+    """
+    Check one stored sheet
+
+    Args:
+        character_id: The sheet's file name without .json
+        data: The file's bytes
+
+    Returns:
+        List[Dict]: Issues found, empty if the sheet is sound
+    """
+    issues = check_id(character_id, now_ms)
+    try:
+        document = decode_document(data)
+    except Exception as e:
+        return issues + [_issue('decode', ERROR, f"cannot be decoded: {e}")]
+    return issues + check_document(document)
+
+
+def has_errors(issues: List[Dict]) -> bool:
+    return any(issue['severity'] == ERROR for issue in issues)
+
+
+def case_collisions(names: List[str]) -> List[Tuple[str, ...]]:
+    """Groups of sheet file names that differ only in case (they collide on case-insensitive disks)"""
+    groups: Dict[str, List[str]] = {}
+    for name in names:
+        groups.setdefault(name.casefold(), []).append(name)
+    return [tuple(sorted(group)) for group in groups.values() if len(group) > 1]
+
+
+def file_stamp(stat: os.stat_result) -> List[int]:
+    """What identifies one version of a sheet file (every write replaces it with a new inode)"""
+    return [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+
+
+class FsckState:
+    """Verdicts of the previous run, keyed by file name with the file stamp they were made for"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.files: Dict[str, Tuple[List[int], List[Dict]]] = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        if data.get('fingerprint') == fingerprint():
+            self.files = {name: (stamp, issues) for name, (stamp, issues) in data['files'].items()}
+
+    def verdict(self, name: str, stamp: List[int]) -> Optional[List[Dict]]:
+        """Remembered issues of a file, None if it changed (or was never checked)"""
+        entry = self.files.get(name)
+        if entry is None or entry[0] != stamp:
+            return None
+        return entry[1]
+
+    def save(self, files: Dict[str, Tuple[List[int], List[Dict]]]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'fingerprint': fingerprint(),
+                                'files': {name: list(entry) for name, entry in files.items()}},
+                               ensure_ascii=False, separators=(',', ':')))
+        os.replace(tmp_path, self.path)
+        self.files = dict(files)
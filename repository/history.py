@@ -0,0 +1,237 @@
+"""
+Character History
+Every write of a character is recorded as one line in
+.store/history/versions/<character_id>.log. The line does not hold the
+document: it names one content-addressed chunk per section (info, journal,
+hidden paths, discoveries), stored compressed under .store/history/chunks/
+by the SHA-256 of its contents. A section that did not change points at the
+chunk an earlier version (or another character) already wrote, so history
+grows with what actually changed rather than with the number of saves.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+SECTIONS = ('info', 'journal', 'hidden_paths', 'discoveries')
+_SECTION_FIELDS = {'journal': 'journal_entries', 'hidden_paths': 'hidden_paths', 'discoveries': 'discoveries'}
+# Stored in the version line itself; they change on every save
+_ENTRY_FIELDS = ('version', 'last_modified')
+
+
+def split_sections(document: Dict) -> Dict[str, object]:
+    """Split a character document into its history sections"""
+    sections = {name: document.get(field) for name, field in _SECTION_FIELDS.items()}
+    skip = set(_SECTION_FIELDS.values()) | set(_ENTRY_FIELDS)
+    sections['info'] = {key: value for key, value in document.items() if key not in skip}
+    return sections
+
+
+def join_sections(sections: Dict[str, object]) -> Dict:
+    """Rebuild a character document from its history sections"""
+    document = dict(sections['info'])
+    for name, field in _SECTION_FIELDS.items():
+        if sections.get(name) is not None:
+            document[field] = sections[name]
+    return document
+
+
+def diff_documents(old: Dict, new: Dict) -> Dict[Tuple, Tuple[object, object]]:
+    """
+    Compare two character documents field by field
+
+    Returns:
+        Dict: Document path -> (old value, new value) for every changed leaf,
+        using the same paths as CharacterRepository.patch(); a missing value is None
+    """
+    changes = {}
+    for key in sorted(set(old) | set(new), key=str):
+        if key not in _ENTRY_FIELDS:
+            _diff_values((key,), old.get(key), new.get(key), changes)
+    return changes
+
+
+def _diff_values(path: Tuple, old, new, changes: Dict) -> None:
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in sorted(set(old) | set(new), key=str):
+            _diff_values(path + (key,), old.get(key), new.get(key), changes)
+    elif isinstance(old, list) and isinstance(new, list):
+        for index in range(max(len(old), len(new))):
+            _diff_values(path + (index,), old[index] if index < len(old) else None,
+                         new[index] if index < len(new) else None, changes)
+    elif old != new:
+        changes[path] = (old, new)
+
+
+class HistoryStore:
+    """Append-only version logs over a shared, deduplicated chunk store"""
+
+    def __init__(self, root: Path):
+        """
+        Initialize the history store
+
+        Args:
+            root: Directory holding chunks/ and versions/ (created if missing)
+        """
+        self.root = Path(root)
+        self.chunk_dir = self.root / "chunks"
+        self.version_dir = self.root / "versions"
+        self.chunk_dir.mkdir(parents=True, exist_ok=True)
+        self.version_dir.mkdir(parents=True, exist_ok=True)
+
+    def _chunk_path(self, digest: str) -> Path:
+        return self.chunk_dir / digest[:2] / digest[2:]
+
+    def _log_path(self, character_id: str) -> Path:
+        return self.version_dir / f"{character_id}.log"
+
+    def _put_chunk(self, value) -> str:
+        """Store one section (if no identical chunk exists) and return its digest"""
+        data = json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._chunk_path(digest)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            # Writers of the same digest write the same bytes, so the last replace wins harmlessly
+            tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, 'wb') as f:
+                f.write(zlib.compress(data))
+            os.replace(tmp_path, path)
+        return digest
+
+    def _get_chunk(self, digest: str):
+        with open(self._chunk_path(digest), 'rb') as f:
+            return json.loads(zlib.decompress(f.read()))
+
+    def record(self, character_id: str, document: Dict) -> None:
+        """
+        Append a version of a character (called with the character's lock held)
+
+        Args:
+            character_id: Unique identifier for the character
+            document: The document as written, including its version
+        """
+        sections = split_sections(document)
+        entry = {
+            'version': document.get('version'),
+            'last_modified': document.get('last_modified'),
+            'recorded': time.time(),
+            'chunks': {name: self._put_chunk(sections[name]) for name in SECTIONS},
+        }
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with open(self._log_path(character_id), 'a', encoding='utf-8') as f:
+            f.write(line)
+
+    def has_log(self, character_id: str) -> bool:
+        """Whether any version of a character was recorded (deleted characters included)"""
+        return self._log_path(character_id).exists()
+
+    def rename(self, old_character_id: str, new_character_id: str) -> None:
+        """
+        Move a character's version log to its new ID (both locks held)
+
+        Raises:
+            FileExistsError: If the new ID already has a log (e.g. of a deleted
+                character), which would otherwise be replaced
+        """
+        new_path = self._log_path(new_character_id)
+        if new_path.exists():
+            raise FileExistsError(f"{new_path} already exists")
+        try:
+            os.replace(self._log_path(old_character_id), new_path)
+        except FileNotFoundError:
+            pass
+
+    def _entries(self, character_id: str) -> List[Dict]:
+        try:
+            with open(self._log_path(character_id), 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return []
+        entries = []
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue  # torn last line of an interrupted write
+        return entries
+
+    def _entry(self, character_id: str, version: int) -> Optional[Dict]:
+        # Newest first: a deleted and re-created ID repeats version numbers
+        for entry in reversed(self._entries(character_id)):
+            if entry['version'] == version:
+                return entry
+        return None
+
+    def versions(self, character_id: str) -> List[Dict]:
+        """
+        List the recorded versions of a character, oldest first
+
+        Returns:
+            List[Dict]: {'version', 'last_modified', 'recorded', 'changed'} per
+            version, where 'changed' names the sections that differ from the
+            previous version
+        """
+        versions = []
+        previous = {}
+        for entry in self._entries(character_id):
+            chunks = entry['chunks']
+            versions.append({
+                'version': entry['version'],
+                'last_modified': entry.get('last_modified'),
+                'recorded': entry.get('recorded'),
+                'changed': [name for name in SECTIONS if chunks.get(name) != previous.get(name)],
+            })
+            previous = chunks
+        return versions
+
+    def load(self, character_id: str, version: int) -> Optional[Dict]:
+        """Rebuild a recorded version of a character (None if it was never recorded)"""
+        entry = self._entry(character_id, version)
+        if entry is None:
+            return None
+        document = join_sections({name: self._get_chunk(digest) for name, digest in entry['chunks'].items()})
+        for field in _ENTRY_FIELDS:
+            if entry.get(field) is not None:
+                document[field] = entry[field]
+        return document
+
+    def diff(self, character_id: str, from_version: int, to_version: int) -> Optional[Dict[Tuple, Tuple[object, object]]]:
+        """
+        Field-level changes between two recorded versions
+
+        Only sections whose chunks differ are read and compared.
+
+        Returns:
+            Dict: Document path -> (old value, new value), None if either version is unknown
+        """
+        old_entry = self._entry(character_id, from_version)
+        new_entry = self._entry(character_id, to_version)
+        if old_entry is None or new_entry is None:
+            return None
+        changes = {}
+        for name in SECTIONS:
+            old_digest, new_digest = old_entry['chunks'][name], new_entry['chunks'][name]
+            if old_digest == new_digest:
+                continue
+            old_value, new_value = self._get_chunk(old_digest), self._get_chunk(new_digest)
+            if name == 'info':
+                changes.update(diff_documents(old_value, new_value))
+            else:
+                _diff_values((_SECTION_FIELDS[name],), old_value, new_value, changes)
+        if old_entry.get('last_modified') != new_entry.get('last_modified'):
+            changes[('last_modified',)] = (old_entry.get('last_modified'), new_entry.get('last_modified'))
+        return changes
+
+    def size(self) -> Tuple[int, int]:
+        """Number of chunks and their total compressed bytes"""
+        count = total = 0
+        for path in self.chunk_dir.glob("*/*"):
+            if not path.name.startswith('.'):
+                count += 1
+                total += path.stat().st_size
+        return count, total
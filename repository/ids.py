@@ -0,0 +1,117 @@
+"""
+Character IDs
+New characters get ULIDs: a 48-bit millisecond timestamp followed by 80 random
+bits, written as 26 Crockford base32 characters. They sort by creation time,
+never collide in practice (even across processes), and stay monotonic within
+a process when several are created in the same millisecond.
+Legacy IDs (first four letters of the hero name + "_YYYYMMDD_HHMMSS") are
+mapped onto the same timeline so mixed stores sort and range-scan correctly.
+"""
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Optional, Tuple
+
+CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_DECODE = {char: value for value, char in enumerate(CROCKFORD)}
+ULID_LENGTH = 26
+_RANDOM_BITS = 80
+_ULID_PATTERN = re.compile(r"^[0-7][0-9A-HJKMNP-TV-Z]{25}$")
+_LEGACY_PATTERN = re.compile(r"^.*_(\d{8}_\d{6})$")
+
+_lock = threading.Lock()
+# Last (millisecond, random part) from the clock, and from explicit times.
+# They are kept apart so an ID backdated or postdated for an import never
+# moves the clock-based IDs that follow.
+_last_clock = (-1, 0)
+_last_explicit = (-1, 0)
+
+
+def _encode(value: int) -> str:
+    chars = []
+    for _ in range(ULID_LENGTH):
+        chars.append(CROCKFORD[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def _next(timestamp: int, last: Tuple[int, int]) -> Tuple[int, int]:
+    """(millisecond, random part) following last; increments within the same millisecond"""
+    last_ms, last_random = last
+    if timestamp != last_ms:
+        return timestamp, int.from_bytes(os.urandom(10), 'big')
+    random_part = last_random + 1
+    if random_part >> _RANDOM_BITS:
+        return timestamp + 1, int.from_bytes(os.urandom(10), 'big')
+    return timestamp, random_part
+
+
+def new_character_id(now_ms: Optional[int] = None) -> str:
+    """
+    Generate a new character ID
+
+    Args:
+        now_ms: Creation time in Unix milliseconds, e.g. when importing old
+            characters (defaults to the current time)
+
+    Returns:
+        str: 26-character ULID; without now_ms, greater than every ID this
+        process generated before without now_ms (IDs given the same now_ms
+        increase too)
+    """
+    global _last_clock, _last_explicit
+    with _lock:
+        if now_ms is None:
+            # An earlier, clock-skewed millisecond continues from the last one: stay monotonic
+            timestamp = max(int(time.time() * 1000), _last_clock[0])
+            timestamp, random_part = _last_clock = _next(timestamp, _last_clock)
+        else:
+            timestamp, random_part = _last_explicit = _next(now_ms, _last_explicit)
+    return _encode((timestamp << _RANDOM_BITS) | random_part)
+
+
+def valid_character_id(character_id) -> bool:
+    """True if a string can name a sheet file: not empty, no path separators, control characters or leading dot"""
+    return (isinstance(character_id, str) and bool(character_id) and character_id == character_id.strip()
+            and not character_id.startswith(".") and not any(char in character_id for char in "/\\")
+            and character_id.isprintable())
+
+
+def is_ulid(character_id: str) -> bool:
+    return bool(_ULID_PATTERN.match(character_id))
+
+
+def id_timestamp_ms(character_id: str) -> Optional[int]:
+    """
+    Creation time encoded in a character ID
+
+    Returns:
+        int: Unix milliseconds, or None if the ID carries no time (unknown format)
+    """
+    if is_ulid(character_id):
+        value = 0
+        for char in character_id[:10]:
+            value = value * 32 + _DECODE[char]
+        return value
+    match = _LEGACY_PATTERN.match(character_id)
+    if match:
+        try:
+            # Legacy IDs were stamped with local time, to the second
+            return int(datetime.strptime(match.group(1), "%Y%m%d_%H%M%S").timestamp() * 1000)
+        except ValueError:
+            return None
+    return None
+
+
+def id_datetime(character_id: str) -> Optional[datetime]:
+    """Creation time encoded in a character ID, as a local datetime"""
+    timestamp = id_timestamp_ms(character_id)
+    return datetime.fromtimestamp(timestamp / 1000) if timestamp is not None else None
+
+
+def sort_key(character_id: str) -> Tuple[int, str]:
+    """Order IDs by creation time (legacy and ULID alike), IDs without a time first"""
+    timestamp = id_timestamp_ms(character_id)
+    return (timestamp if timestamp is not None else -1, character_id)
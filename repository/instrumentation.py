@@ -0,0 +1,280 @@
+"""
+Repository Instrumentation
+Opt-in latency, call count and I/O byte metrics for repository methods.
+Metrics can be exported as a Prometheus text file or appended to a JSON-lines file.
+"""
+import bisect
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+# Upper bounds (seconds) of the latency histogram buckets, +Inf is implicit
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+METRICS_PATH_ENV = "DRAGONSDOWN_METRICS_PATH"
+
+
+class OperationStats:
+    """Counters and latency histogram for one repository method"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.latency_sum = 0.0
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def observe(self, seconds: float, failed: bool, bytes_read: int, bytes_written: int):
+        self.calls += 1
+        self.errors += int(failed)
+        self.bytes_read += bytes_read
+        self.bytes_written += bytes_written
+        self.latency_sum += seconds
+        self.bucket_counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate a latency quantile from the histogram (bucket upper bound)"""
+        if not self.calls:
+            return 0.0
+        target = q * self.calls
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS + (float('inf'),), self.bucket_counts):
+            seen += count
+            if seen >= target:
+                return bound if bound != float('inf') else LATENCY_BUCKETS[-1]
+        return LATENCY_BUCKETS[-1]
+
+
+class RepositoryMetrics:
+    """Thread-safe registry of per-method repository metrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._operations: Dict[Tuple[str, str], OperationStats] = {}
+        # Per-context (not per-thread) so work a repository fans out to a thread
+        # pool with contextvars.copy_context() is charged to the calling method
+        self._io_stack_var = contextvars.ContextVar(f"repository_io_stack_{id(self)}", default=None)
+        self._last_export = 0.0
+
+    def _io_stack(self) -> List[List[int]]:
+        stack = self._io_stack_var.get()
+        if stack is None:
+            stack = []
+            self._io_stack_var.set(stack)
+        return stack
+
+    def add_bytes(self, read: int = 0, written: int = 0):
+        """Attribute I/O bytes to the innermost repository call in this context"""
+        stack = self._io_stack()
+        if stack:
+            with self._lock:
+                stack[-1][0] += read
+                stack[-1][1] += written
+
+    def timed(self, repository: str, method: str, func):
+        """Wrap a callable so each call is timed and recorded"""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            stack = self._io_stack()
+            stack.append([0, 0])
+            failed = True
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                elapsed = time.perf_counter() - start
+                bytes_read, bytes_written = stack.pop()
+                with self._lock:
+                    stats = self._operations.setdefault((repository, method), OperationStats())
+                    stats.observe(elapsed, failed, bytes_read, bytes_written)
+        return wrapper
+
+    def snapshot(self) -> List[Dict]:
+        """
+        Get a point-in-time copy of all metrics
+
+        Returns:
+            List[Dict]: One entry per (repository, method) pair
+        """
+        with self._lock:
+            items = sorted(self._operations.items())
+            return [
+                {
+                    'repository': repository,
+                    'method': method,
+                    'calls': stats.calls,
+                    'errors': stats.errors,
+                    'bytes_read': stats.bytes_read,
+                    'bytes_written': stats.bytes_written,
+                    'latency_sum_s': stats.latency_sum,
+                    'p50_s': stats.quantile(0.50),
+                    'p95_s': stats.quantile(0.95),
+                    'p99_s': stats.quantile(0.99),
+                    'buckets': dict(zip([str(b) for b in LATENCY_BUCKETS] + ['+Inf'], stats.bucket_counts)),
+                }
+                for (repository, method), stats in items
+            ]
+
+    def to_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        with self._lock:
+            items = sorted(self._operations.items())
+            lines = []
+            counters = [
+                ('calls_total', 'Repository method calls', lambda s: s.calls),
+                ('errors_total', 'Repository method calls that raised', lambda s: s.errors),
+                ('bytes_read_total', 'Bytes read from storage', lambda s: s.bytes_read),
+                ('bytes_written_total', 'Bytes written to storage', lambda s: s.bytes_written),
+            ]
+            for name, help_text, value in counters:
+                lines.append(f"# HELP dragonsdown_repository_{name} {help_text}")
+                lines.append(f"# TYPE dragonsdown_repository_{name} counter")
+                for (repository, method), stats in items:
+                    lines.append(
+                        f'dragonsdown_repository_{name}{{repository="{repository}",method="{method}"}} {value(stats)}'
+                    )
+
+            lines.append("# HELP dragonsdown_repository_latency_seconds Repository method latency")
+            lines.append("# TYPE dragonsdown_repository_latency_seconds histogram")
+            for (repository, method), stats in items:
+                labels = f'repository="{repository}",method="{method}"'
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, stats.bucket_counts):
+                    cumulative += count
+                    lines.append(f'dragonsdown_repository_latency_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'dragonsdown_repository_latency_seconds_bucket{{{labels},le="+Inf"}} {stats.calls}')
+                lines.append(f'dragonsdown_repository_latency_seconds_sum{{{labels}}} {stats.latency_sum}')
+                lines.append(f'dragonsdown_repository_latency_seconds_count{{{labels}}} {stats.calls}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str) -> bool:
+        """
+        Export metrics to a local file
+
+        A path ending in .jsonl gets one JSON line per method appended; any
+        other path is overwritten with the Prometheus text format.
+
+        Args:
+            path: Destination file path
+
+        Returns:
+            bool: True if export was successful, False otherwise
+        """
+        try:
+            path = Path(path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if path.suffix == '.jsonl':
+                timestamp = time.time()
+                with open(path, 'a', encoding='utf-8') as f:
+                    for entry in self.snapshot():
+                        f.write(json.dumps({'timestamp': timestamp, **entry}) + "\n")
+            else:
+                tmp_path = path.with_name(path.name + ".tmp")
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(self.to_prometheus())
+                os.replace(tmp_path, path)
+            return True
+        except Exception as e:
+            print(f"Error exporting metrics to {path}: {e}")
+            return False
+
+    def export_if_due(self, path: str, interval: float = 10.0) -> bool:
+        """Export at most once per interval seconds (cheap to call every rerun)"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_export < interval:
+                return False
+            self._last_export = now
+        return self.export(path)
+
+
+def _file_size(path) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def instrument(repository, metrics: RepositoryMetrics):
+    """
+    Instrument every public method of a repository instance in place
+
+    Byte counts come from the repository's file I/O helpers
+    (_read_document/_write_document or _load_json) when it has them.
+
+    Args:
+        repository: CharacterRepository, GameReferenceRepository or compatible object
+        metrics: Registry that receives the measurements
+
+    Returns:
+        The same repository instance
+    """
+    name = type(repository).__name__
+
+    for attr in dir(type(repository)):
+        if attr.startswith('_'):
+            continue
+        method = getattr(repository, attr)
+        if callable(method):
+            setattr(repository, attr, metrics.timed(name, attr, method))
+
+    if hasattr(repository, '_read_document'):
+        read_document = repository._read_document
+        write_document = repository._write_document
+
+        def counted_read(filepath, *args, **kwargs):
+            result = read_document(filepath, *args, **kwargs)
+            metrics.add_bytes(read=_file_size(filepath))
+            return result
+
+        def counted_write(filepath, *args, **kwargs):
+            result = write_document(filepath, *args, **kwargs)
+            metrics.add_bytes(written=_file_size(filepath))
+            return result
+
+        repository._read_document = counted_read
+        repository._write_document = counted_write
+
+    if hasattr(repository, '_load_json'):
+        load_json = repository._load_json
+
+        def counted_load(filename, *args, **kwargs):
+            result = load_json(filename, *args, **kwargs)
+            metrics.add_bytes(read=_file_size(os.path.join(repository.data_path, filename)))
+            return result
+
+        repository._load_json = counted_load
+
+    return repository
+
+
+_default_metrics: Optional[RepositoryMetrics] = None
+_default_metrics_lock = threading.Lock()
+
+
+def metrics_from_env() -> Optional[RepositoryMetrics]:
+    """
+    Get the process-wide metrics registry if instrumentation is enabled
+
+    Instrumentation is enabled by setting DRAGONSDOWN_METRICS_PATH to the
+    export file path.
+
+    Returns:
+        RepositoryMetrics if enabled, None otherwise
+    """
+    global _default_metrics
+    if not os.environ.get(METRICS_PATH_ENV):
+        return None
+    with _default_metrics_lock:
+        if _default_metrics is None:
+            _default_metrics = RepositoryMetrics()
+        return _default_metrics
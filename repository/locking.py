@@ -0,0 +1,234 @@
+"""
+Striped Lock Manager
+Maps keys (character IDs) onto a fixed set of lock stripes. Each stripe is a
+thread lock plus, when a lock directory is given, an fcntl advisory file lock
+so several processes sharing one store also exclude each other. The stripe
+count is recorded in the lock directory, because processes that hash the same
+key onto different stripe counts would take different locks.
+FileLock applies the same thread + fcntl pairing to a single shared file.
+"""
+import os
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: thread-level locking only
+    fcntl = None
+
+DEFAULT_STRIPES = 64
+
+
+class StripedLockManager:
+    """Fixed pool of thread + file locks selected by a stable hash of the key"""
+
+    def __init__(self, stripes: Optional[int] = None, lock_dir: Optional[Path] = None):
+        """
+        Initialize the lock manager
+
+        Args:
+            stripes: Number of lock stripes; unrelated keys collide with probability 1/stripes
+                (None for the count recorded in lock_dir, or DEFAULT_STRIPES)
+            lock_dir: Directory for per-stripe lock files (None for thread-level locking only)
+
+        Raises:
+            ValueError: If lock_dir was created with a different stripe count
+        """
+        self.lock_dir = Path(lock_dir) if lock_dir is not None and fcntl is not None else None
+        if self.lock_dir is not None:
+            self.lock_dir.mkdir(parents=True, exist_ok=True)
+            stripes = self._record_stripes(stripes)
+        self.stripes = stripes or DEFAULT_STRIPES
+        self._thread_locks = [threading.Lock() for _ in range(self.stripes)]
+        self._lock_files: List[Optional[object]] = [None] * self.stripes
+
+        self._stats_lock = threading.Lock()
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _record_stripes(self, stripes: Optional[int]) -> int:
+        """Stripe count recorded in the lock directory, recording this one if there is none"""
+        path = self.lock_dir / "stripes"
+        if not path.exists():
+            # Linking a finished temp file in place means concurrent first
+            # openers agree on one count and nobody reads a partial file
+            tmp_path = path.with_name(f".stripes.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_text(f"{stripes or DEFAULT_STRIPES}\n", encoding='utf-8')
+            try:
+                os.link(tmp_path, path)
+            except FileExistsError:
+                pass
+            finally:
+                tmp_path.unlink()
+        recorded = int(path.read_text(encoding='utf-8'))
+        if stripes is not None and stripes != recorded:
+            raise ValueError(f"{self.lock_dir} uses {recorded} lock stripes, not {stripes}")
+        return recorded
+
+    def stripe_for(self, key: str) -> int:
+        """Stripe index for a key (stable across processes, unlike hash())"""
+        return zlib.crc32(key.encode('utf-8')) % self.stripes
+
+    def _lock_file(self, stripe: int):
+        # Only called while the stripe's thread lock is held
+        handle = self._lock_files[stripe]
+        if handle is None:
+            handle = open(self.lock_dir / f"stripe-{stripe:03d}.lock", 'a+')
+            self._lock_files[stripe] = handle
+        return handle
+
+    def _acquire(self, stripe: int) -> float:
+        """Acquire one stripe, returning the time spent waiting"""
+        start = time.perf_counter()
+        thread_lock = self._thread_locks[stripe]
+        contended = not thread_lock.acquire(blocking=False)
+        if contended:
+            thread_lock.acquire()
+        if self.lock_dir is not None:
+            try:
+                handle = self._lock_file(stripe)
+                try:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    contended = True
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            except BaseException:
+                thread_lock.release()
+                raise
+        waited = time.perf_counter() - start if contended else 0.0
+        with self._stats_lock:
+            self.acquisitions += 1
+            if contended:
+                self.contended += 1
+                self.wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return waited
+
+    def _release(self, stripe: int) -> None:
+        if self.lock_dir is not None:
+            fcntl.flock(self._lock_files[stripe].fileno(), fcntl.LOCK_UN)
+        self._thread_locks[stripe].release()
+
+    @contextmanager
+    def lock(self, *keys: str):
+        """
+        Hold the stripes for one or more keys
+
+        Stripes are always taken in ascending order, so multi-key callers
+        (e.g. rename) cannot deadlock each other.
+
+        Args:
+            keys: Keys (character IDs) to lock
+        """
+        stripes = sorted({self.stripe_for(key) for key in keys})
+        acquired = []
+        try:
+            for stripe in stripes:
+                self._acquire(stripe)
+                acquired.append(stripe)
+            yield
+        finally:
+            for stripe in reversed(acquired):
+                self._release(stripe)
+
+    def stats(self) -> Dict:
+        """Get contention counters"""
+        with self._stats_lock:
+            return {
+                'stripes': self.stripes,
+                'process_locks': self.lock_dir is not None,
+                'acquisitions': self.acquisitions,
+                'contended': self.contended,
+                'contention_rate': self.contended / self.acquisitions if self.acquisitions else 0.0,
+                'wait_seconds': self.wait_seconds,
+                'max_wait_seconds': self.max_wait_seconds,
+            }
+
+    def close(self) -> None:
+        """Close the per-stripe lock files"""
+        for stripe, handle in enumerate(self._lock_files):
+            if handle is not None:
+                handle.close()
+                self._lock_files[stripe] = None
+
+
+class FileLock:
+    """Exclusive lock on one file, held across threads and (with fcntl) processes"""
+
+    def __init__(self, path: Path):
+        """
+        Initialize the lock
+
+        Args:
+            path: File to lock; it is created if missing and kept open for appends
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.handle = open(self.path, 'a', encoding='utf-8')
+        self._thread_lock = threading.Lock()
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """
+        Take the lock
+
+        Args:
+            blocking: Wait for the lock; if False, return False when it is held elsewhere
+
+        Returns:
+            bool: True if the lock is now held
+        """
+        if not self._thread_lock.acquire(blocking):
+            return False
+        if fcntl is None:
+            return True
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            while True:
+                try:
+                    fcntl.flock(self.handle.fileno(), flags)
+                except BlockingIOError:
+                    self._thread_lock.release()
+                    return False
+                # Another process may have replaced the file while we waited;
+                # a lock on the old inode excludes nobody, so follow the path
+                try:
+                    if os.fstat(self.handle.fileno()).st_ino == os.stat(self.path).st_ino:
+                        return True
+                except FileNotFoundError:
+                    pass
+                fcntl.flock(self.handle.fileno(), fcntl.LOCK_UN)
+                self.handle.close()
+                self.handle = open(self.path, 'a', encoding='utf-8')
+        except BaseException:
+            self._thread_lock.release()
+            raise
+
+    def release(self) -> None:
+        if fcntl is not None:
+            fcntl.flock(self.handle.fileno(), fcntl.LOCK_UN)
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self.handle
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    def reopen(self) -> None:
+        """Reopen the handle after the file was replaced (call with the lock held)"""
+        old_handle = self.handle
+        self.handle = open(self.path, 'a', encoding='utf-8')
+        if fcntl is not None:
+            fcntl.flock(self.handle.fileno(), fcntl.LOCK_EX)
+            fcntl.flock(old_handle.fileno(), fcntl.LOCK_UN)
+        old_handle.close()
+
+    def close(self) -> None:
+        self.handle.close()
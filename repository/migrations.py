@@ -0,0 +1,89 @@
+"""
+Schema Migrations
+Stored sheets record the schema they were written with in 'schema_version'
+(missing means 0: every sheet written before migrations existed).
+MIGRATIONS[n] upgrades a document from schema n to n + 1, and
+migrate_document() runs the ones a document still needs.
+
+CharacterRepository migrates every document it reads, so callers only ever
+see the current schema, and every document it writes. The bulk pass
+(dragonsdown-store upgrade) rewrites the sheets that are still behind, so
+reads stop paying for them. A migration fills in what older sheets lack
+without changing what a player entered. Upgraded sheets therefore keep
+their version, and caches, history and running totals need no update.
+Migrations must be idempotent and must leave malformed fields to
+validation rather than fail.
+"""
+import copy
+from typing import Callable, Dict, Tuple
+
+from .character_model import DISCOVERY_KEYS, HIDDEN_PATH_KEYS
+from .ids import id_datetime
+
+
+def _add_last_modified(document: Dict, character_id: str) -> None:
+    """Schema 1: sheets saved before last_modified existed get their creation time"""
+    if document.get('last_modified'):
+        return
+    created = document.get('date')
+    if not created:
+        created_at = id_datetime(character_id)
+        created = created_at.strftime("%Y-%m-%d %H:%M:%S") if created_at else None
+    if created:
+        document['last_modified'] = created
+
+
+def _complete_catalog(document: Dict, character_id: str) -> None:
+    """Schema 2: every hidden path and discovery of the catalog is present (unfound ones as False)"""
+    hidden_paths = document.setdefault('hidden_paths', {})
+    if isinstance(hidden_paths, dict):
+        for location, key in HIDDEN_PATH_KEYS:
+            sides = hidden_paths.setdefault(location, {})
+            if isinstance(sides, dict):
+                sides.setdefault(key, False)
+    discoveries = document.setdefault('discoveries', {})
+    if isinstance(discoveries, dict):
+        for name in DISCOVERY_KEYS:
+            discoveries.setdefault(name, False)
+
+
+MIGRATIONS: Tuple[Callable[[Dict, str], None], ...] = (
+    _add_last_modified,
+    _complete_catalog,
+)
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def schema_version(document: Dict) -> int:
+    """Schema a document was written with (0 if it predates schema versions)"""
+    version = document.get('schema_version', 0)
+    return version if isinstance(version, int) else 0
+
+
+def needs_migration(document: Dict) -> bool:
+    return schema_version(document) < SCHEMA_VERSION
+
+
+def migrate_document(document: Dict, character_id: str, copy_on_write: bool = False) -> Dict:
+    """
+    Upgrade a document to the current schema
+
+    Args:
+        document: Decoded document; upgraded in place unless copy_on_write
+        character_id: The document's character ID (some migrations derive values from it)
+        copy_on_write: Upgrade a deep copy, leaving a caller's document untouched
+
+    Returns:
+        Dict: The upgraded document (the same object if nothing had to change
+        or copy_on_write is False)
+    """
+    start = schema_version(document)
+    if start >= SCHEMA_VERSION:
+        return document
+    if copy_on_write:
+        document = copy.deepcopy(document)
+    for migration in MIGRATIONS[start:]:
+        migration(document, character_id)
+    document['schema_version'] = SCHEMA_VERSION
+    return document
@@ -0,0 +1,187 @@
+"""
+Character Progress
+Every write of a character appends one line to .store/progress/<character_id>.log
+describing how its hidden paths, discoveries and journal changed. Lines are
+delta-encoded against the line before them:
+
+    {"at": 1730500000000, "v": 1, "p": "1a0", "d": "4", "j": 2}   keyframe
+    {"dt": 61250, "p": [5], "j": 1}                                 delta
+
+A keyframe holds the absolute time (Unix ms), version and full state (path and
+discovery bitsets in hex, filled journal lines). A delta holds the time since
+the previous line, the bit indices that flipped, the change in filled journal
+lines and the version only when it did not simply go up by one. A writer
+starts with a keyframe whenever it cannot be sure it wrote the previous line
+itself, so logs shared by several processes stay decodable.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .character_model import DISCOVERY_KEYS, HIDDEN_PATH_KEYS, Character, set_bits
+
+# (log size after our last append, time, version, paths, discoveries, journal lines)
+_State = Tuple[int, int, int, int, int, int]
+
+
+def progress_state(document: Dict) -> Tuple[int, int, int]:
+    """Path bitset, discovery bitset and number of filled journal lines of a document"""
+    character = Character.from_dict(document)
+    return character.paths, character.discoveries, character.journal_lines()
+
+
+class ProgressLog:
+    """Append-only, delta-encoded progress log per character"""
+
+    def __init__(self, root: Path, cached_characters: int = 4096):
+        """
+        Initialize the progress log
+
+        Args:
+            root: Directory holding one <character_id>.log per character (created if missing)
+            cached_characters: Characters whose last written state is remembered for
+                delta encoding; the others start again with a keyframe
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.cached_characters = cached_characters
+        self._last: "OrderedDict[str, _State]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _log_path(self, character_id: str) -> Path:
+        return self.root / f"{character_id}.log"
+
+    def record(self, character_id: str, document: Dict) -> None:
+        """
+        Append the progress of a written document (called with the character's lock held)
+
+        Args:
+            character_id: Unique identifier for the character
+            document: The document as written, including its version
+        """
+        paths, discoveries, journal = progress_state(document)
+        version = document.get('version', 0)
+        now = int(time.time() * 1000)
+        path = self._log_path(character_id)
+
+        with open(path, 'a', encoding='utf-8') as f:
+            size = f.tell()
+            with self._lock:
+                last = self._last.pop(character_id, None)
+            if last is not None and last[0] == size:
+                _, last_time, last_version, last_paths, last_discoveries, last_journal = last
+                entry = {'dt': now - last_time}
+                if version != last_version + 1:
+                    entry['v'] = version
+                if paths != last_paths:
+                    entry['p'] = set_bits(paths ^ last_paths)
+                if discoveries != last_discoveries:
+                    entry['d'] = set_bits(discoveries ^ last_discoveries)
+                if journal != last_journal:
+                    entry['j'] = journal - last_journal
+            else:
+                entry = {'at': now, 'v': version, 'p': format(paths, 'x'), 'd': format(discoveries, 'x'), 'j': journal}
+            line = json.dumps(entry, separators=(',', ':')) + "\n"
+            f.write(line)
+            size = f.tell()
+
+        with self._lock:
+            self._last[character_id] = (size, now, version, paths, discoveries, journal)
+            if len(self._last) > self.cached_characters:
+                self._last.popitem(last=False)
+
+    def has_log(self, character_id: str) -> bool:
+        """Whether any progress of a character was recorded (deleted characters included)"""
+        return self._log_path(character_id).exists()
+
+    def rename(self, old_character_id: str, new_character_id: str) -> None:
+        """
+        Move a character's log to its new ID (both locks held)
+
+        Raises:
+            FileExistsError: If the new ID already has a log (e.g. of a deleted
+                character), which would otherwise be replaced
+        """
+        new_path = self._log_path(new_character_id)
+        if new_path.exists():
+            raise FileExistsError(f"{new_path} already exists")
+        # The remembered state describes the moved log, which keeps its size
+        with self._lock:
+            last = self._last.pop(old_character_id, None)
+            if last is not None:
+                self._last[new_character_id] = last
+        try:
+            os.replace(self._log_path(old_character_id), new_path)
+        except FileNotFoundError:
+            pass
+
+    def series(self, character_id: str, start_ms: Optional[int] = None, end_ms: Optional[int] = None,
+               details: bool = False) -> List[Dict]:
+        """
+        Decode a character's progress over time
+
+        Args:
+            character_id: Unique identifier for the character
+            start_ms: Earliest time to return, inclusive (Unix ms)
+            end_ms: Latest time to return, exclusive (Unix ms)
+            details: Also name the paths and discoveries found or lost at each point
+
+        Returns:
+            List[Dict]: One point per write, oldest first, with 'time' (Unix ms),
+            'version', 'paths', 'discoveries' and 'journal_lines' counts, plus
+            'found' and 'lost' lists of (location, key) paths and discovery
+            names when details is True
+        """
+        try:
+            with open(self._log_path(character_id), 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return []
+
+        points = []
+        at = version = paths = discoveries = journal = 0
+        decodable = False
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # torn last line of an interrupted write
+            flipped_paths = flipped_discoveries = 0
+            if 'at' in entry:
+                new_paths, new_discoveries = int(entry['p'], 16), int(entry['d'], 16)
+                flipped_paths, flipped_discoveries = paths ^ new_paths, discoveries ^ new_discoveries
+                at, version, paths, discoveries, journal = entry['at'], entry['v'], new_paths, new_discoveries, entry['j']
+                decodable = True
+            elif decodable:
+                at += entry['dt']
+                version = entry.get('v', version + 1)
+                for bit in entry.get('p', ()):
+                    flipped_paths |= 1 << bit
+                for bit in entry.get('d', ()):
+                    flipped_discoveries |= 1 << bit
+                paths ^= flipped_paths
+                discoveries ^= flipped_discoveries
+                journal += entry.get('j', 0)
+            else:
+                continue  # a delta before any keyframe cannot be placed
+
+            if (start_ms is not None and at < start_ms) or (end_ms is not None and at >= end_ms):
+                continue
+            point = {
+                'time': at,
+                'version': version,
+                'paths': bin(paths).count('1'),
+                'discoveries': bin(discoveries).count('1'),
+                'journal_lines': journal,
+            }
+            if details:
+                point['found'] = ([HIDDEN_PATH_KEYS[bit] for bit in set_bits(flipped_paths & paths)]
+                                  + [DISCOVERY_KEYS[bit] for bit in set_bits(flipped_discoveries & discoveries)])
+                point['lost'] = ([HIDDEN_PATH_KEYS[bit] for bit in set_bits(flipped_paths & ~paths)]
+                                 + [DISCOVERY_KEYS[bit] for bit in set_bits(flipped_discoveries & ~discoveries)])
+            points.append(point)
+        return points
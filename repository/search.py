@@ -0,0 +1,357 @@
+"""
+Character Search
+Inverted index over journal_entries, hero_story and scenario, kept current on
+every save, delete and rename instead of opening every sheet per query.
+
+Changes first go to an in-memory live segment, and their IDs are appended to
+this index's pending log. Every flush_threshold changes the live segment is
+written to .store/search/ as an immutable segment file
+(seg-<sortable id>.json). Once there are more than max_segments, they are
+merged into one. Each document entry carries the time of its write, taken
+under the character's lock, so the newest entry wins no matter which segment
+(or which replica) wrote it. Pending logs of indexes that did not flush (a
+crashed process) are replayed from the stored sheets when an index is opened.
+
+Queries run against the merged in-memory postings and are ranked by TF-IDF
+over matching lines.
+"""
+import gc
+import heapq
+import json
+import math
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .ids import new_character_id
+from .locking import FileLock
+
+SEARCH_FIELDS = ('journal_entries', 'hero_story', 'scenario')
+_TOKEN = re.compile(r"\w+")
+
+# A match is a document path: ('journal_entries', 3) or ('hero_story', 0) for line 0 of the story.
+# Postings and segments store it packed into one int: line * 4 + field index.
+Match = Tuple[str, int]
+_FIELD_CODES = {field: code for code, field in enumerate(SEARCH_FIELDS)}
+
+
+def _unpack_match(packed: int) -> Match:
+    return SEARCH_FIELDS[packed & 3], packed >> 2
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens of a text"""
+    return _TOKEN.findall(text.lower())
+
+
+def extract_terms(document: Dict) -> Dict[str, List[int]]:
+    """Map every term of a character's searchable fields to the (packed) lines it occurs on"""
+    terms: Dict[str, List[int]] = {}
+
+    def add(field: str, line: int, text: str) -> None:
+        packed = line * 4 + _FIELD_CODES[field]
+        for term in set(tokenize(text)):
+            terms.setdefault(term, []).append(packed)
+
+    for line, text in enumerate(document.get('journal_entries') or []):
+        if text:
+            add('journal_entries', line, text)
+    for field in ('hero_story', 'scenario'):
+        for line, text in enumerate((document.get(field) or '').splitlines()):
+            add(field, line, text)
+    return terms
+
+
+@contextmanager
+def _bulk_allocation():
+    """
+    Pause the cyclic garbage collector while postings are built in bulk
+
+    Loading or rebuilding an index allocates millions of small containers,
+    each round of which would trigger a full collection; none of them form
+    cycles, so nothing is lost by collecting afterwards instead.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class SearchIndex:
+    """Incrementally maintained, segment-persisted inverted index of character text"""
+
+    def __init__(self, root: Path, loader: Callable[[str], Optional[Dict]],
+                 flush_threshold: int = 128, max_segments: int = 8):
+        """
+        Initialize the index, loading its segments and replaying abandoned pending logs
+
+        Args:
+            root: Directory holding the segments and pending logs (created if missing)
+            loader: Reads a stored character by ID (None if missing), used for replays
+            flush_threshold: Changes kept in memory before a segment is written
+            max_segments: Segment count that triggers a merge
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.loader = loader
+        self.flush_threshold = flush_threshold
+        self.max_segments = max_segments
+        self._lock = threading.RLock()
+        self._merge_lock = FileLock(self.root / "merge.lock")
+
+        self._postings: Dict[str, Dict[str, List[int]]] = {}
+        self._doc_terms: Dict[str, Tuple[str, ...]] = {}
+        self._stamps: Dict[str, int] = {}  # includes deleted IDs, whose entry shadows older segments
+        self._live: Dict[str, Tuple[int, Optional[Dict[str, List[int]]]]] = {}
+        self._segments: Set[str] = set()
+
+        self._pending = FileLock(self.root / f"pending-{os.getpid()}-{new_character_id()}.log")
+        self._pending.acquire()
+        with self._lock, _bulk_allocation():
+            self._load_new_segments()
+            self._replay_abandoned()
+
+    # -- maintenance ---------------------------------------------------------
+
+    def _apply(self, character_id: str, stamp: int, terms: Optional[Dict[str, List[int]]]) -> bool:
+        """Make an entry current unless a newer one is known (lock held)"""
+        if stamp <= self._stamps.get(character_id, -1):
+            return False
+        for term in self._doc_terms.pop(character_id, ()):
+            documents = self._postings.get(term)
+            if documents is not None:
+                documents.pop(character_id, None)
+                if not documents:
+                    del self._postings[term]
+        if terms is not None:
+            for term, matches in terms.items():
+                self._postings.setdefault(term, {})[character_id] = matches
+            self._doc_terms[character_id] = tuple(terms)
+        self._stamps[character_id] = stamp
+        return True
+
+    def update(self, character_id: str, document: Optional[Dict]) -> None:
+        """
+        Index a written character (called with the character's lock held)
+
+        Args:
+            character_id: Unique identifier for the character
+            document: The document written, or None if the character was deleted
+        """
+        terms = extract_terms(document) if document is not None else None
+        stamp = time.time_ns()
+        with self._lock:
+            self._apply(character_id, stamp, terms)
+            self._live[character_id] = (stamp, terms)
+            self._pending.handle.write(character_id + "\n")
+            self._pending.handle.flush()
+            if len(self._live) >= self.flush_threshold:
+                self.flush()
+
+    def _write_segment(self, entries: Dict[str, Tuple[int, Optional[Dict[str, List[int]]]]]) -> str:
+        """Write entries as a new immutable segment and return its name (lock held)"""
+        # Document-major: loading applies each character's entry in one step
+        segment = {'docs': {character_id: [stamp, terms] for character_id, (stamp, terms) in entries.items()}}
+        name = f"seg-{new_character_id()}.json"
+        tmp_path = self.root / f".{name}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            # dumps() rather than dump(): only the former uses the C encoder
+            f.write(json.dumps(segment, ensure_ascii=False, separators=(',', ':')))
+        os.replace(tmp_path, self.root / name)
+        self._segments.add(name)
+        return name
+
+    def flush(self) -> None:
+        """Write the live segment to disk and merge if there are too many segments"""
+        with self._lock:
+            if self._live:
+                self._write_segment(self._live)
+                self._live.clear()
+                self._pending.handle.truncate(0)
+            if len(self._segments) > self.max_segments:
+                self.merge()
+
+    def merge(self) -> None:
+        """Replace every segment this index has loaded with one segment of its current state"""
+        with self._lock, self._merge_lock:
+            self._load_new_segments()
+            if self._live:
+                self._write_segment(self._live)
+                self._live.clear()
+                self._pending.handle.truncate(0)
+            merged = self._segments
+            self._segments = set()
+            entries = {character_id: (stamp, self._terms_of(character_id))
+                       for character_id, stamp in self._stamps.items()}
+            self._write_segment(entries)
+            for name in merged:
+                try:
+                    os.unlink(self.root / name)
+                except FileNotFoundError:
+                    pass
+
+    def _terms_of(self, character_id: str) -> Optional[Dict[str, List[int]]]:
+        terms = self._doc_terms.get(character_id)
+        if terms is None:
+            return None
+        return {term: self._postings[term][character_id] for term in terms}
+
+    def _load_new_segments(self) -> None:
+        """Apply segments written by other indexes since the last look (lock held)"""
+        for entry in os.scandir(self.root):
+            name = entry.name
+            if not name.startswith("seg-") or not name.endswith(".json") or name in self._segments:
+                continue
+            try:
+                with open(entry.path, 'r', encoding='utf-8') as f:
+                    segment = json.load(f)
+            except FileNotFoundError:
+                continue  # merged away meanwhile; the merged segment is picked up instead
+            for character_id, (stamp, terms) in segment['docs'].items():
+                self._apply(character_id, stamp, terms)
+            self._segments.add(name)
+
+    def _replay_abandoned(self) -> None:
+        """Re-index the characters listed in pending logs whose index is gone (lock held)"""
+        for path in self.root.glob("pending-*.log"):
+            if path == self._pending.path:
+                continue
+            abandoned = FileLock(path)
+            try:
+                if not abandoned.acquire(blocking=False):
+                    continue  # its index is still running
+                with open(path, 'r', encoding='utf-8') as f:
+                    character_ids = {line.strip() for line in f if line.strip()}
+                for character_id in character_ids:
+                    document = self.loader(character_id)
+                    terms = extract_terms(document) if document is not None else None
+                    stamp = time.time_ns()
+                    self._apply(character_id, stamp, terms)
+                    self._live[character_id] = (stamp, terms)
+                if self._live:
+                    self._write_segment(self._live)
+                    self._live.clear()
+                os.unlink(path)
+                abandoned.release()
+            finally:
+                abandoned.close()
+
+    def rebuild(self, documents: Iterable[Tuple[str, Dict]]) -> None:
+        """
+        Index every character from scratch, replacing all segments
+
+        Args:
+            documents: (character_id, document) for every stored character
+        """
+        self.rebuild_terms((character_id, extract_terms(document)) for character_id, document in documents)
+
+    def rebuild_terms(self, entries: Iterable[Tuple[str, Dict[str, List[int]]]]) -> None:
+        """
+        Like rebuild(), from terms already extracted (e.g. by worker processes)
+
+        Args:
+            entries: (character_id, extract_terms(document)) for every stored character
+        """
+        with self._lock, self._merge_lock, _bulk_allocation():
+            self._postings.clear()
+            self._doc_terms.clear()
+            self._stamps.clear()
+            self._live.clear()
+            self._pending.handle.truncate(0)
+            stamp = time.time_ns()
+            for character_id, terms in entries:
+                self._apply(character_id, stamp, terms)
+            old_segments = {entry.name for entry in os.scandir(self.root)
+                            if entry.name.startswith("seg-") and entry.name.endswith(".json")}
+            self._segments = set()
+            self._write_segment({character_id: (stamp, self._terms_of(character_id))
+                                 for character_id in self._stamps})
+            for name in old_segments:
+                try:
+                    os.unlink(self.root / name)
+                except FileNotFoundError:
+                    pass
+
+    def document_ids(self) -> Set[str]:
+        """IDs of the characters currently indexed"""
+        with self._lock:
+            self._load_new_segments()
+            return set(self._doc_terms)
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return not self._stamps and not self._segments
+
+    def segment_count(self) -> int:
+        with self._lock:
+            return len(self._segments)
+
+    # -- queries -------------------------------------------------------------
+
+    def search(self, query: str, limit: Optional[int] = 20,
+               character_ids: Optional[Iterable[str]] = None) -> List[Dict]:
+        """
+        Find characters whose journal, story or scenario mention the query's words
+
+        Characters matching more (and rarer) query words on more lines rank
+        higher; a character needs only one of the words to be returned.
+
+        Args:
+            query: Free text, e.g. "lost battalion"
+            limit: Maximum number of results (None for all)
+            character_ids: Only consider these characters (e.g. the player's own)
+
+        Returns:
+            List[Dict]: {'character_id', 'score', 'matches'} best first, where
+            matches lists the (field, line) paths that contain a query word
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        allowed = set(character_ids) if character_ids is not None else None
+        with self._lock:
+            self._load_new_segments()
+            documents = max(len(self._doc_terms), 1)
+            scores: Dict[str, float] = {}
+            term_postings = [self._postings[term] for term in terms if term in self._postings]
+            for postings in term_postings:
+                idf = math.log(1 + documents / len(postings))
+                for character_id, lines in postings.items():
+                    if allowed is not None and character_id not in allowed:
+                        continue
+                    scores[character_id] = scores.get(character_id, 0.0) + idf * (1 + math.log(len(lines)))
+
+            def rank(character_id):
+                return -scores[character_id], character_id
+            if limit is None:
+                ranked = sorted(scores, key=rank)
+            else:
+                ranked = heapq.nsmallest(limit, scores, key=rank)
+            # Matching lines are only collected for the results returned
+            results = []
+            for character_id in ranked:
+                packed = set()
+                for postings in term_postings:
+                    packed.update(postings.get(character_id, ()))
+                matches = sorted((_unpack_match(match) for match in packed),
+                                 key=lambda match: (_FIELD_CODES[match[0]], match[1]))
+                results.append({'character_id': character_id, 'score': scores[character_id], 'matches': matches})
+        return results
+
+    def close(self) -> None:
+        """Flush the live segment and remove this index's pending log"""
+        with self._lock:
+            self.flush()
+            try:
+                os.unlink(self._pending.path)
+            except FileNotFoundError:
+                pass
+            self._pending.release()
+            self._pending.close()
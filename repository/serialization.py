@@ -0,0 +1,177 @@
+"""
+Character Sheet Serialization
+Pluggable encodings for stored character documents. Plain JSON documents are
+stored untagged (so every existing sheet stays readable); any other format
+starts with a short header naming its codec, so one store can mix formats and
+be migrated one document at a time. Files keep their .json name either way.
+"""
+import json
+import zlib
+from typing import Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:  # optional: pip install orjson
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional: pip install msgpack
+    msgpack = None
+
+
+# Header of tagged (non-JSON) documents: MAGIC + codec name + b"\n". A NUL
+# byte can never start a JSON document, so untagged files are unambiguous.
+MAGIC = b"\x00dd:"
+
+
+class Codec:
+    """Encodes a character document to bytes and back"""
+
+    name = ""
+    tagged = True
+
+    def encode_payload(self, document: Dict) -> bytes:
+        raise NotImplementedError
+
+    def decode_payload(self, payload: bytes) -> Dict:
+        raise NotImplementedError
+
+    def encode(self, document: Dict) -> bytes:
+        """Encode a document, including its format header if the codec is tagged"""
+        payload = self.encode_payload(document)
+        if not self.tagged:
+            return payload
+        return MAGIC + self.name.encode('ascii') + b"\n" + payload
+
+
+class PrettyJsonCodec(Codec):
+    """Indented JSON, the original human-friendly format"""
+
+    name = "json-pretty"
+    tagged = False
+
+    def encode_payload(self, document: Dict) -> bytes:
+        return json.dumps(document, indent=2, ensure_ascii=False).encode('utf-8')
+
+    def decode_payload(self, payload: bytes) -> Dict:
+        return _loads_json(payload)
+
+
+class JsonCodec(Codec):
+    """Compact stdlib JSON"""
+
+    name = "json"
+    tagged = False
+
+    def encode_payload(self, document: Dict) -> bytes:
+        return json.dumps(document, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def decode_payload(self, payload: bytes) -> Dict:
+        return _loads_json(payload)
+
+
+class OrjsonCodec(Codec):
+    """Compact JSON encoded by orjson (same bytes on disk as JsonCodec, much faster)"""
+
+    name = "orjson"
+    tagged = False
+
+    def encode_payload(self, document: Dict) -> bytes:
+        return orjson.dumps(document)
+
+    def decode_payload(self, payload: bytes) -> Dict:
+        return orjson.loads(payload)
+
+
+class MsgpackCodec(Codec):
+    """MessagePack binary encoding"""
+
+    name = "msgpack"
+
+    def encode_payload(self, document: Dict) -> bytes:
+        return msgpack.packb(document, use_bin_type=True)
+
+    def decode_payload(self, payload: bytes) -> Dict:
+        return msgpack.unpackb(payload, raw=False)
+
+
+class ZlibJsonCodec(Codec):
+    """zlib-compressed compact JSON, a stdlib-only binary format"""
+
+    name = "zlib-json"
+
+    def __init__(self, level: int = 6):
+        self.level = level
+
+    def encode_payload(self, document: Dict) -> bytes:
+        return zlib.compress(JsonCodec().encode_payload(document), self.level)
+
+    def decode_payload(self, payload: bytes) -> Dict:
+        return _loads_json(zlib.decompress(payload))
+
+
+def _loads_json(payload: bytes) -> Dict:
+    # Every JSON codec reads every JSON document, so use the fastest decoder available
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+CODECS: Dict[str, Codec] = {
+    codec.name: codec
+    for codec in (
+        PrettyJsonCodec(),
+        JsonCodec(),
+        ZlibJsonCodec(),
+        OrjsonCodec() if orjson is not None else None,
+        MsgpackCodec() if msgpack is not None else None,
+    )
+    if codec is not None
+}
+
+DEFAULT_CODEC = "json"
+
+
+def available_codecs() -> List[str]:
+    """Names of the codecs usable in this environment"""
+    return list(CODECS)
+
+
+def get_codec(codec) -> Codec:
+    """
+    Resolve a codec name (or pass a Codec instance through)
+
+    Raises:
+        ValueError: If the codec is unknown or its optional library is not installed
+    """
+    if isinstance(codec, Codec):
+        return codec
+    if codec not in CODECS:
+        raise ValueError(f"Codec {codec!r} is not available (available: {', '.join(CODECS)})")
+    return CODECS[codec]
+
+
+def detect_codec(data: bytes) -> Optional[str]:
+    """
+    Get the codec name stored in a document's header
+
+    Returns:
+        str: The tagged codec name, or None for an untagged (JSON) document
+    """
+    if not data.startswith(MAGIC):
+        return None
+    return data[len(MAGIC):data.index(b"\n")].decode('ascii')
+
+
+def decode_document(data: bytes) -> Dict:
+    """
+    Decode a stored document in any known format
+
+    Raises:
+        ValueError: If the document names a codec that is not available
+    """
+    name = detect_codec(data)
+    if name is None:
+        return _loads_json(data)
+    return get_codec(name).decode_payload(data[data.index(b"\n") + 1:])
@@ -0,0 +1,149 @@
+"""
+Test file for the materialized character aggregates
+"""
+import json
+import random
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+from repository import Character, CharacterRepository
+from repository.aggregates import AggregateStore
+from repository.character_model import DISCOVERY_KEYS, HIDDEN_PATH_KEYS
+
+
+def random_character(rng):
+    journal = tuple(f"Day {i}" if rng.random() < 0.2 else "" for i in range(30))
+    return Character.empty().replace(
+        hero_name=f"Hero {rng.randrange(1000)}",
+        lineage_and_class=rng.choice(["", "Elf Ranger", "Dwarf Warrior", "Human Mage"]),
+        journal=journal,
+        paths=rng.getrandbits(len(HIDDEN_PATH_KEYS)),
+        discoveries=rng.getrandbits(len(DISCOVERY_KEYS)),
+    )
+
+
+def test_aggregates():
+    """Totals follow every kind of write, persist, are shared, and match a rebuild"""
+    temp_dir = tempfile.mkdtemp(prefix="aggregates_")
+    try:
+        repo = CharacterRepository(storage_path=temp_dir, history=False, progress=False)
+        assert repo.get_statistics()['characters'] == 0
+
+        aria = Character.empty().replace(hero_name="Aria", lineage_and_class="Elf Ranger")
+        repo.save("Aria_1", aria)
+        location, key = HIDDEN_PATH_KEYS[0]
+        repo.patch("Aria_1", {('hidden_paths', location, key): True, ('discoveries', 'shrine'): True,
+                              ('journal_entries', 2): "Met the lost battalion"})
+        stats = repo.get_statistics()
+        assert stats['characters'] == 1 and stats['paths'][location][key] == 1
+        assert stats['discoveries']['shrine'] == 1 and stats['discoveries']['crypt'] == 0
+        assert stats['lineage_and_class'] == {"Elf Ranger": 1}
+        assert stats['journal_lines'] == 1 and stats['journals_started'] == 1
+        repo.rename("Aria_1", "Aria_2")
+        assert repo.get_statistics() == stats
+        repo.delete("Aria_2")
+        stats = repo.get_statistics()
+        assert stats['characters'] == 0 and stats['paths'][location][key] == 0
+        assert stats['lineage_and_class'] == {} and stats['journals_started'] == 0
+        print("✓ Updates on save, patch, rename and delete successful")
+
+        # Random writes through two repositories sharing the store match a full rebuild
+        rng = random.Random(3)
+        other = CharacterRepository(storage_path=temp_dir, history=False, progress=False)
+        ids = []
+        for step in range(300):
+            writer = rng.choice([repo, other])
+            action = rng.random()
+            if not ids or action < 0.35:
+                ids.append(f"Hero_{step}")
+                writer.save(ids[-1], random_character(rng))
+            elif action < 0.75:
+                bit = rng.randrange(len(HIDDEN_PATH_KEYS))
+                writer.patch(rng.choice(ids), {('hidden_paths',) + HIDDEN_PATH_KEYS[bit]: rng.random() < 0.5,
+                                               ('lineage_and_class',): rng.choice(["", "Human Mage", "Orc"])})
+            elif action < 0.85:
+                writer.save(rng.choice(ids), random_character(rng))
+            else:
+                writer.delete(ids.pop(rng.randrange(len(ids))))
+        incremental = repo.get_statistics()
+        assert incremental == other.get_statistics()
+        assert incremental['characters'] == len(ids)
+        assert repo.rebuild_statistics() == incremental
+        print("✓ Incremental totals match a rebuild")
+
+        # Totals persist, and a store that lost them is counted again on open
+        aggregates_path = Path(temp_dir) / ".store" / "aggregates.json"
+        assert json.loads(aggregates_path.read_text())['characters'] == len(ids)
+        assert CharacterRepository(storage_path=temp_dir).get_statistics() == incremental
+        aggregates_path.unlink()
+        assert CharacterRepository(storage_path=temp_dir).get_statistics() == incremental
+        assert CharacterRepository(storage_path=temp_dir, aggregates=False).get_statistics() is None
+        print("✓ Persistence and rebuild successful")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def test_delta_logs():
+    """Writes append to per-store delta logs, which are folded on size, on close and after a crash"""
+    temp_dir = tempfile.mkdtemp(prefix="aggregates_")
+    try:
+        repo = CharacterRepository(storage_path=temp_dir, history=False, progress=False, search=False)
+        base_path = Path(temp_dir) / ".store" / "aggregates.json"
+        log_dir = Path(temp_dir) / ".store" / "aggregates"
+
+        # Concurrent writers on disjoint characters only append to the store's log
+        for thread in range(8):
+            repo.save_many((f"Hero_{thread}_{i}", random_character(random.Random(thread * 5 + i))) for i in range(5))
+        base = base_path.read_bytes()
+
+        def play(thread):
+            rng = random.Random(thread)
+            for step in range(100):
+                bit = rng.randrange(len(HIDDEN_PATH_KEYS))
+                repo.patch(f"Hero_{thread}_{step % 5}", {('hidden_paths',) + HIDDEN_PATH_KEYS[bit]: rng.random() < 0.5,
+                                                          ('lineage_and_class',): rng.choice(["Orc", "Elf Ranger"])})
+        threads = [threading.Thread(target=play, args=(thread,)) for thread in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert base_path.read_bytes() == base and len(list(log_dir.glob("delta-*.log"))) == 1
+        incremental = repo.get_statistics()
+        assert incremental['characters'] == 40
+        print("✓ Concurrent writes appended successfully")
+
+        # A store that crashed leaves its log behind; the next store to open folds and removes it
+        crashed = CharacterRepository(storage_path=temp_dir, history=False, progress=False, search=False)
+        crashed.save("Hero_crash", random_character(random.Random(9)))
+        crashed.aggregates._log.close()  # the process dies: its log lock goes with it
+        incremental = repo.get_statistics()
+        assert incremental['characters'] == 41
+        other = CharacterRepository(storage_path=temp_dir, history=False, progress=False, search=False)
+        assert len(list(log_dir.glob("delta-*.log"))) == 1
+        assert other.get_statistics() == repo.get_statistics() == incremental
+        print("✓ Crashed store's log folded successfully")
+
+        # A log past compact_bytes is folded into the base and replaced
+        small = AggregateStore(base_path, compact_bytes=200)
+        for step in range(20):
+            character = random_character(random.Random(step))
+            small.update(None, character.to_dict())
+            small.update(character.to_dict(), None)
+        assert base_path.read_bytes() != base and small.snapshot() == incremental
+        small.close()
+        other.close()
+        repo.close()
+        assert list(log_dir.glob("delta-*.log")) == []
+        assert json.loads(base_path.read_text())['characters'] == 41
+        assert CharacterRepository(storage_path=temp_dir).rebuild_statistics() == incremental
+        print("✓ Compaction successful")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_aggregates()
+    test_delta_logs()
+    print("\n✅ All tests passed!")
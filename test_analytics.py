@@ -0,0 +1,75 @@
+"""
+Test file for cross-character analytics
+"""
+import shutil
+import tempfile
+
+from repository import Character, CharacterRepository
+from repository.analytics import CharacterAnalytics, unpack_masks
+from repository.character_model import DISCOVERY_KEYS, HIDDEN_PATH_KEYS
+
+
+def make_character(name, paths=(), discoveries=()):
+    character = Character.empty().replace(hero_name=name)
+    for key in paths:
+        character.paths |= Character.path_mask(*key)
+    for name in discoveries:
+        character.discoveries |= Character.discovery_mask(name)
+    return character
+
+
+def test_analytics():
+    """Statistics match a direct count and follow saves, patches, renames and deletes"""
+    assert unpack_masks([0b101, 1 << 66], 67).tolist()[0][:4] == [True, False, True, False]
+    assert unpack_masks([1 << 66], 67)[0, 66]
+
+    temp_dir = tempfile.mkdtemp(prefix="analytics_")
+    try:
+        repo = CharacterRepository(storage_path=temp_dir, history=False, progress=False)
+        first, second = HIDDEN_PATH_KEYS[0], HIDDEN_PATH_KEYS[1]
+        repo.save("A", make_character("A", paths=[first, second], discoveries=['shrine']))
+        repo.save("B", make_character("B", paths=[first]))
+        repo.save("C", make_character("C"))
+        repo.save("D", make_character("D", discoveries=['shrine', 'crypt']))
+
+        analytics = CharacterAnalytics(repo)
+        assert analytics.character_count() == 4 and analytics.full_loads == 1
+        frame = analytics.path_frame()
+        assert frame.shape == (4, len(HIDDEN_PATH_KEYS)) and frame.loc["A"].sum() == 2
+        assert analytics.discovery_frame().shape == (4, len(DISCOVERY_KEYS))
+
+        land_pack, tile = frame.columns[0][:2]
+        tile_paths = sum(1 for location, _ in HIDDEN_PATH_KEYS if location == tile)
+        completion = analytics.tile_completion()
+        assert completion.loc[(land_pack, tile), 'paths'] == tile_paths
+        assert abs(completion.loc[(land_pack, tile), 'completion'] - 3 / (4 * tile_paths)) < 1e-9
+        assert completion.index[0] == (land_pack, tile)
+        assert analytics.land_pack_completion().index[0] == land_pack
+        rates = analytics.discovery_rates()
+        assert rates['shrine'] == 0.5 and rates['crypt'] == 0.25 and rates.index[0] == 'shrine'
+        missed = analytics.most_missed_paths(limit=None)
+        assert missed.index[-1] == (land_pack,) + first and missed['missed_by'].iloc[0] == 4
+        assert analytics.tile_completion() is completion, "Unchanged store recomputed"
+        print("✓ Statistics successful")
+
+        # Later changes are applied from the change feed, not by reloading the store
+        repo.patch("C", {('hidden_paths',) + first: True, ('discoveries', 'crypt'): True})
+        repo.delete("A")
+        repo.rename("B", "B2")
+        repo.save("E", make_character("E", paths=[second]))
+        assert analytics.character_count() == 4
+        assert analytics.full_loads == 1 and analytics.rows_updated == 3
+        expected = CharacterAnalytics(repo)
+        assert (analytics.path_frame().sort_index() == expected.path_frame().sort_index()).all().all()
+        assert analytics.discovery_rates().to_dict() == expected.discovery_rates().to_dict()
+        assert analytics.most_missed_paths(limit=None)['missed_by'].to_dict() == \
+            expected.most_missed_paths(limit=None)['missed_by'].to_dict()
+        assert analytics.discovery_rates()['crypt'] == 0.5
+        print("✓ Incremental updates successful")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_analytics()
+    print("\n✅ All tests passed!")
@@ -0,0 +1,110 @@
+"""
+Test file for the compressed pack-file archive tier
+"""
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from repository import Character, CharacterRepository
+from repository.cli import main
+
+
+def make_store(path, count, idle):
+    """count characters, of which the first idle were last written 100 days ago"""
+    repo = CharacterRepository(storage_path=str(path), history=False, progress=False)
+    repo.save_many((f"Hero_{i}", Character.empty().replace(
+        hero_name=f"Hero {i}", lineage_and_class="Elf Ranger" if i % 2 else "Dwarf Warrior",
+        journal=(f"Day {i}: crossed the Foul Swamp",) + ("",) * 29, paths=i)) for i in range(count))
+    old = time.time() - 100 * 86400
+    for i in range(idle):
+        os.utime(path / f"Hero_{i}.json", (old, old))
+    return repo
+
+
+def test_archive():
+    """Idle sheets move into packs and stay readable, writable and listable"""
+    temp_dir = Path(tempfile.mkdtemp(prefix="archive_"))
+    try:
+        store = temp_dir / "store"
+        repo = make_store(store, 20, 12)
+        before = {character_id: repo.get(character_id) for character_id in repo.list_character_ids()}
+        statistics = repo.get_statistics()
+
+        assert sorted(repo.archive_idle(30)) == sorted(f"Hero_{i}" for i in range(12))
+        assert len(list(store.glob("*.json"))) == 8
+        assert repo.archive_idle(30) == []
+        assert sorted(repo.list_character_ids()) == sorted(before)
+        assert repo.get_all() == before
+        assert repo.exists("Hero_3") and repo.get_character("Hero_3").paths == 3
+        assert repo.get_statistics() == statistics
+        assert repo.search("Day 3", limit=1)[0]['character_id'] == "Hero_3"
+        pack_bytes = repo.archive.stats()['bytes']
+        sheet_bytes = sum(len(json.dumps(document)) for document in before.values()) * 12 / 20
+        assert pack_bytes < sheet_bytes / 5, (pack_bytes, sheet_bytes)
+        print(f"✓ Archive successful ({pack_bytes:,} pack bytes for {sheet_bytes:,.0f} JSON bytes)")
+
+        # Another process sees the archived characters
+        other = CharacterRepository(storage_path=str(store), history=False, progress=False)
+        assert other.get("Hero_5") == before["Hero_5"]
+
+        # Writes move a character back to a sheet; deletes and renames work on archived characters
+        assert repo.patch("Hero_0", {('hero_name',): "Thawed"})['version'] == 2
+        assert (store / "Hero_0.json").exists() and not repo.archive.contains("Hero_0")
+        assert repo.save("Hero_1", Character.empty().replace(hero_name="Saved"), expected_version=1)
+        assert repo.delete("Hero_2", expected_version=1) and not repo.exists("Hero_2")
+        assert repo.rename("Hero_3", "Hero_3b") and repo.get("Hero_3b")['version'] == 2
+        assert not repo.exists("Hero_3") and not repo.rename("Hero_3", "Hero_x")
+        assert other.get("Hero_0")['hero_name'] == "Thawed" and other.get("Hero_2") is None
+        assert sorted(other.list_character_ids()) == sorted(repo.list_character_ids())
+        assert repo.get_statistics()['characters'] == 19
+        print("✓ Writes to archived characters successful")
+
+        # Compaction drops the copies written back or deleted; readers keep up
+        assert other.get("Hero_4") is not None  # other maps the pack that compaction removes
+        result = repo.compact_archive()
+        assert result['before']['characters'] == result['after']['characters'] == 8
+        assert result['after']['bytes'] < result['before']['bytes'] and result['after']['packs'] == 1
+        assert other.get("Hero_4") == before["Hero_4"] and other.get("Hero_11") == before["Hero_11"]
+        assert repo.archive_idle(30) == [] and repo.get("Hero_7") == before["Hero_7"]
+        other.close()
+        repo.close()
+        print("✓ Compaction successful")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def test_archive_cli():
+    """The CLI archives idle sheets, and its recounts and exports include archived characters"""
+    temp_dir = Path(tempfile.mkdtemp(prefix="archive_"))
+    try:
+        store = temp_dir / "store"
+        make_store(store, 30, 20).close()
+        common = ["--storage", str(store), "--quiet"]
+        assert main(common + ["archive"]) == 2
+        assert main(common + ["archive", "--days", "30"]) == 0
+        assert len(list(store.glob("*.json"))) == 10
+        assert main(common + ["--workers", "2", "check"]) == 0
+        assert main(common + ["--workers", "2", "reindex"]) == 0
+        assert main(common + ["check"]) == 0
+        export_path = temp_dir / "backup.ndjson"
+        assert main(common + ["export", str(export_path)]) == 0
+        assert len(export_path.read_text().splitlines()) == 30
+        assert main(common + ["archive", "--compact"]) == 0
+
+        repo = CharacterRepository(storage_path=str(store), history=False, progress=False)
+        assert repo.get_statistics()['characters'] == 30
+        assert repo.search("crossed", limit=None) and len(repo.search("crossed", limit=None)) == 30
+        assert repo.get_character("Hero_15").hero_name == "Hero 15"
+        repo.close()
+        print("✓ Archive CLI successful")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_archive()
+    test_archive_cli()
+    print("\n✅ All tests passed!")
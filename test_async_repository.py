@@ -0,0 +1,95 @@
+"""
+Test file for the Async Character Repository
+"""
+import asyncio
+import shutil
+import tempfile
+import threading
+
+from repository import AsyncCharacterRepository, CharacterRepository, VersionConflictError
+
+
+async def exercise_async_repository(storage_path):
+    repo = CharacterRepository(storage_path=storage_path)
+    async with AsyncCharacterRepository(repo, max_concurrency=4) as async_repo:
+        # The sync API is mirrored, including version conflicts
+        assert await async_repo.save("Aria_1", {'hero_name': 'Aria'}, expected_version=0)
+        try:
+            await async_repo.save("Aria_1", {'hero_name': 'Imposter'}, expected_version=0)
+            assert False, "Create-only save overwrote an existing character"
+        except VersionConflictError:
+            pass
+        assert (await async_repo.get("Aria_1"))['hero_name'] == 'Aria'
+        assert await async_repo.rename("Aria_1", "Aria_2")
+        assert not await async_repo.exists("Aria_1")
+        print("✓ Async CRUD successful")
+
+        # Thousands of concurrent requests never run more than max_concurrency reads at once
+        results = await async_repo.save_many({f"Hero_{i}": {'hero_name': f"Hero {i}"} for i in range(50)})
+        assert all(result.ok for result in results)
+        in_flight = 0
+        peak = 0
+        peak_lock = threading.Lock()
+        original_get = repo.get
+
+        def counting_get(character_id):
+            nonlocal in_flight, peak
+            with peak_lock:
+                in_flight += 1
+                peak = max(peak, in_flight)
+            try:
+                return original_get(character_id)
+            finally:
+                with peak_lock:
+                    in_flight -= 1
+
+        repo.get = counting_get
+        loaded = await asyncio.gather(*(async_repo.get(f"Hero_{i % 50}") for i in range(2000)))
+        repo.get = original_get
+        assert all(character['hero_name'] == f"Hero {i % 50}" for i, character in enumerate(loaded))
+        assert peak <= 4, f"{peak} reads in flight"
+        results = await async_repo.get_many(["Hero_3", "Missing_1", "Hero_7"])
+        assert [r.value['hero_name'] if r.value else None for r in results] == ["Hero 3", None, "Hero 7"]
+        assert len(await async_repo.get_all()) == 51
+        print("✓ Bounded concurrency successful")
+
+        # Cancelling a queued write means it never runs
+        release = threading.Event()
+        started = threading.Event()
+        original_save = repo.save
+
+        def blocking_save(character_id, character_data, expected_version=None):
+            started.set()
+            release.wait(10)
+            return original_save(character_id, character_data, expected_version=expected_version)
+
+        repo.save = blocking_save
+        running = [asyncio.create_task(async_repo.save(f"Busy_{i}", {'hero_name': 'Busy'})) for i in range(4)]
+        queued = asyncio.create_task(async_repo.save("Cancelled_1", {'hero_name': 'Never'}))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 10)
+        await asyncio.sleep(0.05)
+        queued.cancel()
+        release.set()
+        assert all(await asyncio.gather(*running))
+        try:
+            await queued
+            assert False, "Cancelled save completed"
+        except asyncio.CancelledError:
+            pass
+        repo.save = original_save
+        assert not repo.exists("Cancelled_1")
+        print("✓ Cancellation successful")
+
+
+def test_async_repository():
+    """CRUD, bounded concurrency and cancellation on one event loop"""
+    temp_dir = tempfile.mkdtemp(prefix="async_repository_")
+    try:
+        asyncio.run(exercise_async_repository(temp_dir))
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_async_repository()
+    print("\n✅ All tests passed!")
@@ -0,0 +1,107 @@
+"""
+Test file for streaming bulk export and import
+"""
+import gzip
+import io
+import shutil
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from repository import Character, CharacterRepository
+from repository.bulk import export_characters, import_characters
+
+
+def make_repository(path, count):
+    repo = CharacterRepository(storage_path=str(path), history=False, progress=False)
+    repo.save_many((f"Hero_2025010{i % 9 + 1}_{i:06d}", Character.empty().replace(
+        hero_name=f"Hero {i}", lineage_and_class="Elf Ranger", journal=(f"Day {i}",) + ("",) * 29, paths=i))
+        for i in range(count))
+    return repo
+
+
+def test_round_trip():
+    """Plain and gzip exports, to paths and file objects, import into an identical store"""
+    temp_dir = Path(tempfile.mkdtemp(prefix="bulk_"))
+    try:
+        source = make_repository(temp_dir / "source", 120)
+        batches = []
+        plain = export_characters(source, temp_dir / "backup.ndjson", batch_size=50, progress=batches.append)
+        assert plain.count == 120 and not plain.problems and batches == [50, 50, 20]
+        assert plain.bytes == (temp_dir / "backup.ndjson").stat().st_size
+        compressed = export_characters(source, temp_dir / "backup.ndjson.gz")
+        assert compressed.bytes == plain.bytes
+        assert gzip.decompress((temp_dir / "backup.ndjson.gz").read_bytes()) == (temp_dir / "backup.ndjson").read_bytes()
+        assert (temp_dir / "backup.ndjson.gz").stat().st_size < plain.bytes / 4
+        buffer = io.BytesIO()
+        export_characters(source, buffer, compress=True)
+        assert buffer.getvalue() == (temp_dir / "backup.ndjson.gz").read_bytes()  # no timestamp in the header
+        print(f"✓ Export successful ({plain.summary('exported')})")
+
+        for name, backup in (("plain", temp_dir / "backup.ndjson"), ("gzip", io.BytesIO(buffer.getvalue()))):
+            target = CharacterRepository(storage_path=str(temp_dir / name), history=False, progress=False)
+            stats = import_characters(target, backup, batch_size=32)
+            assert stats.count == 120 and not stats.problems and stats.bytes == plain.bytes
+            assert target.get_character("Hero_20250103_000002").same_content(source.get_character("Hero_20250103_000002"))
+            assert target.get_statistics()['characters'] == 120
+            assert target.search("day 7", limit=None) == source.search("day 7", limit=None) != []
+
+            # Re-importing keeps what is there, or overwrites it as a new version
+            again = import_characters(target, temp_dir / "backup.ndjson", skip_existing=True)
+            assert again.count == 0 and again.skipped == 120
+            import_characters(target, temp_dir / "backup.ndjson")
+            assert target.get("Hero_20250101_000000")['version'] == 2
+            target.close()
+        print("✓ Import successful")
+
+        with open(temp_dir / "bad.ndjson", 'wb') as f:
+            f.write(b'{"id": "Ok_1", "document": {"hero_name": "Ok"}}\n\n[1]\n'
+                    b'{"id": "Bad_1", "document": {"version": "x"}}\n{"id": "", "document": {}}\n')
+        target = CharacterRepository(storage_path=str(temp_dir / "bad"), history=False, progress=False)
+        stats = import_characters(target, temp_dir / "bad.ndjson")
+        assert stats.count == 1 and sorted(stats.problems) == ["line 3", "line 4 (Bad_1)", "line 5 ()"]
+        target.close()
+        source.close()
+        print("✓ Bad lines reported successfully")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def transient_memory(task):
+    """Peak memory of a task beyond what it leaves allocated (e.g. the repository's change log)"""
+    tracemalloc.start()
+    try:
+        result = task()
+        current, peak = tracemalloc.get_traced_memory()
+        return result, peak - current
+    finally:
+        tracemalloc.stop()
+
+
+def test_constant_memory():
+    """Peak memory of an export or import does not grow with the store"""
+    temp_dir = Path(tempfile.mkdtemp(prefix="bulk_"))
+    try:
+        peaks = {}
+        for count in (300, 1200):
+            source = make_repository(temp_dir / f"source_{count}", count)
+            backup = temp_dir / f"backup_{count}.ndjson.gz"
+            target = CharacterRepository(storage_path=str(temp_dir / f"target_{count}"), history=False,
+                                         progress=False, aggregates=False, search=False)
+            exported, export_peak = transient_memory(lambda: export_characters(source, backup, batch_size=50))
+            imported, import_peak = transient_memory(lambda: import_characters(target, backup, batch_size=50))
+            assert exported.count == imported.count == count
+            peaks[count] = (export_peak, import_peak, exported.bytes)
+            target.close()
+            source.close()
+        small, large = peaks[300], peaks[1200]
+        assert large[0] < small[0] * 1.5 and large[1] < small[1] * 1.5, peaks
+        print(f"✓ Constant memory successful (peak {max(large[:2]) / 1e6:.1f} MB for {large[2] / 1e6:.1f} MB)")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_round_trip()
+    test_constant_memory()
+    print("\n✅ All tests passed!")
@@ -0,0 +1,212 @@
+"""
+Test file for the shared Character Cache
+"""
+import shutil
+import tempfile
+import threading
+
+from repository import Character, CharacterRepository, CharacterCache
+
+
+def make_character(name):
+    return {'hero_name': name, 'journal_entries': [''] * 30, 'discoveries': {'altar': False}}
+
+
+def test_character_cache():
+    """Read-through, copy isolation, LRU eviction and index maintenance"""
+    temp_dir = tempfile.mkdtemp(prefix="character_cache_")
+    try:
+        repo = CharacterRepository(storage_path=temp_dir)
+        for i in range(5):
+            assert repo.save(f"Hero_{i}", make_character(f"Hero{i}"))
+
+        one_document = CharacterCache._document_size(Character.from_dict(dict(make_character("Hero0"), version=1)))
+        cache = CharacterCache(repo, max_bytes=one_document * 3)
+
+        # The id index is built once and holds every character, cached or not
+        assert sorted(cache.list_ids()) == [f"Hero_{i}" for i in range(5)]
+        assert cache.hero_name("Hero_4") == "Hero4"
+        assert cache.stats()['documents'] == 3
+        assert cache.stats()['evictions'] == 2
+        print("✓ Size-based eviction successful")
+
+        # Sessions get private copies; mutating one never leaks into the cache
+        copy_a = cache.get("Hero_4")
+        copy_a['journal_entries'][0] = "scribbled"
+        copy_a['discoveries']['altar'] = True
+        copy_b = cache.get("Hero_4")
+        assert copy_b['journal_entries'][0] == ''
+        assert copy_b['discoveries']['altar'] is False
+        print("✓ Copy-on-handoff successful")
+
+        # Evicted characters are read through from the repository
+        misses = cache.stats()['misses']
+        assert cache.get("Hero_0")['hero_name'] == "Hero0"
+        assert cache.stats()['misses'] == misses + 1
+        assert cache.get("Missing") is None
+        print("✓ Read-through successful")
+
+        # Writes go through the repository and keep the index in sync
+        edited = cache.get("Hero_1")
+        edited['hero_name'] = "Renamed"
+        assert cache.save("Hero_1", edited)
+        edited['journal_entries'][1] = "after save"
+        assert repo.get("Hero_1")['hero_name'] == "Renamed"
+        assert cache.get("Hero_1")['journal_entries'][1] == ''
+        assert cache.hero_name("Hero_1") == "Renamed"
+
+        assert cache.rename("Hero_1", "Hero_9")
+        assert "Hero_9" in cache.list_ids() and "Hero_1" not in cache.list_ids()
+        assert cache.delete("Hero_9")
+        assert "Hero_9" not in cache.list_ids()
+        assert not repo.exists("Hero_9")
+        print("✓ Write-through successful")
+
+        # Writes that bypass the cache reach it through the change feed
+        repo.save("Side_1", make_character("SideDoor"))
+        repo.save("Hero_2", make_character("Changed"))
+        repo.delete("Hero_3")
+        ids = cache.list_ids()
+        assert "Side_1" in ids and "Hero_3" not in ids
+        assert cache.hero_name("Side_1") == "SideDoor"
+        assert cache.hero_name("Hero_2") == "Changed"
+        assert cache.get("Hero_2")['hero_name'] == "Changed"
+        print("✓ Change feed sync successful")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+class SlowReadRepository:
+    """Repository whose next read returns, after a concurrent save, what it read before it"""
+
+    def __init__(self, repository):
+        self.repository = repository
+        self.during_read = None
+
+    def get_character(self, character_id):
+        character = self.repository.get_character(character_id)
+        if self.during_read is not None:
+            during_read, self.during_read = self.during_read, None
+            during_read()
+        return character
+
+    def __getattr__(self, name):
+        return getattr(self.repository, name)
+
+
+def test_stale_copies():
+    """A read or save that finishes late never replaces a newer cached version"""
+    temp_dir = tempfile.mkdtemp(prefix="character_cache_")
+    try:
+        repo = CharacterRepository(storage_path=temp_dir)
+        assert repo.save("Hero_1", make_character("First"))
+        slow = SlowReadRepository(repo)
+        cache = CharacterCache(slow)
+        cache.list_ids()
+        cache.invalidate("Hero_1")
+
+        # A save lands between a miss's read (version 1) and its store
+        slow.during_read = lambda: cache.save("Hero_1", make_character("Second"))
+        assert cache.get_character("Hero_1").version == 1
+        assert cache.get_character("Hero_1").hero_name == "Second"
+        assert cache.hero_name("Hero_1") == "Second"
+
+        # The older of two racing saves stores its copy last
+        late = Character.from_dict(dict(make_character("Late"), version=2))
+        assert cache.save("Hero_1", make_character("Third"))
+        with cache._lock:
+            cache._store("Hero_1", late)
+        assert cache.get_character("Hero_1").hero_name == "Third"
+        print("✓ Stale copies ignored successfully")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+class PausingRepository:
+    """Repository that parks a thread after a read or save until released"""
+
+    def __init__(self, repository):
+        self.repository = repository
+        self.paused = threading.Event()
+        self.resume = threading.Event()
+        self.pause_next = False
+
+    def _pause(self):
+        if self.pause_next:
+            self.pause_next = False
+            self.paused.set()
+            assert self.resume.wait(10)
+
+    def get_character(self, character_id):
+        character = self.repository.get_character(character_id)
+        self._pause()
+        return character
+
+    def save(self, character_id, character_data, expected_version=None):
+        saved = self.repository.save(character_id, character_data, expected_version=expected_version)
+        self._pause()
+        return saved
+
+    def __getattr__(self, name):
+        return getattr(self.repository, name)
+
+
+def interleave(pausing, cache, call, direct_write):
+    """Run call in a thread, and while it is parked run a direct write and another session's sync"""
+    pausing.paused.clear()
+    pausing.resume.clear()
+    pausing.pause_next = True
+    thread = threading.Thread(target=call)
+    thread.start()
+    assert pausing.paused.wait(10)
+    direct_write()
+    cache.list_ids()
+    pausing.resume.set()
+    thread.join(10)
+
+
+def test_direct_write_during_read():
+    """A direct write that lands while a read or save is outside the lock is never hidden"""
+    temp_dir = tempfile.mkdtemp(prefix="character_cache_")
+    try:
+        repo = CharacterRepository(storage_path=temp_dir)
+        assert repo.save("Hero_1", make_character("v1"))
+        pausing = PausingRepository(repo)
+        cache = CharacterCache(pausing)
+        cache.list_ids()
+        cache.invalidate("Hero_1")
+
+        # Miss: the read returns v1, then v2 is written and its event consumed
+        interleave(pausing, cache, lambda: cache.get_character("Hero_1"),
+                   lambda: repo.save("Hero_1", make_character("v2")))
+        assert repo.get("Hero_1")['hero_name'] == "v2"
+        assert cache.get_character("Hero_1").hero_name == "v2"
+        assert cache.hero_name("Hero_1") == "v2"
+
+        # Save through the cache, then a direct write before the cache stores its copy
+        interleave(pausing, cache, lambda: cache.save("Hero_1", make_character("v3")),
+                   lambda: repo.save("Hero_1", make_character("v4")))
+        assert cache.get_character("Hero_1").hero_name == "v4"
+        assert cache.hero_name("Hero_1") == "v4"
+
+        # A patch from another session landing during another miss's read
+        cache.invalidate("Hero_1")
+        interleave(pausing, cache, lambda: cache.get_character("Hero_1"),
+                   lambda: cache.patch("Hero_1", {('hero_name',): "v5"}))
+        assert cache.get_character("Hero_1").hero_name == "v5"
+
+        # Without interference the fresh copy is cached
+        cache.save("Hero_1", make_character("v6"))
+        hits = cache.stats()['hits']
+        assert cache.get_character("Hero_1").hero_name == "v6"
+        assert cache.stats()['hits'] == hits + 1
+        print("✓ Direct writes during reads successful")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_character_cache()
+    test_stale_copies()
+    test_direct_write_during_read()
+    print("\n✅ All tests passed!")
@@ -0,0 +1,77 @@
+"""
+Test file for the Character model
+"""
+import shutil
+import tempfile
+
+from repository import Character, CharacterCache, CharacterRepository
+from repository.character_model import DISCOVERY_KEYS, HIDDEN_PATH_KEYS, JOURNAL_LINES
+
+
+def test_character_model():
+    """Round-trips, bitsets, change detection and repository support"""
+    empty = Character.empty().to_dict()
+    assert set(empty['discoveries']) == set(DISCOVERY_KEYS)
+    assert sum(len(sides) for sides in empty['hidden_paths'].values()) == len(HIDDEN_PATH_KEYS)
+    assert empty['journal_entries'] == [''] * JOURNAL_LINES
+
+    # Unknown fields, paths and discoveries survive a round trip
+    document = Character.empty().to_dict()
+    document['hidden_paths']['Oakwood']['1-6_s1'] = True
+    document['hidden_paths']['New Tile'] = {'1-2_s1': True}
+    document['discoveries']['hoard'] = True
+    document['discoveries']['dragon_egg'] = True
+    document['journal_entries'] = ["Day 1"]
+    document['notes'] = {'gold': 12}
+    document['version'] = 3
+    character = Character.from_dict(document)
+    assert character.has_path('Oakwood', '1-6_s1') and not character.has_path('Oakwood', '1-3_s2')
+    assert character.has_path('New Tile', '1-2_s1') and character.has_discovery('dragon_egg')
+    assert character.has_discovery('hoard') and character.journal[0] == "Day 1"
+    assert len(character.journal) == JOURNAL_LINES
+    round_trip = character.to_dict()
+    document['journal_entries'] += [''] * (JOURNAL_LINES - 1)
+    assert round_trip == document
+    print("✓ Round trip successful")
+
+    # Change detection ignores version and last_modified but nothing a player edits
+    copy = character.copy()
+    copy.version += 1
+    copy.last_modified = "2024-01-01 00:00:00"
+    assert copy.same_content(character) and copy.content_hash() == character.content_hash()
+    assert copy != character
+    edited = character.replace(paths=character.paths | Character.path_mask('Quiet Bog', '5-6_s2'))
+    assert not edited.same_content(character) and edited.content_hash() != character.content_hash()
+    edited = character.replace(journal=character.journal[:1] + ("Day 2",) + character.journal[2:])
+    assert not edited.same_content(character)
+    copy.extra['notes']['gold'] = 0
+    assert character.extra['notes']['gold'] == 12, "copy() shared extra"
+    print("✓ Change detection successful")
+
+    # The repository and cache accept and return Characters
+    temp_dir = tempfile.mkdtemp(prefix="character_model_")
+    try:
+        repo = CharacterRepository(storage_path=temp_dir)
+        aria = Character.empty().replace(hero_name="Aria")
+        assert repo.save("Aria_1", aria, expected_version=0) and aria.version == 1
+        assert repo.get("Aria_1")['hero_name'] == "Aria"
+        loaded = repo.get_character("Aria_1")
+        assert loaded.same_content(aria) and loaded.version == 1
+        assert repo.get_character("Missing") is None
+
+        cache = CharacterCache(repo)
+        mine = cache.get_character("Aria_1")
+        mine.hero_name = "Changed locally"
+        assert cache.get_character("Aria_1").hero_name == "Aria"
+        mine.hero_name = "Aria Stormborn"
+        assert cache.save("Aria_1", mine, expected_version=1)
+        assert cache.hero_name("Aria_1") == "Aria Stormborn"
+        assert repo.get("Aria_1")['version'] == 2
+        print("✓ Repository support successful")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_character_model()
+    print("\n✅ All tests passed!")
@@ -0,0 +1,94 @@
+"""
+Test file for the store maintenance CLI
+"""
+import shutil
+import tempfile
+from pathlib import Path
+
+from repository import Character, CharacterRepository
+from repository.cli import main
+from repository.serialization import MAGIC
+
+
+def make_store(path, count):
+    repo = CharacterRepository(storage_path=path, history=False, progress=False)
+    repo.save_many((f"Hero_{i}", Character.empty().replace(
+        hero_name=f"Hero {i}", lineage_and_class="Elf Ranger" if i % 2 else "Dwarf Warrior",
+        journal=(f"Day {i}: met the lost battalion",) + ("",) * 29, paths=i)) for i in range(count))
+    repo.close()
+
+
+def test_cli():
+    """Every command runs over a real store, in-process and on a process pool"""
+    temp_dir = tempfile.mkdtemp(prefix="cli_")
+    try:
+        store = Path(temp_dir) / "store"
+        make_store(store, 40)
+        common = ["--storage", str(store), "--quiet"]
+        for workers in ("1", "3"):
+            assert main(common + ["--workers", workers, "validate"]) == 0
+            assert main(common + ["--workers", workers, "check"]) == 0
+        print("✓ Validate and check on a clean store successful")
+
+        # Format migration rewrites every sheet under its lock; a second run has nothing to do
+        assert main(common + ["--workers", "3", "migrate", "--codec", "zlib-json"]) == 0
+        assert (store / "Hero_7.json").read_bytes().startswith(MAGIC)
+        repo = CharacterRepository(storage_path=str(store), history=False, progress=False)
+        assert repo.get_character("Hero_7").hero_name == "Hero 7"
+        repo.close()
+        assert main(common + ["migrate", "--codec", "json"]) == 0
+        assert (store / "Hero_7.json").read_bytes().startswith(b"{")
+        print("✓ Migrate successful")
+
+        # Sheets changed behind the repository's back are found, and reindex repairs the metadata
+        (store / "Broken_1.json").write_text("{not json")
+        (store / "Odd_1.json").write_text('{"hero_name": 3, "journal_entries": "Day 1"}')
+        (store / "Hero_3.json").unlink()
+        assert main(common + ["validate"]) == 1
+        assert main(common + ["--workers", "3", "check"]) == 1
+        assert main(common + ["--workers", "3", "reindex"]) == 1  # Broken_1 is still unreadable
+        (store / "Broken_1.json").unlink()
+        (store / "Odd_1.json").unlink()
+        assert main(common + ["reindex"]) == 0
+        assert main(common + ["check"]) == 0
+        repo = CharacterRepository(storage_path=str(store), history=False, progress=False)
+        assert repo.get_statistics()['characters'] == 39
+        assert "Hero_3" not in {result['character_id'] for result in repo.search("battalion", limit=None)}
+        repo.close()
+        print("✓ Check and reindex successful")
+
+        # Export and import round-trip the store into a new one
+        export_path = Path(temp_dir) / "backup.ndjson"
+        assert main(common + ["--workers", "3", "export", str(export_path)]) == 0
+        assert len(export_path.read_text().splitlines()) == 39
+        copy = Path(temp_dir) / "copy"
+        copy.mkdir()
+        copy_args = ["--storage", str(copy), "--quiet"]
+        assert main(copy_args + ["import", str(export_path)]) == 0
+        assert main(copy_args + ["import", "--skip-existing", str(export_path)]) == 0
+        repo = CharacterRepository(storage_path=str(copy), history=False, progress=False)
+        assert sorted(repo.list_character_ids()) == sorted(f"Hero_{i}" for i in range(40) if i != 3)
+        assert repo.get_character("Hero_5").paths == 5 and repo.get("Hero_5")['version'] == 1
+        assert repo.get_statistics()['lineage_and_class'] == {"Elf Ranger": 19, "Dwarf Warrior": 20}
+        assert repo.search("battalion", limit=None)
+        repo.close()
+        assert main(copy_args + ["check"]) == 0
+        compressed_path = Path(temp_dir) / "backup.ndjson.gz"
+        assert main(common + ["--workers", "3", "export", str(compressed_path)]) == 0
+        assert compressed_path.stat().st_size < export_path.stat().st_size / 4
+        assert main(copy_args + ["import", "--skip-existing", str(compressed_path)]) == 0
+
+        with open(export_path, 'a', encoding='utf-8') as f:
+            f.write('{"id": "../escape", "document": {}}\nnot json\n')
+        assert main(copy_args + ["import", "--skip-existing", str(export_path)]) == 1
+        assert not (Path(temp_dir) / "escape.json").exists()
+        print("✓ Export and import successful")
+
+        assert main(["--storage", str(Path(temp_dir) / "missing"), "check"]) == 2
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_cli()
+    print("\n✅ All tests passed!")
@@ -0,0 +1,97 @@
+"""
+Test file for the parallel sheet integrity checker (fsck)
+"""
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from repository import Character, CharacterRepository
+from repository.cli import main
+from repository.fsck import case_collisions, check_sheet
+from repository.ids import new_character_id
+
+
+def test_check_sheet():
+    """Each check reports its own kind of problem"""
+    sound = {**Character.empty().to_dict(), 'version': 1}
+    ulid = new_character_id()
+    assert check_sheet(ulid, json.dumps(sound).encode()) == []
+
+    def checks(character_id, document):
+        data = document if isinstance(document, bytes) else json.dumps(document).encode()
+        return {(issue['check'], issue['severity']) for issue in check_sheet(character_id, data)}
+
+    assert checks(ulid, b"{\"hero_name\": ") == {('decode', 'error')}
+    assert checks(ulid, [1, 2]) == {('schema', 'error')}
+    assert checks(ulid, {**sound, 'version': "2"}) == {('schema', 'error')}
+    assert checks(ulid, {**sound, 'hidden_paths': {'Oakwood': {'9-9_s1': True}}}) == {('catalog', 'warning')}
+    assert checks(ulid, {**sound, 'hidden_paths': {'Atlantis': {}}}) == {('catalog', 'warning')}
+    assert checks(ulid, {**sound, 'discoveries': {'dragon_egg': True}}) == {('catalog', 'warning')}
+    assert checks(ulid, {**sound, 'journal_entries': [""] * 30 + ["Day 31"]}) == {('journal', 'warning')}
+    assert checks(ulid, {**sound, 'journal_entries': [""] * 40}) == set()
+    assert checks("Aria_20251102_100000", sound) == set()
+    assert checks("Aria", sound) == {('id', 'warning')}
+    assert checks("Aria_21000101_000000", sound) == {('id', 'warning')}
+    assert checks(" Aria", sound) == {('id', 'error')}
+    assert case_collisions(["Aria_1.json", "aria_1.json", "Bran_1.json"]) == [("Aria_1.json", "aria_1.json")]
+    print("✓ Sheet checks successful")
+
+
+def test_fsck():
+    """A parallel run reports, quarantines, remembers verdicts and tells replicas"""
+    temp_dir = tempfile.mkdtemp(prefix="fsck_")
+    try:
+        store = Path(temp_dir) / "store"
+        repo = CharacterRepository(storage_path=str(store), history=False, progress=False, shared_manifest=True)
+        ids = [new_character_id() for _ in range(30)]
+        repo.save_many((character_id, Character.empty().replace(hero_name=f"Hero {i}"))
+                       for i, character_id in enumerate(ids))
+        broken, odd, extra = ids[0], ids[1], ids[2]
+        (store / f"{broken}.json").write_bytes(b'{"hero_name": "Tru')
+        (store / f"{odd}.json").write_text(json.dumps({'hero_name': ["not", "text"]}))
+        repo.patch(extra, {('discoveries', 'dragon_egg'): True})
+
+        common = ["--storage", str(store), "--quiet", "--workers", "3"]
+        report_path = Path(temp_dir) / "report.json"
+        assert main(common + ["fsck", "--report", str(report_path)]) == 1
+        report = json.loads(report_path.read_text())
+        assert report['sheets'] == 30 and report['checked'] == 30
+        assert report['errors'] == 2 and report['warnings'] == 1 and report['quarantined'] == []
+        by_id = {problem['id']: problem for problem in report['problems']}
+        assert by_id[broken]['issues'][0]['check'] == 'decode'
+        assert by_id[odd]['issues'][0] == {'check': 'schema', 'severity': 'error', 'message': "hero_name is not a string"}
+        assert by_id[extra]['issues'][0]['check'] == 'catalog'
+        assert json.loads((store / ".store" / "fsck" / "last-report.json").read_text())['problems'] == report['problems']
+        print("✓ Report successful")
+
+        # Unchanged sheets are not read again; sheets with errors and changed sheets are
+        repo.patch(ids[5], {('hero_name',): "Changed"})
+        assert main(common + ["fsck", "--report", str(report_path)]) == 1
+        assert json.loads(report_path.read_text())['checked'] == 3
+        assert main(common + ["fsck", "--full", "--report", str(report_path)]) == 1
+        assert json.loads(report_path.read_text())['checked'] == 30
+        print("✓ Incremental runs successful")
+
+        # Quarantine moves the bad sheets aside and announces their removal to replicas
+        version = repo.get_version()
+        assert main(common + ["fsck", "--quarantine", "--report", str(report_path)]) == 1
+        report = json.loads(report_path.read_text())
+        assert sorted(report['quarantined']) == sorted([broken, odd]) and report['reindex_needed']
+        quarantine_dir = Path(report['quarantine_dir'])
+        assert sorted(os.listdir(quarantine_dir)) == sorted([f"{broken}.json", f"{odd}.json"])
+        assert not (store / f"{broken}.json").exists()
+        assert sorted(repo.changes_since(version)['removed']) == sorted([broken, odd])
+        assert main(common + ["fsck"]) == 0
+        assert main(common + ["fsck", "--strict"]) == 1  # the catalog warning remains
+        repo.close()
+        print("✓ Quarantine successful")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_check_sheet()
+    test_fsck()
+    print("\n✅ All tests passed!")
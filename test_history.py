@@ -0,0 +1,113 @@
+"""
+Test file for character version history
+"""
+import shutil
+import tempfile
+
+from repository import Character, CharacterRepository, VersionConflictError
+from repository.character_model import HIDDEN_PATH_KEYS
+
+
+def test_history():
+    """Every write is recorded, unchanged sections are shared, and versions can be restored"""
+    temp_dir = tempfile.mkdtemp(prefix="history_")
+    try:
+        repo = CharacterRepository(storage_path=temp_dir)
+        aria = Character.empty().replace(hero_name="Aria", journal=("Day 1",) + ("",) * 29).to_dict()
+        repo.save("Aria_1", aria)
+        chunks_after_first, _ = repo.history.size()
+        assert chunks_after_first == 4
+
+        # One checkbox per save stores one new chunk, not a copy of the sheet
+        for location, key in HIDDEN_PATH_KEYS[:20]:
+            assert repo.patch("Aria_1", {('hidden_paths', location, key): True,
+                                         ('last_modified',): f"save {key}"})
+        assert repo.history.size()[0] == chunks_after_first + 20
+        versions = repo.list_versions("Aria_1")
+        assert [entry['version'] for entry in versions] == list(range(1, 22))
+        assert versions[0]['changed'] == ['info', 'journal', 'hidden_paths', 'discoveries']
+        assert all(entry['changed'] == ['hidden_paths'] for entry in versions[1:])
+
+        # A second character with the same sections shares their chunks
+        repo.save("Twin_1", dict(aria))
+        assert repo.history.size()[0] == chunks_after_first + 20
+        print("✓ Deduplicated recording successful")
+
+        location, key = HIDDEN_PATH_KEYS[0]
+        changes = repo.diff_versions("Aria_1", 1, 2)
+        assert changes[('hidden_paths', location, key)] == (False, True)
+        assert set(changes) == {('hidden_paths', location, key), ('last_modified',)}
+        repo.patch("Aria_1", {('journal_entries', 0): "A bad autosave", ('hero_name',): ""})
+        changes = repo.diff_versions("Aria_1", 21, 22)
+        assert changes[('journal_entries', 0)] == ("Day 1", "A bad autosave")
+        assert changes[('hero_name',)] == ("Aria", "")
+        assert repo.diff_versions("Aria_1", 1, 99) is None
+        print("✓ Diff successful")
+
+        # Restoring writes the old content as a new version
+        try:
+            repo.restore("Aria_1", 21, expected_version=5)
+            assert False, "Stale restore was accepted"
+        except VersionConflictError:
+            pass
+        assert repo.restore("Aria_1", 21, expected_version=22) == 23
+        restored = repo.get("Aria_1")
+        assert restored['hero_name'] == "Aria" and restored['journal_entries'][0] == "Day 1"
+        assert restored['hidden_paths'] == repo.load_version("Aria_1", 21)['hidden_paths']
+        assert repo.load_version("Aria_1", 22)['journal_entries'][0] == "A bad autosave"
+
+        # History follows renames and outlives deletes
+        repo.rename("Aria_1", "Aria_2")
+        assert repo.list_versions("Aria_1") == [] and len(repo.list_versions("Aria_2")) == 24
+        repo.delete("Aria_2")
+        assert repo.restore("Aria_2", 1) and repo.get("Aria_2")['hero_name'] == "Aria"
+        print("✓ Restore successful")
+
+        # Renaming onto a deleted character's ID would replace its history
+        repo.save("Bran_1", Character.empty().replace(hero_name="Bran").to_dict())
+        repo.delete("Aria_2")
+        assert not repo.rename("Bran_1", "Aria_2")
+        assert repo.exists("Bran_1") and not repo.exists("Aria_2")
+        assert repo.load_version("Aria_2", 1)['hero_name'] == "Aria"
+        assert len(repo.list_versions("Aria_2")) == 25 and len(repo.list_versions("Bran_1")) == 1
+        try:
+            repo.history.rename("Bran_1", "Aria_2")
+            assert False, "History log was overwritten"
+        except FileExistsError:
+            pass
+        print("✓ Deleted history kept successfully")
+
+        assert CharacterRepository(storage_path=temp_dir, history=False).list_versions("Aria_2") == []
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def test_failed_bookkeeping():
+    """A write whose history or search update fails is still reported and announced"""
+    temp_dir = tempfile.mkdtemp(prefix="history_")
+    try:
+        repo = CharacterRepository(storage_path=temp_dir)
+        repo.save("Aria_1", Character.empty().replace(hero_name="Aria"))
+
+        def broken(*args):
+            raise OSError("disk full")
+        repo.history.record = broken
+        repo.search_index.update = broken
+        version = repo.get_version()
+        assert repo.save("Aria_1", Character.empty().replace(hero_name="Saved"))
+        assert repo.patch("Aria_1", {('hero_name',): "Patched"})['version'] == 3
+        assert repo.get("Aria_1")['hero_name'] == "Patched"
+        assert repo.get_statistics()['characters'] == 1
+        assert repo.changes_since(version)['modified'] == ["Aria_1"]
+        assert repo.delete("Aria_1") and repo.get_statistics()['characters'] == 0
+        assert repo.changes_since(version)['removed'] == ["Aria_1"]
+        repo.close()
+        print("✓ Failed bookkeeping logged successfully")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_history()
+    test_failed_bookkeeping()
+    print("\n✅ All tests passed!")
@@ -0,0 +1,72 @@
+"""
+Test file for character IDs and time-range scans
+"""
+import shutil
+import tempfile
+import time
+from datetime import datetime
+
+from repository import CharacterRepository
+from repository.ids import id_datetime, id_timestamp_ms, is_ulid, new_character_id, sort_key
+
+
+def test_ids():
+    """IDs are unique, monotonic, carry their creation time and map legacy IDs"""
+    ids = [new_character_id() for _ in range(10000)]
+    assert len(set(ids)) == len(ids), "Duplicate IDs"
+    assert ids == sorted(ids), "IDs are not monotonic"
+    assert all(is_ulid(character_id) and len(character_id) == 26 for character_id in ids)
+
+    # Many IDs in one millisecond stay ordered
+    same_ms = [new_character_id(now_ms=1_700_000_000_000) for _ in range(3)]
+    assert same_ms == sorted(same_ms) and len(set(same_ms)) == 3
+    assert all(id_timestamp_ms(character_id) == 1_700_000_000_000 for character_id in same_ms)
+    print("✓ Uniqueness and ordering successful")
+
+    later = new_character_id(now_ms=1_800_000_000_123)
+    assert id_timestamp_ms(later) == 1_800_000_000_123
+
+    # An explicit time does not move the IDs generated from the clock afterwards
+    new_character_id(now_ms=4_000_000_000_000)
+    assert abs(id_timestamp_ms(new_character_id()) - time.time() * 1000) < 60_000
+    legacy = "Arag_20251102_143022"
+    assert not is_ulid(legacy)
+    assert id_datetime(legacy) == datetime(2025, 11, 2, 14, 30, 22)
+    assert id_timestamp_ms("no_time_here") is None and id_datetime("Aria") is None
+    assert sort_key("Aria") < sort_key(legacy) < sort_key(later)
+    print("✓ Timestamps and legacy mapping successful")
+
+
+def test_time_range_scan():
+    """The repository range-scans mixed legacy and ULID stores by creation time"""
+    temp_dir = tempfile.mkdtemp(prefix="ids_")
+    try:
+        repo = CharacterRepository(storage_path=temp_dir)
+        jan = int(datetime(2025, 1, 15).timestamp() * 1000)
+        mar = int(datetime(2025, 3, 15).timestamp() * 1000)
+        repo.save("Arag_20241220_120000", {'hero_name': 'Aragorn'})
+        repo.save("Odd", {'hero_name': 'No date'})
+        january = new_character_id(now_ms=jan)
+        repo.save(january, {'hero_name': 'January'})
+
+        assert repo.list_character_ids_between() == ["Odd", "Arag_20241220_120000", january]
+        assert repo.list_character_ids_between(start=datetime(2025, 1, 1)) == [january]
+        assert repo.list_character_ids_between(end=datetime(2025, 1, 1)) == ["Odd", "Arag_20241220_120000"]
+
+        # The index follows later saves, deletes and renames
+        march = new_character_id(now_ms=mar)
+        repo.save(march, {'hero_name': 'March'})
+        repo.delete("Arag_20241220_120000")
+        renamed = new_character_id(now_ms=mar + 1)
+        repo.rename(january, renamed)
+        assert repo.list_character_ids_between(datetime(2025, 2, 1), datetime(2025, 4, 1)) == [march, renamed]
+        assert repo.list_character_ids_between(datetime(2025, 1, 1), datetime(2025, 2, 1)) == []
+        print("✓ Time-range scan successful")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_ids()
+    test_time_range_scan()
+    print("\n✅ All tests passed!")
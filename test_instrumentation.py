@@ -0,0 +1,54 @@
+"""
+Test file for repository instrumentation
+"""
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+from game_reference_repository import GameReferenceRepository
+from repository import CharacterRepository, RepositoryMetrics, instrument
+
+
+def test_repository_instrumentation():
+    """Calls, bytes and latency histograms are recorded and exported"""
+    temp_dir = Path(tempfile.mkdtemp(prefix="instrumentation_"))
+    try:
+        metrics = RepositoryMetrics()
+        repo = instrument(CharacterRepository(storage_path=str(temp_dir / "sheets")), metrics)
+        reference = instrument(GameReferenceRepository(), metrics)
+
+        assert repo.save("Test_1", {'hero_name': 'TestHero', 'journal_entries': [''] * 30})
+        assert repo.get("Test_1")['hero_name'] == 'TestHero'
+        assert repo.get("Missing") is None
+        repo.get_all()
+        reference.get_all_treasures()
+
+        stats = {(e['repository'], e['method']): e for e in metrics.snapshot()}
+        file_size = (temp_dir / "sheets" / "Test_1.json").stat().st_size
+        assert stats[('CharacterRepository', 'save')]['bytes_written'] == file_size
+        assert stats[('CharacterRepository', 'get')]['calls'] == 2
+        assert stats[('CharacterRepository', 'get')]['bytes_read'] == file_size
+        assert stats[('CharacterRepository', 'get_all')]['bytes_read'] == file_size
+        assert stats[('GameReferenceRepository', 'get_all_treasures')]['bytes_read'] > 0
+        print("✓ Metrics recorded")
+
+        prom_path = temp_dir / "metrics.prom"
+        assert metrics.export(str(prom_path))
+        text = prom_path.read_text()
+        assert 'dragonsdown_repository_calls_total{repository="CharacterRepository",method="get"} 2' in text
+        assert 'dragonsdown_repository_latency_seconds_count{repository="CharacterRepository",method="save"} 1' in text
+
+        jsonl_path = temp_dir / "metrics.jsonl"
+        assert metrics.export(str(jsonl_path))
+        assert metrics.export(str(jsonl_path))
+        lines = [json.loads(line) for line in jsonl_path.read_text().splitlines()]
+        assert len(lines) == 2 * len(stats)
+        print("✓ Metrics exported")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_repository_instrumentation()
+    print("\n✅ All tests passed!")
@@ -0,0 +1,86 @@
+"""
+Test file for the Striped Lock Manager
+"""
+import multiprocessing
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from repository import CharacterRepository
+from repository.cli import _lock_manager
+from repository.locking import StripedLockManager
+
+
+def hold_lock(lock_dir, key, held, release):
+    manager = StripedLockManager(stripes=8, lock_dir=Path(lock_dir))
+    with manager.lock(key):
+        held.set()
+        release.wait(10)
+
+
+def test_striped_locks():
+    """Stripes are stable, exclusive across threads and processes, and counted"""
+    temp_dir = Path(tempfile.mkdtemp(prefix="locking_"))
+    try:
+        manager = StripedLockManager(stripes=8, lock_dir=temp_dir)
+        store = temp_dir / "store"
+        CharacterRepository(storage_path=str(store), lock_stripes=8).close()
+        assert manager.stripe_for("Aria_1") == StripedLockManager(stripes=8).stripe_for("Aria_1")
+        stripe = manager.stripe_for("Aria_1")
+
+        def take_stripe(done):
+            manager._acquire(stripe)
+            done()
+            manager._release(stripe)
+
+        # A second thread on the same key waits, and the wait is recorded
+        order = []
+        with manager.lock("Aria_1"):
+            waiter = threading.Thread(target=take_stripe, args=(lambda: order.append("waiter"),))
+            waiter.start()
+            time.sleep(0.05)
+            order.append("holder")
+        waiter.join()
+        assert order == ["holder", "waiter"]
+        assert manager.stats()['contended'] == 1
+        print("✓ Thread exclusion successful")
+
+        # Multi-key locks work even when both keys share a stripe
+        with manager.lock("Aria_1", "Aria_1", "Bran_2"):
+            pass
+
+        # Another process holding the stripe blocks this one
+        context = multiprocessing.get_context("spawn")
+        held, release = context.Event(), context.Event()
+        other = context.Process(target=hold_lock, args=(str(temp_dir), "Aria_1", held, release))
+        other.start()
+        assert held.wait(20), "Child process never took the lock"
+        acquired = threading.Event()
+        thread = threading.Thread(target=take_stripe, args=(acquired.set,))
+        thread.start()
+        assert not acquired.wait(0.2), "Lock held by another process was not respected"
+        release.set()
+        assert acquired.wait(10)
+        thread.join()
+        other.join(10)
+        print("✓ Process exclusion successful")
+        manager.close()
+
+        # The stripe count is recorded with the lock files, so every opener hashes alike
+        assert StripedLockManager(lock_dir=temp_dir).stripes == 8
+        assert _lock_manager(str(store)).stripes == 8
+        try:
+            CharacterRepository(storage_path=str(store), lock_stripes=16)
+            assert False, "A different stripe count was accepted"
+        except ValueError:
+            pass
+        print("✓ Stripe count persistence successful")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_striped_locks()
+    print("\n✅ All tests passed!")
@@ -0,0 +1,91 @@
+"""
+Test file for schema migrations of stored character documents
+"""
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+from repository import Character, CharacterRepository
+from repository.character_model import DISCOVERY_KEYS, HIDDEN_PATH_KEYS
+from repository.cli import main
+from repository.migrations import SCHEMA_VERSION, migrate_document, needs_migration
+
+
+def old_sheet(name):
+    """A sheet as the first version of the app wrote it: no last_modified, version or missing catalog keys"""
+    return {'hero_name': name, 'date': "2025-11-02 10:00:00",
+            'hidden_paths': {'Oakwood': {'1-6_s1': True}}, 'discoveries': {'shrine': True},
+            'journal_entries': ["Day 1"] + [""] * 29}
+
+
+def test_migrate_document():
+    """Migrations fill in what older sheets lack, once, without touching player content"""
+    document = old_sheet("Aria")
+    migrated = migrate_document(document, "Aria_20251102_100000", copy_on_write=True)
+    assert 'schema_version' not in document and 'last_modified' not in document
+    assert migrated['schema_version'] == SCHEMA_VERSION and not needs_migration(migrated)
+    assert migrated['last_modified'] == "2025-11-02 10:00:00"
+    assert all(key in migrated['hidden_paths'][location] for location, key in HIDDEN_PATH_KEYS)
+    assert set(migrated['discoveries']) == set(DISCOVERY_KEYS)
+    assert migrated['hidden_paths']['Oakwood']['1-6_s1'] is True and migrated['discoveries']['shrine'] is True
+    assert Character.from_dict(migrated).same_content(Character.from_dict(document))
+    assert migrate_document(migrated, "Aria_20251102_100000") is migrated
+
+    # Without a date the creation time in a legacy ID is used; malformed fields are left to validation
+    undated = migrate_document({'hidden_paths': []}, "Bran_20251103_090807")
+    assert undated['last_modified'] == "2025-11-03 09:08:07" and undated['hidden_paths'] == []
+    print("✓ Document migrations successful")
+
+
+def test_repository_migrations():
+    """Reads upgrade lazily, writes store the current schema, and the bulk pass rewrites only old sheets"""
+    temp_dir = tempfile.mkdtemp(prefix="migrations_")
+    try:
+        store = Path(temp_dir)
+        for i in range(6):
+            (store / f"Old_{i}.json").write_text(json.dumps(old_sheet(f"Old {i}"), indent=2))
+        repo = CharacterRepository(storage_path=temp_dir, history=False, progress=False)
+        repo.save("New_1", Character.empty().replace(hero_name="New"))
+
+        # get() returns the current schema without rewriting the file
+        before = (store / "Old_0.json").read_bytes()
+        loaded = repo.get("Old_0")
+        assert loaded['schema_version'] == SCHEMA_VERSION and loaded['version'] == 1
+        assert loaded['last_modified'] == "2025-11-02 10:00:00"
+        assert (store / "Old_0.json").read_bytes() == before
+        assert json.loads((store / "New_1.json").read_text())['schema_version'] == SCHEMA_VERSION
+
+        # A dict saved in the old shape is stored upgraded, and the caller's dict is left alone
+        partial = old_sheet("Cora")
+        repo.save("Cora_1", partial)
+        assert 'last_modified' not in partial and len(partial['hidden_paths']) == 1
+        assert not needs_migration(json.loads((store / "Cora_1.json").read_text()))
+
+        # A patch of an old sheet stores it upgraded
+        repo.patch("Old_1", {('hero_name',): "Renamed"})
+        assert not needs_migration(json.loads((store / "Old_1.json").read_text()))
+        print("✓ Lazy and write-time migration successful")
+
+        # The bulk pass rewrites the five sheets still behind, keeping their version and format
+        common = ["--storage", temp_dir, "--quiet"]
+        assert main(common + ["--workers", "2", "upgrade"]) == 0
+        for i in range(6):
+            stored = json.loads((store / f"Old_{i}.json").read_text())
+            assert not needs_migration(stored)
+            assert stored.get('version', 1) == (2 if i == 1 else 1)
+        assert (store / "Old_2.json").read_bytes().startswith(b"{")
+        upgraded = (store / "Old_2.json").stat().st_mtime_ns
+        assert main(common + ["upgrade"]) == 0
+        assert (store / "Old_2.json").stat().st_mtime_ns == upgraded
+        assert repo.get_character("Old_2").has_path('Oakwood', '1-6_s1')
+        repo.close()
+        print("✓ Bulk upgrade successful")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_migrate_document()
+    test_repository_migrations()
+    print("\n✅ All tests passed!")
@@ -0,0 +1,82 @@
+"""
+Test file for the per-rerun cProfile hook
+"""
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from profiling import PROFILE_DIR_ENV
+from test_render_performance import isolated_store, new_app
+
+
+@contextmanager
+def profile_dir_env(profile_dir):
+    """Set DRAGONSDOWN_PROFILE_DIR (or unset it for None) for the duration of a test"""
+    previous = os.environ.pop(PROFILE_DIR_ENV, None)
+    if profile_dir is not None:
+        os.environ[PROFILE_DIR_ENV] = str(profile_dir)
+    try:
+        yield
+    finally:
+        os.environ.pop(PROFILE_DIR_ENV, None)
+        if previous is not None:
+            os.environ[PROFILE_DIR_ENV] = previous
+
+
+def profiled_views(profile_dir):
+    """View tags of the profiles written so far, oldest first"""
+    # <view>_<YYYYmmdd>_<HHMMSS>_<microseconds>.prof
+    stems = sorted((path.stem.rsplit('_', 3) for path in profile_dir.glob("*.prof")), key=lambda parts: parts[1:])
+    return [parts[0] for parts in stems]
+
+
+def expander_labels(at):
+    return [expander.label for expander in at.expander if expander.label.startswith("🔬 Profile:")]
+
+
+def test_profiling():
+    """Every rerun writes one profile tagged with the view it ended on, and only when switched on"""
+    temp_dir = Path(tempfile.mkdtemp(prefix="profiling_"))
+    profile_dir = temp_dir / "profiles"
+    try:
+        with isolated_store(), profile_dir_env(profile_dir):
+            at = new_app()
+            at.run()
+            assert not at.exception
+            assert profiled_views(profile_dir) == ['home']
+            assert expander_labels(at)[0].startswith("🔬 Profile: home (")
+
+            # The click's rerun ends in st.rerun(); both runs are filed under the view they opened
+            next(b for b in at.sidebar.button if b.label == "➕ Create New Character").click()
+            at.run()
+            assert not at.exception
+            assert profiled_views(profile_dir) == ['home', 'create_character', 'create_character']
+            assert expander_labels(at)[0].startswith("🔬 Profile: create_character (")
+            print("✓ Per-rerun profiles successful")
+
+            at.query_params["admin"] = "metrics"
+            at.run()
+            assert profiled_views(profile_dir)[-1] == 'admin_metrics'
+            at.query_params["admin"] = "../metrics"
+            at.run()
+            assert profiled_views(profile_dir)[-1] == 'admin____metrics'
+            assert all(path.parent == profile_dir for path in temp_dir.rglob("*.prof"))
+            print("✓ Admin page profiles successful")
+
+        written = len(profiled_views(profile_dir))
+        with isolated_store(), profile_dir_env(None):
+            at = new_app()
+            at.run()
+            assert not at.exception
+            assert expander_labels(at) == []
+        assert len(profiled_views(profile_dir)) == written
+        print("✓ Profiling off by default successful")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_profiling()
+    print("\n✅ All tests passed!")
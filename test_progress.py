@@ -0,0 +1,78 @@
+"""
+Test file for the per-character progress time series
+"""
+import json
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from repository import Character, CharacterRepository
+from repository.character_model import HIDDEN_PATH_KEYS
+
+
+def test_progress():
+    """Writes are logged as compact deltas and decoded into progress over time"""
+    temp_dir = tempfile.mkdtemp(prefix="progress_")
+    try:
+        repo = CharacterRepository(storage_path=temp_dir, history=False)
+        repo.save("Aria_1", Character.empty().replace(hero_name="Aria").to_dict())
+        for location, key in HIDDEN_PATH_KEYS[:5]:
+            repo.patch("Aria_1", {('hidden_paths', location, key): True})
+        repo.patch("Aria_1", {('discoveries', 'lost_battalion'): True, ('journal_entries', 0): "Met them"})
+        repo.patch("Aria_1", {('hidden_paths',) + HIDDEN_PATH_KEYS[0]: False})
+        repo.patch("Aria_1", {('hero_name',): "Aria Stormborn"})
+
+        lines = (Path(temp_dir) / ".store" / "progress" / "Aria_1.log").read_text().splitlines()
+        assert len(lines) == 9 and 'at' in json.loads(lines[0])
+        assert all('at' not in json.loads(line) for line in lines[1:])
+        assert json.loads(lines[-1]).keys() == {'dt'}, "A save without progress should only log time"
+        assert max(len(line) for line in lines[1:]) < 40
+
+        series = repo.get_progress("Aria_1", details=True)
+        assert [point['version'] for point in series] == list(range(1, 10))
+        assert [point['paths'] for point in series] == [0, 1, 2, 3, 4, 5, 5, 4, 4]
+        assert series[6]['discoveries'] == 1 and series[6]['journal_lines'] == 1
+        assert series[6]['found'] == ['lost_battalion']
+        assert series[1]['found'] == [HIDDEN_PATH_KEYS[0]] and series[7]['lost'] == [HIDDEN_PATH_KEYS[0]]
+        assert all(a['time'] <= b['time'] for a, b in zip(series, series[1:]))
+        print("✓ Delta-encoded recording successful")
+
+        # Another writer's append makes the next line a keyframe, so the log stays decodable
+        other = CharacterRepository(storage_path=temp_dir, history=False)
+        other.patch("Aria_1", {('hidden_paths',) + HIDDEN_PATH_KEYS[10]: True})
+        repo.patch("Aria_1", {('discoveries', 'shrine'): True})
+        lines = (Path(temp_dir) / ".store" / "progress" / "Aria_1.log").read_text().splitlines()
+        assert 'at' in json.loads(lines[-2]) and 'at' in json.loads(lines[-1])
+        series = repo.get_progress("Aria_1")
+        assert (series[-1]['paths'], series[-1]['discoveries'], series[-1]['version']) == (5, 2, 11)
+
+        # Time ranges, renames and several characters at once
+        assert repo.get_progress("Aria_1", start=datetime.now() + timedelta(hours=1)) == []
+        assert len(repo.get_progress("Aria_1", end=datetime.now() + timedelta(hours=1))) == 11
+        repo.rename("Aria_1", "Aria_2")
+        repo.save("Bran_1", Character.empty().replace(hero_name="Bran").to_dict())
+        progress = repo.get_progress_many(["Aria_2", "Bran_1", "Missing"])
+        assert len(progress["Aria_2"]) == 12 and progress["Aria_2"][-1]['paths'] == 5
+        assert len(progress["Bran_1"]) == 1 and progress["Missing"] == []
+        print("✓ Progress queries successful")
+
+        # A deleted character's series is kept, so nothing can be renamed onto its ID
+        repo.delete("Aria_2")
+        assert not repo.rename("Bran_1", "Aria_2")
+        assert len(repo.get_progress("Aria_2")) == 12 and len(repo.get_progress("Bran_1")) == 1
+        try:
+            repo.progress.rename("Bran_1", "Aria_2")
+            assert False, "Progress log was overwritten"
+        except FileExistsError:
+            pass
+        repo.patch("Bran_1", {('discoveries', 'shrine'): True})
+        assert [point['discoveries'] for point in repo.get_progress("Bran_1")] == [0, 1]
+        print("✓ Deleted progress kept successfully")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_progress()
+    print("\n✅ All tests passed!")
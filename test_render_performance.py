@@ -0,0 +1,193 @@
+"""
+Render performance regression tests for the Streamlit pages
+Drives each view of main.py headlessly with AppTest and fails when a rerun
+exceeds its wall time or element budget
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+
+APP_PATH = str(Path(__file__).parent / "main.py")
+
+# Per-view budgets: (max seconds per rerun, max elements emitted per rerun)
+RENDER_BUDGETS = {
+    'home': (1.0, 40),
+    'character_form': (2.0, 400),
+    'realm_builder': (1.0, 100),
+    'combat_tracker': (1.0, 100),
+    'game_reference': (2.0, 1200),
+}
+
+# Slow CI machines can scale the time budgets without editing this file
+BUDGET_SCALE = float(os.environ.get("DRAGONSDOWN_RENDER_BUDGET_SCALE", "1.0"))
+
+
+def count_elements(node) -> int:
+    """Count every element and block below an AppTest node"""
+    children = getattr(node, 'children', None) or {}
+    return 1 + sum(count_elements(child) for child in children.values())
+
+
+class RenderRecorder:
+    """Records wall time and element counts for each rerun of a view"""
+
+    def __init__(self, view: str):
+        self.view = view
+        self.samples = []
+
+    def run(self, at: AppTest, action: str = "rerun") -> AppTest:
+        """Run the app once and record the measurement"""
+        start = time.perf_counter()
+        at.run()
+        elapsed = time.perf_counter() - start
+        assert not at.exception, f"{self.view}/{action} raised: {at.exception}"
+        elements = count_elements(at.main) + count_elements(at.sidebar)
+        self.samples.append((action, elapsed, elements))
+        return at
+
+    def report(self) -> str:
+        lines = [f"{self.view}:"]
+        for action, elapsed, elements in self.samples:
+            lines.append(f"  {action:<24} {elapsed * 1000:8.1f} ms {elements:6d} elements")
+        return "\n".join(lines)
+
+    def assert_within_budget(self):
+        """Fail if any recorded rerun exceeded the view's budget"""
+        max_seconds, max_elements = RENDER_BUDGETS[self.view]
+        max_seconds *= BUDGET_SCALE
+        print(self.report())
+        for action, elapsed, elements in self.samples:
+            assert elapsed <= max_seconds, (
+                f"{self.view}/{action} took {elapsed:.3f}s (budget {max_seconds:.3f}s)"
+            )
+            assert elements <= max_elements, (
+                f"{self.view}/{action} emitted {elements} elements (budget {max_elements})"
+            )
+
+
+@contextmanager
+def isolated_store():
+    """Point the app at a temporary character store for the duration of a test"""
+    storage = tempfile.mkdtemp(prefix="render_perf_")
+    previous = os.environ.get("DRAGONSDOWN_STORAGE_PATH")
+    os.environ["DRAGONSDOWN_STORAGE_PATH"] = storage
+    # AppTest leaves main.py installed as __main__, which spawned processes would re-run
+    main_module = sys.modules.get("__main__")
+    try:
+        yield storage
+    finally:
+        if previous is None:
+            os.environ.pop("DRAGONSDOWN_STORAGE_PATH", None)
+        else:
+            os.environ["DRAGONSDOWN_STORAGE_PATH"] = previous
+        sys.modules["__main__"] = main_module
+        # Drop the repository cached for the temporary store
+        st.cache_resource.clear()
+        shutil.rmtree(storage, ignore_errors=True)
+
+
+def new_app() -> AppTest:
+    """Create an AppTest for main.py (inside isolated_store())"""
+    st.cache_resource.clear()
+    return AppTest.from_file(APP_PATH, default_timeout=30)
+
+
+def click_sidebar(at: AppTest, label: str):
+    next(b for b in at.sidebar.button if b.label == label).click()
+
+
+def widget_by_key_prefix(widgets, prefix: str):
+    return next(w for w in widgets if w.key and w.key.startswith(prefix))
+
+
+def test_character_form_render_performance():
+    """Create a hero, then type a journal line and toggle paths and discoveries"""
+    with isolated_store():
+        recorder = RenderRecorder('character_form')
+        at = new_app()
+        recorder.run(at, "first load")
+        click_sidebar(at, "➕ Create New Character")
+        recorder.run(at, "open form")
+        at.text_input(key="hero_name_new_character").input("Aria")
+        recorder.run(at, "type hero name")
+
+        widget_by_key_prefix(at.text_input, "journal_0_").input("Met the lost battalion")
+        recorder.run(at, "type journal line")
+        widget_by_key_prefix(at.checkbox, "hp_Ancient Hole_1-6_s1_").check()
+        recorder.run(at, "toggle hidden path")
+        widget_by_key_prefix(at.checkbox, "discovery_lost_battalion_").check()
+        recorder.run(at, "toggle discovery")
+        recorder.run(at, "idle rerun")
+        recorder.assert_within_budget()
+
+
+def test_home_render_performance():
+    with isolated_store():
+        recorder = RenderRecorder('home')
+        at = new_app()
+        recorder.run(at, "first load")
+        recorder.run(at, "idle rerun")
+        recorder.assert_within_budget()
+
+
+def test_realm_builder_render_performance():
+    with isolated_store():
+        recorder = RenderRecorder('realm_builder')
+        at = new_app()
+        at.run()
+        click_sidebar(at, "🏰 Create New Realm")
+        recorder.run(at, "open builder")
+        at.checkbox(key="realm_caves").check()
+        at.checkbox(key="realm_woods").check()
+        recorder.run(at, "select land packs")
+        next(b for b in at.button if b.label == "🎲 Generate Realm").click()
+        recorder.run(at, "generate realm")
+        next(b for b in at.button if b.label == "🔄 Regenerate Realm").click()
+        recorder.run(at, "regenerate realm")
+        recorder.assert_within_budget()
+
+
+def test_combat_tracker_render_performance():
+    """Step through a full hidden-ambush round and into the next round"""
+    with isolated_store():
+        recorder = RenderRecorder('combat_tracker')
+        at = new_app()
+        at.run()
+        click_sidebar(at, "⚔️ Combat Tracker")
+        recorder.run(at, "open tracker")
+        for key in ["start_combat", "hidden_yes", "ambush_yes", "ambush_damage",
+                    "sneak_fail", "next_round", "hidden_no", "normal_no_damage"]:
+            at.button(key=key).click()
+            recorder.run(at, key)
+        recorder.assert_within_budget()
+
+
+def test_game_reference_render_performance():
+    with isolated_store():
+        recorder = RenderRecorder('game_reference')
+        at = new_app()
+        at.run()
+        click_sidebar(at, "📚 Game Reference")
+        recorder.run(at, "open reference")
+        at.text_input(key="treasure_search").input("blade")
+        recorder.run(at, "search treasures")
+        at.text_input(key="treasure_search").input("")
+        recorder.run(at, "clear search")
+        recorder.assert_within_budget()
+
+
+if __name__ == "__main__":
+    test_home_render_performance()
+    test_character_form_render_performance()
+    test_realm_builder_render_performance()
+    test_combat_tracker_render_performance()
+    test_game_reference_render_performance()
+    print("\n✅ All render budgets met!")
@@ -85,5 +85,188 @@ def test_character_repository():
     print("✓ Test cleanup complete")
 
 
+def test_change_feed():
+    """Test the version counter and net deltas returned by changes_since"""
+    import shutil
+    repo = CharacterRepository(storage_path="test_change_feed_sheets", change_log_size=8)
+    try:
+        print("Testing change feed...")
+        start = repo.get_version()
+        repo.save("Kept_1", {'hero_name': 'Kept'})
+        repo.save("Temp_1", {'hero_name': 'Temp'})
+        middle = repo.get_version()
+        repo.save("Kept_1", {'hero_name': 'Kept again'})
+        repo.delete("Temp_1")
+        repo.rename("Kept_1", "Moved_1")
+        
+        changes = repo.changes_since(start)
+        assert changes['added'] == ['Moved_1'], changes
+        assert changes['removed'] == [], "Created and deleted IDs should cancel out"
+        assert changes['modified'] == [], changes
+        
+        changes = repo.changes_since(middle)
+        assert sorted(changes['removed']) == ['Kept_1', 'Temp_1'], changes
+        assert changes['added'] == ['Moved_1'], changes
+        assert repo.changes_since(changes['version']) == {
+            'version': changes['version'], 'added': [], 'removed': [], 'modified': []
+        }
+        
+        # Once the log has rolled over, callers are told to reload everything
+        for i in range(10):
+            repo.save("Moved_1", {'hero_name': f'Edit {i}'})
+        assert repo.changes_since(start) is None, "Stale version should force a reload"
+        print("✓ Change feed successful")
+    finally:
+        shutil.rmtree("test_change_feed_sheets", ignore_errors=True)
+
+
+def test_optimistic_concurrency():
+    """Test compare-and-swap saves with per-character versions"""
+    import shutil
+    import threading
+    from repository import VersionConflictError
+    repo = CharacterRepository(storage_path="test_version_sheets")
+    try:
+        print("Testing optimistic concurrency...")
+        first = {'hero_name': 'Aria'}
+        assert repo.save("Aria_1", first, expected_version=0), "Create failed"
+        assert first['version'] == 1, "Version not written back"
+        
+        # Create-only saves refuse to overwrite an existing character
+        try:
+            repo.save("Aria_1", {'hero_name': 'Imposter'}, expected_version=0)
+            assert False, "Create-only save overwrote an existing character"
+        except VersionConflictError as e:
+            assert e.actual_version == 1
+        
+        tab_a = repo.get("Aria_1")
+        tab_b = repo.get("Aria_1")
+        tab_a['hero_name'] = 'Aria from A'
+        assert repo.update("Aria_1", tab_a, expected_version=tab_a['version'])
+        tab_b['hero_name'] = 'Aria from B'
+        try:
+            repo.update("Aria_1", tab_b, expected_version=tab_b['version'])
+            assert False, "Stale save was not rejected"
+        except VersionConflictError as e:
+            assert (e.expected_version, e.actual_version) == (1, 2)
+        assert repo.get("Aria_1")['hero_name'] == 'Aria from A', "Stale save overwrote data"
+        
+        try:
+            repo.rename("Aria_1", "Aria_2", expected_version=1)
+            assert False, "Stale rename was not rejected"
+        except VersionConflictError:
+            pass
+        assert repo.rename("Aria_1", "Aria_2", expected_version=2)
+        assert repo.get("Aria_2")['version'] == 3
+        
+        # Concurrent CAS increments on one character never lose an update,
+        # while other characters are written in parallel
+        def increment(char_id, times):
+            done = 0
+            while done < times:
+                data = repo.get(char_id)
+                data['counter'] = data.get('counter', 0) + 1
+                try:
+                    repo.save(char_id, data, expected_version=data['version'])
+                    done += 1
+                except VersionConflictError:
+                    continue
+        
+        repo.save("Shared_1", {'hero_name': 'Shared'})
+        repo.save("Solo_1", {'hero_name': 'Solo'})
+        threads = [threading.Thread(target=increment, args=("Shared_1", 25)) for _ in range(4)]
+        threads.append(threading.Thread(target=increment, args=("Solo_1", 25)))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert repo.get("Shared_1")['counter'] == 100, "Lost update under contention"
+        assert repo.get("Solo_1")['counter'] == 25
+        print("✓ Optimistic concurrency successful")
+    finally:
+        shutil.rmtree("test_version_sheets", ignore_errors=True)
+
+
+
+def test_batch_operations():
+    """Test get_many/save_many ordering and per-item errors"""
+    import shutil
+    from repository import VersionConflictError
+    repo = CharacterRepository(storage_path="test_batch_sheets", io_workers=4)
+    try:
+        print("Testing batch operations...")
+        heroes = {f"Hero_{i}": {'hero_name': f"Hero {i}"} for i in range(20)}
+        results = repo.save_many(heroes)
+        assert [r.character_id for r in results] == list(heroes), "Results out of order"
+        assert all(r.ok and r.value == 1 for r in results)
+        assert heroes["Hero_0"]['version'] == 1, "Version not written back"
+        
+        # One conflicting item fails alone; repeated IDs are applied in order
+        results = repo.save_many(
+            [("Hero_1", {'hero_name': 'Stale'}), ("Hero_2", {'hero_name': 'First'}),
+             ("Hero_2", {'hero_name': 'Second'})],
+            expected_versions={"Hero_1": 0},
+        )
+        assert isinstance(results[0].error, VersionConflictError) and results[0].value is None
+        assert [r.value for r in results[1:]] == [2, 3]
+        assert repo.get("Hero_2")['hero_name'] == 'Second'
+        
+        # Missing characters are None, unreadable ones carry their error
+        with open("test_batch_sheets/Broken_1.json", "w") as f:
+            f.write("{not json")
+        results = repo.get_many(["Hero_5", "Missing_1", "Broken_1", "Hero_0"])
+        assert [r.character_id for r in results] == ["Hero_5", "Missing_1", "Broken_1", "Hero_0"]
+        assert results[0].value['hero_name'] == "Hero 5"
+        assert results[1].ok and results[1].value is None
+        assert not results[2].ok
+        assert results[3].value['hero_name'] == "Hero 0"
+        
+        all_characters = repo.get_all()
+        assert len(all_characters) == 20 and "Broken_1" not in all_characters
+        print("✓ Batch operations successful")
+    finally:
+        repo.close()
+        shutil.rmtree("test_batch_sheets", ignore_errors=True)
+
+
+
+def test_patch():
+    """Test field-level patches"""
+    import shutil
+    from repository import VersionConflictError
+    repo = CharacterRepository(storage_path="test_patch_sheets")
+    try:
+        print("Testing field patches...")
+        repo.save("Aria_1", {'hero_name': 'Aria', 'hero_story': 'Mine', 'journal_entries': ['', ''],
+                             'hidden_paths': {}})
+        
+        # Fields written by someone else survive a patch of other fields
+        other = repo.get("Aria_1")
+        other['hero_story'] = 'Theirs'
+        repo.save("Aria_1", other)
+        patched = repo.patch("Aria_1", {('journal_entries', 4): 'Day 5',
+                                        ('hidden_paths', 'Oakwood', '1-6_s1'): True})
+        assert patched['version'] == 3 and patched['hero_story'] == 'Theirs'
+        stored = repo.get("Aria_1")
+        assert stored['journal_entries'] == ['', '', '', '', 'Day 5']
+        # Unfound catalog paths are filled in as False by the schema migration
+        assert {(location, key) for location, sides in stored['hidden_paths'].items()
+                for key, found in sides.items() if found} == {('Oakwood', '1-6_s1')}
+        
+        try:
+            repo.patch("Aria_1", {('hero_name',): 'Stale'}, expected_version=2)
+            assert False, "Stale patch was not rejected"
+        except VersionConflictError as e:
+            assert e.actual_version == 3
+        assert repo.patch("Missing_1", {('hero_name',): 'Nobody'}) is None
+        print("✓ Field patches successful")
+    finally:
+        shutil.rmtree("test_patch_sheets", ignore_errors=True)
+
+
 if __name__ == "__main__":
     test_character_repository()
+    test_change_feed()
+    test_optimistic_concurrency()
+    test_batch_operations()
+    test_patch()
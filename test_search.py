@@ -0,0 +1,100 @@
+"""
+Test file for full-text search over character journals
+"""
+import shutil
+import subprocess
+import sys
+import tempfile
+import textwrap
+from pathlib import Path
+
+from repository import Character, CharacterRepository
+from repository.search import SearchIndex
+
+
+def journal(*lines):
+    return tuple(lines) + ("",) * (30 - len(lines))
+
+
+def test_search():
+    """Ranked results with line numbers, kept current on save, delete and rename"""
+    temp_dir = tempfile.mkdtemp(prefix="search_")
+    try:
+        repo = CharacterRepository(storage_path=temp_dir, history=False, progress=False)
+        repo.save("Aria_1", Character.empty().replace(
+            hero_name="Aria", journal=journal("Left Oakwood", "Met the lost battalion", "The battalion was lost again")))
+        repo.save("Bran_1", Character.empty().replace(
+            hero_name="Bran", hero_story="A smith.\nHe once met a lost battalion near the Monolith.",
+            scenario="Battle of the Monolith"))
+        repo.save("Cora_1", Character.empty().replace(hero_name="Cora", journal=journal("Nothing lost today")))
+
+        results = repo.search("lost battalion")
+        assert [result['character_id'] for result in results] == ["Aria_1", "Bran_1", "Cora_1"]
+        assert results[0]['matches'] == [('journal_entries', 1), ('journal_entries', 2)]
+        assert results[1]['matches'] == [('hero_story', 1)]
+        assert repo.search("MONOLITH")[0]['matches'] == [('hero_story', 1), ('scenario', 0)]
+        assert repo.search("battalion", character_ids=["Bran_1", "Cora_1"])[0]['character_id'] == "Bran_1"
+        assert repo.search("dragon") == [] and repo.search("  ?! ") == []
+        assert len(repo.search("lost", limit=2)) == 2
+        print("✓ Ranked search successful")
+
+        repo.patch("Cora_1", {('journal_entries', 4): "Found the lost battalion's banner"})
+        assert repo.search("banner")[0] == {'character_id': "Cora_1", 'score': repo.search("banner")[0]['score'],
+                                             'matches': [('journal_entries', 4)]}
+        repo.patch("Aria_1", {('journal_entries', 1): "Met nobody"})
+        assert repo.search("battalion")[0]['matches'] != [('journal_entries', 1), ('journal_entries', 2)]
+        repo.rename("Bran_1", "Bran_2")
+        repo.delete("Cora_1")
+        assert {result['character_id'] for result in repo.search("battalion")} == {"Aria_1", "Bran_2"}
+        print("✓ Incremental updates successful")
+
+        # The index persists: a new repository finds the same results without re-reading sheets
+        repo.close()
+        reopened = CharacterRepository(storage_path=temp_dir, history=False, progress=False)
+        assert {result['character_id'] for result in reopened.search("battalion")} == {"Aria_1", "Bran_2"}
+        assert not list((Path(temp_dir) / ".store" / "search").glob("pending-*.log"))[1:]
+
+        # A process that dies without flushing leaves a pending log that the next index replays
+        script = textwrap.dedent(f"""
+            import os
+            from repository import Character, CharacterRepository
+            repo = CharacterRepository(storage_path={temp_dir!r}, history=False, progress=False)
+            repo.save("Dana_1", Character.empty().replace(hero_story="Crossed the lost bridge"))
+            os._exit(0)
+        """)
+        subprocess.run([sys.executable, "-c", script], check=True, cwd=Path(__file__).parent)
+        assert reopened.search("bridge") == []
+        recovered = CharacterRepository(storage_path=temp_dir, history=False, progress=False)
+        assert recovered.search("bridge")[0]['character_id'] == "Dana_1"
+        print("✓ Persistence and crash recovery successful")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def test_segment_merging():
+    """Segments are flushed and merged, and the newest entry of a character wins"""
+    temp_dir = tempfile.mkdtemp(prefix="search_segments_")
+    try:
+        index = SearchIndex(Path(temp_dir), loader=lambda character_id: None, flush_threshold=2, max_segments=3)
+        for i in range(20):
+            index.update(f"Hero_{i % 5}", {'journal_entries': [f"visit {i}", "common ground"]})
+        index.update("Hero_0", None)
+        index.flush()
+        assert index.segment_count() <= 4
+        assert {result['character_id'] for result in index.search("common")} == {f"Hero_{i}" for i in range(1, 5)}
+        assert index.search("visit 19")[0]['character_id'] == "Hero_4"
+        assert [result['character_id'] for result in index.search("15")] == []
+        index.close()
+
+        reopened = SearchIndex(Path(temp_dir), loader=lambda character_id: None)
+        assert {result['character_id'] for result in reopened.search("common")} == {f"Hero_{i}" for i in range(1, 5)}
+        assert reopened.search("visit 18")[0]['matches'] == [('journal_entries', 0)]
+        print("✓ Segment merging successful")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_search()
+    test_segment_merging()
+    print("\n✅ All tests passed!")
@@ -0,0 +1,56 @@
+"""
+Test file for character sheet serialization codecs
+"""
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+from repository import CharacterRepository
+from repository.serialization import CODECS, MAGIC, decode_document, detect_codec, get_codec
+
+
+def test_codecs():
+    """Every codec round-trips, tags its format, and one store can mix formats"""
+    character = {'hero_name': 'Aria é', 'journal_entries': ['Day 1', ''], 'hidden_paths': {'Oakwood': {'1-6_s1': True}}}
+    for name, codec in CODECS.items():
+        data = codec.encode(character)
+        assert decode_document(data) == character, f"{name} did not round-trip"
+        assert detect_codec(data) == (name if codec.tagged else None)
+    assert get_codec("zlib-json").encode(character).startswith(MAGIC + b"zlib-json\n")
+    try:
+        get_codec("no-such-codec")
+        assert False, "Unknown codec was accepted"
+    except ValueError:
+        pass
+    print("✓ Codec round-trips successful")
+
+    temp_dir = tempfile.mkdtemp(prefix="serialization_")
+    try:
+        # Sheets written before codecs existed are still read
+        with open(Path(temp_dir) / "Legacy_1.json", 'w', encoding='utf-8') as f:
+            json.dump({'hero_name': 'Legacy'}, f, indent=2, ensure_ascii=False)
+
+        CharacterRepository(storage_path=temp_dir, codec="json-pretty").save("Pretty_1", dict(character))
+        binary = CharacterRepository(storage_path=temp_dir, codec="zlib-json")
+        binary.save("Binary_1", dict(character))
+        assert (Path(temp_dir) / "Binary_1.json").read_bytes().startswith(MAGIC)
+
+        all_characters = binary.get_all()
+        assert sorted(all_characters) == ["Binary_1", "Legacy_1", "Pretty_1"]
+        assert all_characters["Legacy_1"]['hero_name'] == 'Legacy' and all_characters["Legacy_1"]['version'] == 1
+        assert all_characters["Binary_1"]['journal_entries'] == character['journal_entries']
+
+        # Migrating a document is a read followed by a write with another codec
+        compact = CharacterRepository(storage_path=temp_dir, codec="json")
+        compact.save("Binary_1", compact.get("Binary_1"))
+        data = (Path(temp_dir) / "Binary_1.json").read_bytes()
+        assert detect_codec(data) is None and json.loads(data)['version'] == 2
+        print("✓ Mixed-format store successful")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_codecs()
+    print("\n✅ All tests passed!")